@@ -0,0 +1,80 @@
+"""
+Stores the province history of every game as changes from the previous phase, with a full checkpoint every
+few phases, instead of a full copy of every province for every phase.
+
+Back up the DB and stop the bot first, then run from the repository root:
+    python SQL/11-DeltaEncodeProvinces.py [db file] [checkpoint interval]
+Running it again re-encodes everything, e.g. after changing the checkpoint interval.
+"""
+
+import sqlite3
+import sys
+
+db_file = sys.argv[1] if len(sys.argv) > 1 else "bot_db.sqlite"
+checkpoint_interval = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+phase_order = ["Spring Moves", "Spring Retreats", "Fall Moves", "Fall Retreats", "Winter Builds"]
+
+
+def phase_key(phase_string: str) -> tuple[int, int]:
+    year, phase_name = phase_string.split(" ", 1)
+    return int(year), phase_order.index(phase_name.strip())
+
+
+connection = sqlite3.connect(db_file)
+cursor = connection.cursor()
+
+columns = {row[1] for row in cursor.execute("PRAGMA table_info(boards)").fetchall()}
+if "base_phase" not in columns:
+    cursor.execute("ALTER TABLE boards ADD COLUMN base_phase text")
+if "delta_depth" not in columns:
+    cursor.execute("ALTER TABLE boards ADD COLUMN delta_depth int DEFAULT 0")
+
+rows_before = cursor.execute("SELECT COUNT(*) FROM provinces").fetchone()[0]
+
+board_ids = [row[0] for row in cursor.execute("SELECT DISTINCT board_id FROM boards").fetchall()]
+for board_id in board_ids:
+    base_phases = dict(cursor.execute("SELECT phase, base_phase FROM boards WHERE board_id=?", (board_id,)).fetchall())
+    stored: dict[str, dict[str, tuple]] = {phase_string: {} for phase_string in base_phases}
+    for phase_string, province_name, owner, core, half_core in cursor.execute(
+        "SELECT phase, province_name, owner, core, half_core FROM provinces WHERE board_id=?", (board_id,)
+    ).fetchall():
+        if phase_string in stored:
+            stored[phase_string][province_name] = (owner, core, half_core)
+
+    # expand whatever is stored now (full copies or earlier deltas) into the full state of every phase
+    full: dict[str, dict[str, tuple]] = {}
+    phases = sorted(base_phases, key=phase_key)
+    for phase_string in phases:
+        base_phase = base_phases[phase_string]
+        full[phase_string] = {**full.get(base_phase, {}), **stored[phase_string]} if base_phase else stored[phase_string]
+
+    previous = None
+    delta_depth = 0
+    for phase_string in phases:
+        if previous is None or delta_depth + 1 >= checkpoint_interval:
+            base_phase, delta_depth = None, 0
+            province_rows = full[phase_string]
+        else:
+            base_phase, delta_depth = previous, delta_depth + 1
+            province_rows = {
+                name: row for name, row in full[phase_string].items() if full[previous].get(name) != row
+            }
+        cursor.execute(
+            "UPDATE boards SET base_phase=?, delta_depth=? WHERE board_id=? and phase=?",
+            (base_phase, delta_depth, board_id, phase_string),
+        )
+        cursor.execute("DELETE FROM provinces WHERE board_id=? and phase=?", (board_id, phase_string))
+        cursor.executemany(
+            "INSERT INTO provinces (board_id, phase, province_name, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
+            [(board_id, phase_string, name, *row) for name, row in province_rows.items()],
+        )
+        previous = phase_string
+
+rows_after = cursor.execute("SELECT COUNT(*) FROM provinces").fetchone()[0]
+connection.commit()
+cursor.close()
+connection.execute("VACUUM")
+connection.close()
+
+print(f"Encoded {len(board_ids)} boards: {rows_before} province rows -> {rows_after}")
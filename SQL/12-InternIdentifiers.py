@@ -0,0 +1,172 @@
+"""
+Moves a bot_db.sqlite from text keys to integer ones: phases become year * 5 + the phase's index, and province,
+coast and player names are interned into location_names and player_names.
+
+Run SQL/11-DeltaEncodeProvinces.py first. Back up the DB and stop the bot, then run from the repository root:
+    python SQL/12-InternIdentifiers.py [db file]
+"""
+
+import os
+import sqlite3
+import sys
+
+db_file = sys.argv[1] if len(sys.argv) > 1 else "bot_db.sqlite"
+
+phase_order = ["Spring Moves", "Spring Retreats", "Fall Moves", "Fall Retreats", "Winter Builds"]
+
+
+def phase_id(phase_string: str | None) -> int | None:
+    if phase_string is None:
+        return None
+    year, phase_name = phase_string.split(" ", 1)
+    return int(year) * len(phase_order) + phase_order.index(phase_name.strip())
+
+
+# transactions are begun and committed explicitly, so that the whole migration is one
+connection = sqlite3.connect(db_file, isolation_level=None)
+cursor = connection.cursor()
+
+if cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='location_names'").fetchone():
+    sys.exit(f"{db_file} already uses integer identifiers")
+
+size_before = os.path.getsize(db_file)
+
+# DBs from before current_board existed have their current phases found from boards
+tables = ["boards", "current_board", "provinces", "retreat_options", "units", "builds", "vassal_orders"]
+existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
+renamed = [table for table in tables if table in existing]
+
+cursor.execute("BEGIN")
+for table in renamed:
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+# executescript would commit the transaction, so the schema is run a statement at a time
+with open("diplomacy/persistence/db/schema.sql", "r") as sql_file:
+    statement = ""
+    for line in sql_file:
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cursor.execute(statement)
+            statement = ""
+
+location_ids: dict[str, int] = {}
+player_ids: dict[str, int] = {}
+
+
+def intern(ids: dict[str, int], table: str, name: str | None) -> int | None:
+    if name is None:
+        return None
+    if name not in ids:
+        cursor.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,))
+        ids[name] = cursor.lastrowid
+    return ids[name]
+
+
+def location(name: str | None) -> int | None:
+    return intern(location_ids, "location_names", name)
+
+
+def player(name: str | None) -> int | None:
+    return intern(player_ids, "player_names", name)
+
+
+cursor.executemany(
+    "INSERT INTO boards (board_id, phase, data_file, fish, name, base_phase, delta_depth) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    [
+        (board_id, phase_id(phase), data_file, fish, name, phase_id(base_phase), delta_depth)
+        for board_id, phase, data_file, fish, name, base_phase, delta_depth in cursor.execute(
+            "SELECT board_id, phase, data_file, fish, name, base_phase, delta_depth FROM boards_old"
+        ).fetchall()
+    ],
+)
+if "current_board" in renamed:
+    cursor.executemany(
+        "INSERT INTO current_board (board_id, phase) VALUES (?, ?)",
+        [
+            (board_id, phase_id(phase))
+            for board_id, phase in cursor.execute("SELECT board_id, phase FROM current_board_old").fetchall()
+        ],
+    )
+else:
+    # phases are ids by now, which sort chronologically where the text ones didn't
+    cursor.execute("INSERT INTO current_board (board_id, phase) SELECT board_id, MAX(phase) FROM boards GROUP BY board_id")
+cursor.executemany(
+    "INSERT INTO provinces (board_id, phase, province_id, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
+    [
+        (board_id, phase_id(phase), location(province_name), player(owner), player(core), player(half_core))
+        for board_id, phase, province_name, owner, core, half_core in cursor.execute(
+            "SELECT board_id, phase, province_name, owner, core, half_core FROM provinces_old"
+        ).fetchall()
+    ],
+)
+cursor.executemany(
+    "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
+    [
+        (board_id, phase_id(phase), location(origin), location(retreat_loc))
+        for board_id, phase, origin, retreat_loc in cursor.execute(
+            "SELECT board_id, phase, origin, retreat_loc FROM retreat_options_old"
+        ).fetchall()
+    ],
+)
+cursor.executemany(
+    "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army, order_type, order_destination, "
+    "order_source, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    [
+        (
+            board_id,
+            phase_id(phase),
+            location(unit_location),
+            is_dislodged,
+            player(owner),
+            is_army,
+            order_type,
+            location(order_destination),
+            location(order_source),
+            failed_order,
+        )
+        for (
+            board_id,
+            phase,
+            unit_location,
+            is_dislodged,
+            owner,
+            is_army,
+            order_type,
+            order_destination,
+            order_source,
+            failed_order,
+        ) in cursor.execute(
+            "SELECT board_id, phase, location, is_dislodged, owner, is_army, order_type, order_destination, "
+            "order_source, failed_order FROM units_old"
+        ).fetchall()
+    ],
+)
+cursor.executemany(
+    "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?)",
+    [
+        (board_id, phase_id(phase), player(build_player), location(build_location), is_build, is_army)
+        for board_id, phase, build_player, build_location, is_build, is_army in cursor.execute(
+            "SELECT board_id, phase, player, location, is_build, is_army FROM builds_old"
+        ).fetchall()
+    ],
+)
+cursor.executemany(
+    "INSERT INTO vassal_orders (board_id, phase, player, target_player, order_type) VALUES (?, ?, ?, ?, ?)",
+    [
+        (board_id, phase_id(phase), player(order_player), player(target_player), order_type)
+        for board_id, phase, order_player, target_player, order_type in cursor.execute(
+            "SELECT board_id, phase, player, target_player, order_type FROM vassal_orders_old"
+        ).fetchall()
+    ],
+)
+
+for table in renamed:
+    cursor.execute(f"DROP TABLE {table}_old")
+cursor.execute("COMMIT")
+cursor.close()
+connection.execute("VACUUM")
+connection.close()
+
+print(
+    f"Interned {len(location_ids)} location and {len(player_ids)} player names: "
+    f"{size_before / 1024:.0f} KiB -> {os.path.getsize(db_file) / 1024:.0f} KiB"
+)
@@ -0,0 +1,76 @@
+"""
+Compares finding adjacent provinces by measuring the distance between every pair against the STRtree query
+_get_adjacencies uses, and checks that both find exactly the same pairs. Runs on a synthetic map of jittered Voronoi
+cells, and on every variant whose SVG is present.
+
+Run from the repository root: python -m benchmarks.adjacencies [synthetic provinces] [margin]
+"""
+
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+
+from diplomacy.map_parser.vector.utils import get_nearby_pairs
+from diplomacy.map_parser.vector.vector import Parser
+
+
+def make_geometries(count: int) -> list[shapely.Geometry]:
+    # shrink every cell a little so that some neighbours end up just inside and others just outside the margin
+    rng = np.random.default_rng(0)
+    points = shapely.MultiPoint(rng.uniform(0, 100 * np.sqrt(count), (count, 2)))
+    cells = shapely.voronoi_polygons(points).geoms
+    return [
+        shapely.segmentize(cell.buffer(-rng.uniform(0, 0.6)), 2)
+        for cell in cells
+        if not cell.buffer(-0.6).is_empty
+    ]
+
+
+def pairwise(geometries: list[shapely.Geometry], margin: float) -> list[tuple[int, int]]:
+    return [
+        (index1, index2)
+        for (index1, geometry1), (index2, geometry2) in itertools.combinations(enumerate(geometries), 2)
+        if shapely.distance(geometry1, geometry2) < margin
+    ]
+
+
+def compare(label: str, geometries: list[shapely.Geometry], margin: float):
+    start = time.perf_counter()
+    expected = pairwise(geometries, margin)
+    pairwise_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = get_nearby_pairs(geometries, margin)
+    tree_time = time.perf_counter() - start
+
+    print(
+        f"{label}: {len(geometries)} provinces, {len(found)} adjacencies, "
+        f"{pairwise_time * 1000:.1f}ms pairwise, {tree_time * 1000:.1f}ms STRtree, "
+        f"{'identical' if found == expected else 'DIFFERENT'}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    margin = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    compare("synthetic", make_geometries(count), margin)
+    for config_file in sorted(glob.glob("config/*.json")):
+        with open(config_file, "r") as f:
+            data = json.load(f)
+        if not os.path.isfile(data["file"]):
+            continue
+        parser = Parser(os.path.basename(config_file))
+        parser._load_svg()
+        provinces = list(parser._get_province_coordinates())
+        compare(data["file"], [province.geometry for province in provinces], data["svg config"]["border_margin_hint"])
+
+
+if __name__ == "__main__":
+    main()
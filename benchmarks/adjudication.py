@@ -0,0 +1,65 @@
+"""
+Times adjudicating and saving a run of phases when every write commits on its own (rollback journal, synchronous=FULL)
+against committing each adjudication as one transaction in WAL mode.
+
+Run from the repository root: python -m benchmarks.adjudication [variant config] [phases] [synchronous level]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+from diplomacy.adjudicator.adjudicator import make_adjudicator
+from diplomacy.map_parser.vector.vector import get_parser
+from diplomacy.persistence.db import database
+from diplomacy.persistence.order import Hold
+
+
+def run(directory: str, datafile: str, phase_count: int, synchronous: str, use_transactions: bool) -> float:
+    os.environ["db_synchronous"] = synchronous
+    db_file = os.path.join(directory, f"adjudication-{use_transactions}.sqlite")
+    db = database._DatabaseConnection(db_file)
+    if not use_transactions:
+        db._connection.execute("PRAGMA journal_mode=DELETE")
+    db._order_write_delay = 0
+    # the adjudicator writes through the shared connection
+    database._db_class = db
+
+    board = get_parser(datafile).parse()
+    board.board_id = 1
+    db.save_board(board.board_id, board)
+
+    start = time.perf_counter()
+    for _ in range(phase_count):
+        for unit in board.units:
+            unit.order = Hold()
+        with db.transaction() if use_transactions else nullcontext():
+            board = make_adjudicator(board).run()
+            board.phase = board.phase.next
+            if board.phase.name == "Spring Moves":
+                board.year += 1
+            db.save_board(board.board_id, board)
+    elapsed = (time.perf_counter() - start) / phase_count
+    db.close()
+    return elapsed
+
+
+def main():
+    datafile = sys.argv[1] if len(sys.argv) > 1 else "classic.json"
+    phase_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    synchronous = sys.argv[3] if len(sys.argv) > 3 else "NORMAL"
+
+    with tempfile.TemporaryDirectory() as directory:
+        separate = run(directory, datafile, phase_count, "FULL", False)
+        grouped = run(directory, datafile, phase_count, synchronous, True)
+    for label, elapsed in (
+        ("separate commits, synchronous=FULL", separate),
+        (f"one transaction, WAL, synchronous={synchronous}", grouped),
+    ):
+        print(f"{label: <45} {elapsed * 1000: >8.2f}ms per adjudication")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares the size of the live DB and the time to read a live game's current phase before and after archiving every
+finished game.
+
+Run from the repository root: python -m benchmarks.archive [games] [phases per game] [provinces]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.history import advance, make_board
+from diplomacy.persistence.db.database import _DatabaseConnection, get_phase_id
+
+
+def db_size(db: _DatabaseConnection, db_file: str) -> int:
+    db._connection.execute("VACUUM")
+    db._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(db_file)
+
+
+def read_time(db: _DatabaseConnection, board_id: int, phase_id: int, repeats: int = 200) -> float:
+    cursor = db._connection.cursor()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        db._get_province_rows(cursor, board_id, phase_id)
+        cursor.execute("SELECT * FROM units WHERE board_id=? and phase=?", (board_id, phase_id)).fetchall()
+    elapsed = (time.perf_counter() - start) / repeats
+    cursor.close()
+    return elapsed
+
+
+def main():
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    phase_count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    province_count = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "live.sqlite")
+        os.environ["archive_db_file"] = os.path.join(directory, "archive.sqlite")
+        db = _DatabaseConnection(db_file)
+
+        random.seed(0)
+        current_phases = {}
+        for board_id in range(1, game_count + 1):
+            board = make_board(province_count)
+            board.board_id = board_id
+            provinces = sorted(board.provinces, key=lambda province: province.name)
+            players = sorted(board.players, key=lambda player: player.name)
+            for _ in range(phase_count):
+                for province in random.sample(provinces, 10):
+                    province.owner = random.choice(players)
+                db.save_board(board_id, board)
+                current_phases[board_id] = get_phase_id(board)
+                advance(board)
+
+        # the last game is still being played, every other one is finished
+        live_id = game_count
+        before_size = db_size(db, db_file)
+        before_time = read_time(db, live_id, current_phases[live_id])
+
+        start = time.perf_counter()
+        for board_id in range(1, game_count):
+            db.archive_board(board_id)
+        archive_time = (time.perf_counter() - start) / max(game_count - 1, 1)
+
+        after_size = db_size(db, db_file)
+        after_time = read_time(db, live_id, current_phases[live_id])
+
+    print(f"{game_count} games of {phase_count} phases, {province_count} provinces each")
+    print(f"before archiving: {before_size / 1024: >10.0f}KiB {before_time * 1000: >7.3f}ms per current phase read")
+    print(f"after archiving:  {after_size / 1024: >10.0f}KiB {after_time * 1000: >7.3f}ms per current phase read")
+    print(f"archiving took {archive_time * 1000:.1f}ms per game")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Checks the union-find coast connection detection against the old algorithm, which merged frozensets with linear scans,
+and times both. As a diagnostic for the FIXME in Coast.count_surrounding_rings, it also lists the coast pairs where the
+graph's answer disagrees with the geometry, i.e. whether the two provinces and the sea actually meet at a point (within
+the border margin): "false positive" pairs are connected without meeting, "false negative" ones meet but aren't
+connected. Runs on a synthetic map of Voronoi cells, and on every variant whose SVG is present.
+
+Run from the repository root: python -m benchmarks.coasts [synthetic provinces] [sea fraction]
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import shapely
+
+from diplomacy.map_parser.vector.utils import get_nearby_pairs
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.province import Coast, Province, ProvinceType
+
+
+def legacy_detect_costal_connection(c1: Coast, c2: Coast) -> bool:
+    # the detection as it was before, kept to compare against
+    for possible_tripoint in c1.adjacent_seas & c2.adjacent_seas:
+        if len(possible_tripoint.adjacent) == 2 or len(c1.province.adjacent) == 2 or len(c2.province.adjacent) == 2:
+            return True
+
+        procqueue = []
+        connected_sets = set()
+        for adjacent in c1.province.adjacent | c1.province.impassible_adjacent | \
+                        c2.province.adjacent | c2.province.impassible_adjacent | \
+                        possible_tripoint.adjacent | possible_tripoint.impassible_adjacent:
+            if adjacent not in (c1.province, c2.province, possible_tripoint):
+                procqueue.append(adjacent)
+                connected_sets.add(frozenset({adjacent}))
+
+        def find_set_with_element(element):
+            for subgraph in connected_sets:
+                if element in subgraph:
+                    return subgraph
+
+        for to_process in procqueue:
+            for neighbor in to_process.adjacent:
+                if neighbor not in procqueue:
+                    continue
+                this = find_set_with_element(to_process)
+                other = find_set_with_element(neighbor)
+                connected_sets = connected_sets - {this, other}
+                connected_sets.add(this | other)
+
+        l = 0
+        for candidate in connected_sets:
+            needed_neighbors = {c1.province, c2.province, possible_tripoint}
+            for province in candidate:
+                needed_neighbors.difference_update(province.adjacent)
+            if len(needed_neighbors) == 0:
+                l += 1
+        if l == 1:
+            return True
+    return False
+
+
+def make_provinces(count: int, sea_fraction: float) -> list[Province]:
+    rng = np.random.default_rng(0)
+    points = shapely.MultiPoint(rng.uniform(0, 100 * np.sqrt(count), (count, 2)))
+    provinces = [
+        Province(
+            f"Province {index}",
+            cell,
+            None,
+            None,
+            ProvinceType.SEA if rng.random() < sea_fraction else ProvinceType.LAND,
+            False,
+            set(),
+            set(),
+            None,
+            None,
+            None,
+        )
+        for index, cell in enumerate(shapely.voronoi_polygons(points).geoms)
+    ]
+    for index1, index2 in get_nearby_pairs([province.geometry for province in provinces], 1):
+        provinces[index1].set_adjacent(provinces[index2])
+        provinces[index2].set_adjacent(provinces[index1])
+    for province in provinces:
+        province.set_coasts()
+    return provinces
+
+
+def meets_at_sea(c1: Coast, c2: Coast, margin: float) -> bool:
+    shore = c1.province.geometry.buffer(margin).intersection(c2.province.geometry.buffer(margin))
+    return any(shore.intersects(sea.geometry.buffer(margin)) for sea in c1.adjacent_seas & c2.adjacent_seas)
+
+
+def check(label: str, provinces: list[Province], margin: float):
+    pairs = [
+        (coast1, coast2)
+        for province in provinces
+        if province.type != ProvinceType.ISLAND
+        for coast1 in province.coasts
+        for province2 in province.adjacent
+        for coast2 in province2.coasts
+        if coast2.name not in province.nonadjacent_coasts
+    ]
+
+    start = time.perf_counter()
+    legacy = [legacy_detect_costal_connection(coast1, coast2) for coast1, coast2 in pairs]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    found = [Coast.detect_costal_connection(coast1, coast2) for coast1, coast2 in pairs]
+    found_time = time.perf_counter() - start
+
+    print(
+        f"{label}: {len(pairs)} coast pairs, {legacy_time * 1000:.1f}ms before, {found_time * 1000:.1f}ms union-find, "
+        f"{sum(old != new for old, new in zip(legacy, found))} disagree with the old algorithm"
+    )
+    for (coast1, coast2), connected in zip(pairs, found):
+        if coast1.name > coast2.name:
+            # every pair is checked from both sides
+            continue
+        meets = meets_at_sea(coast1, coast2, margin)
+        if connected and not meets:
+            print(f"    false positive: {coast1} - {coast2}")
+        elif meets and not connected:
+            print(f"    false negative: {coast1} - {coast2}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    sea_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    check("synthetic", make_provinces(count, sea_fraction), 1)
+    for config_file in sorted(glob.glob("config/*.json")):
+        with open(config_file, "r") as f:
+            data = json.load(f)
+        if not os.path.isfile(data["file"]):
+            continue
+        provinces = list(Parser(os.path.basename(config_file))._parse_svg().provinces)
+        check(data["file"], provinces, data["svg config"]["border_margin_hint"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Checks the map graph's searches against the old ones that walked Province objects, and times both: whether an army
+can be convoyed between every pair of coastal provinces with fleets in some of the seas (convoy_is_possible), and every
+province within a few steps of each province (MapGraph.k_hop). Runs on a board RasterParser builds from synthetic
+images, whose graph is built from its locations, and on the same board compiled, whose graph comes with its topology.
+
+Run from the repository root: python -m benchmarks.graph [synthetic provinces] [fleet fraction] [hops]
+"""
+
+import collections
+import random
+import sys
+import time
+
+from benchmarks.raster import make_images
+from diplomacy.adjudicator.adjudicator import convoy_is_possible
+from diplomacy.map_parser.raster.raster_input import RasterParser, get_map_data
+from diplomacy.map_parser.vector.compiled import build_board, build_topology, compile_board
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.graph import EdgeType
+from diplomacy.persistence.province import Province, ProvinceType
+from diplomacy.persistence.unit import UnitType
+
+
+def legacy_convoy_is_possible(start: Province, end: Province) -> bool:
+    visited: set[str] = set()
+    to_visit = collections.deque()
+    to_visit.append(start)
+    while 0 < len(to_visit):
+        current = to_visit.popleft()
+
+        if current.name in visited:
+            continue
+        visited.add(current.name)
+
+        for adjacent_province in current.adjacent:
+            if adjacent_province == end:
+                return True
+            if adjacent_province.type != ProvinceType.SEA:
+                continue
+            if adjacent_province.unit is None or adjacent_province.unit.unit_type != UnitType.FLEET:
+                continue
+            to_visit.append(adjacent_province)
+
+    return False
+
+
+def legacy_k_hop(start: Province, k: int) -> set[Province]:
+    reached = {start}
+    frontier = {start}
+    for _ in range(k):
+        frontier = {adjacent for province in frontier for adjacent in province.adjacent} - reached
+        reached |= frontier
+    return reached
+
+
+def place_fleets(board: Board, fraction: float):
+    rng = random.Random(0)
+    player = min(board.players, key=lambda player: player.name)
+    seas = sorted((province for province in board.provinces if province.type == ProvinceType.SEA), key=str)
+    for province in rng.sample(seas, int(len(seas) * fraction)):
+        if province.unit is None:
+            board.create_unit(UnitType.FLEET, player, province, None, None)
+
+
+def check(label: str, board: Board, hops: int):
+    provinces = sorted(board.provinces, key=lambda province: province.name)
+    coastal = [province for province in provinces if province.type != ProvinceType.SEA and province.coasts]
+    pairs = [(start, end) for start in coastal for end in coastal if start is not end]
+
+    start_time = time.perf_counter()
+    expected = [legacy_convoy_is_possible(start, end) for start, end in pairs]
+    legacy_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    found = [convoy_is_possible(start, end) for start, end in pairs]
+    found_time = time.perf_counter() - start_time
+    print(
+        f"{label}: {len(pairs)} convoys, {legacy_time * 1000:.1f}ms before {found_time * 1000:.1f}ms graph, "
+        f"{sum(old != new for old, new in zip(expected, found))} different, {sum(found)} possible"
+    )
+
+    graph = provinces[0].graph
+    start_time = time.perf_counter()
+    expected = [legacy_k_hop(province, hops) for province in provinces]
+    legacy_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    found = [graph.k_hop(province.node, hops, EdgeType.PROVINCE) for province in provinces]
+    found_time = time.perf_counter() - start_time
+    different = sum(
+        old != {province.at(node) for node in new} for province, old, new in zip(provinces, expected, found)
+    )
+    print(
+        f"{label}: {len(provinces)} {hops}-hop neighbourhoods, {legacy_time * 1000:.1f}ms before "
+        f"{found_time * 1000:.1f}ms graph, {different} different"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    hops = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    board = RasterParser(get_map_data(*make_images(count, 1200))).parse()
+    compiled = compile_board(board, "")
+    place_fleets(board, fraction)
+    check("synthetic", board, hops)
+
+    compiled_board = build_board(compiled, build_topology(compiled), board.data, None, False, board.year_offset)
+    place_fleets(compiled_board, fraction)
+    check("synthetic compiled", compiled_board, hops)
+
+
+if __name__ == "__main__":
+    main()
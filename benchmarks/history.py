@@ -0,0 +1,90 @@
+"""
+Compares the size of the province history and the time to read a historical phase back when every phase is stored
+in full against storing changes with a checkpoint every few phases.
+
+Run from the repository root: python -m benchmarks.history [provinces] [phases] [changes per phase]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.db.database import _DatabaseConnection, get_phase_id
+from diplomacy.persistence.player import Player
+from diplomacy.persistence.province import Province, ProvinceType
+
+
+def make_board(province_count: int) -> Board:
+    players = {Player(f"Player {index}", "ffffff", "classic", 18, 18, set(), set()) for index in range(7)}
+    provinces = {
+        Province(f"Province {index}", None, None, None, ProvinceType.LAND, False, set(), set(), None, None, None)
+        for index in range(province_count)
+    }
+    board = Board(players, provinces, set(), phase.initial(), {}, "impdip.json", False)
+    board.board_id = 1
+    return board
+
+
+def advance(board: Board):
+    board.phase = board.phase.next
+    if board.phase.name == "Spring Moves":
+        board.year += 1
+
+
+def run(directory: str, checkpoint_interval: int, province_count: int, phase_count: int, changes: int):
+    db_file = os.path.join(directory, f"history-{checkpoint_interval}.sqlite")
+    db = _DatabaseConnection(db_file)
+    db._checkpoint_interval = checkpoint_interval
+
+    random.seed(0)
+    board = make_board(province_count)
+    provinces = sorted(board.provinces, key=lambda province: province.name)
+    players = sorted(board.players, key=lambda player: player.name)
+    phase_ids = []
+
+    start = time.perf_counter()
+    for _ in range(phase_count):
+        for province in random.sample(provinces, changes):
+            province.owner = random.choice(players)
+        db.save_board(board.board_id, board)
+        phase_ids.append(get_phase_id(board))
+        advance(board)
+    write_time = (time.perf_counter() - start) / phase_count
+
+    cursor = db._connection.cursor()
+    rows = cursor.execute("SELECT COUNT(*) FROM provinces").fetchone()[0]
+    start = time.perf_counter()
+    for phase_id in phase_ids:
+        assert len(db._get_province_rows(cursor, board.board_id, phase_id)) == province_count
+    read_time = (time.perf_counter() - start) / phase_count
+    cursor.close()
+
+    db._connection.execute("VACUUM")
+    size = os.path.getsize(db_file)
+    return rows, size, write_time, read_time
+
+
+def main():
+    province_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    phase_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    changes = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    print(f"{province_count} provinces, {phase_count} phases, {changes} changed provinces per phase")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for checkpoint_interval in (1, 5, 10, 20):
+            rows, size, write_time, read_time = run(
+                directory, checkpoint_interval, province_count, phase_count, changes
+            )
+            label = "full copies" if checkpoint_interval == 1 else f"checkpoint every {checkpoint_interval}"
+            print(
+                f"{label: <20} {rows: >7} province rows {size / 1024: >8.0f} KiB "
+                f"{write_time * 1000: >6.2f}ms/save {read_time * 1000: >6.2f}ms/phase read"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compares the DB size and the time to read a phase's provinces and units back into objects between the old text-keyed
+tables and the integer-keyed ones.
+
+Run from the repository root: python -m benchmarks.identifiers [games] [phases per game] [provinces]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.db.database import _DatabaseConnection, from_phase_id, to_phase_id
+
+TEXT_SCHEMA = """
+CREATE TABLE boards (board_id int, phase text, data_file text, fish int, name text, PRIMARY KEY (board_id, phase));
+CREATE TABLE provinces (
+    board_id int, phase text, province_name text, owner text, core text, half_core text,
+    PRIMARY KEY (board_id, phase, province_name));
+CREATE TABLE units (
+    board_id int, phase text, location text, is_dislodged boolean, owner text, is_army boolean, order_type text,
+    order_destination text, order_source text, failed_order boolean,
+    PRIMARY KEY (board_id, phase, location, is_dislodged));
+"""
+
+PLAYERS = ["Austria-Hungary", "Ottoman Empire", "Great Britain", "Tokugawa Shogunate", "Qing Dynasty", "Mughal Empire"]
+
+
+def generate(games: int, phases_per_game: int, province_count: int):
+    random.seed(0)
+    provinces = [f"Province Name {index} coast" if index % 5 == 0 else f"Province Name {index}" for index in range(province_count)]
+    for board_id in range(games):
+        current_phase = phase.initial()
+        year = 0
+        for _ in range(phases_per_game):
+            province_rows = [(name, random.choice(PLAYERS), random.choice(PLAYERS), None) for name in provinces]
+            unit_rows = [
+                (name, False, random.choice(PLAYERS), True, "Move", random.choice(provinces), None, False)
+                for name in random.sample(provinces, province_count // 3)
+            ]
+            yield board_id, current_phase, year, province_rows, unit_rows
+            current_phase = current_phase.next
+            if current_phase.name == "Spring Moves":
+                year += 1
+
+
+def write_text(db_file: str, data) -> None:
+    connection = sqlite3.connect(db_file)
+    connection.executescript(TEXT_SCHEMA)
+    for board_id, current_phase, year, province_rows, unit_rows in data:
+        phase_string = f"{year} {current_phase.name}"
+        connection.execute("INSERT INTO boards VALUES (?, ?, ?, ?, ?)", (board_id, phase_string, "impdip.json", 0, None))
+        connection.executemany(
+            "INSERT INTO provinces VALUES (?, ?, ?, ?, ?, ?)", [(board_id, phase_string, *row) for row in province_rows]
+        )
+        connection.executemany(
+            "INSERT INTO units VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(board_id, phase_string, *row) for row in unit_rows]
+        )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def write_integer(db: _DatabaseConnection, data) -> None:
+    location, player = db.get_location_id, db.get_player_id
+    for board_id, current_phase, year, province_rows, unit_rows in data:
+        phase_id = to_phase_id(current_phase, year)
+        db._connection.execute(
+            "INSERT INTO boards (board_id, phase, data_file, fish, name) VALUES (?, ?, ?, ?, ?)",
+            (board_id, phase_id, "impdip.json", 0, None),
+        )
+        db._connection.executemany(
+            "INSERT INTO provinces VALUES (?, ?, ?, ?, ?, ?)",
+            [(board_id, phase_id, location(name), player(owner), player(core), player(half_core)) for name, owner, core, half_core in province_rows],
+        )
+        db._connection.executemany(
+            "INSERT INTO units VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (board_id, phase_id, location(name), dislodged, player(owner), army, order, location(destination), source, failed)
+                for name, dislodged, owner, army, order, destination, source, failed in unit_rows
+            ],
+        )
+    db._connection.commit()
+    db._connection.execute("VACUUM")
+
+
+def read_text(connection: sqlite3.Connection, lookups, objects: dict[str, object], players: dict[str, object]) -> None:
+    for board_id, phase_string in lookups:
+        for name, owner, core, half_core in connection.execute(
+            "SELECT province_name, owner, core, half_core FROM provinces WHERE board_id=? and phase=?", (board_id, phase_string)
+        ):
+            objects[name], players.get(owner), players.get(core), players.get(half_core)
+        for name, owner, destination in connection.execute(
+            "SELECT location, owner, order_destination FROM units WHERE board_id=? and phase=?", (board_id, phase_string)
+        ):
+            objects[name], players[owner], objects[destination]
+
+
+def read_integer(connection: sqlite3.Connection, lookups, objects: list, players: list) -> None:
+    for board_id, phase_id in lookups:
+        for province_id, owner, core, half_core in connection.execute(
+            "SELECT province_id, owner, core, half_core FROM provinces WHERE board_id=? and phase=?", (board_id, phase_id)
+        ):
+            objects[province_id], players[owner], players[core], None if half_core is None else players[half_core]
+        for location, owner, destination in connection.execute(
+            "SELECT location, owner, order_destination FROM units WHERE board_id=? and phase=?", (board_id, phase_id)
+        ):
+            objects[location], players[owner], objects[destination]
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    phases_per_game = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    province_count = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    print(f"{games} games, {phases_per_game} phases each, {province_count} provinces")
+
+    with tempfile.TemporaryDirectory() as directory:
+        text_file = os.path.join(directory, "text.sqlite")
+        write_text(text_file, generate(games, phases_per_game, province_count))
+        integer_file = os.path.join(directory, "integer.sqlite")
+        db = _DatabaseConnection(integer_file)
+        write_integer(db, generate(games, phases_per_game, province_count))
+
+        lookups = [(board_id, phase_id) for board_id in range(games) for phase_id in range(phases_per_game)]
+        text_lookups = [
+            (board_id, "{1} {0.name}".format(*from_phase_id(phase_id))) for board_id, phase_id in lookups
+        ]
+
+        text_connection = sqlite3.connect(text_file)
+        objects_by_name = {name: object() for name in db._location_ids}
+        players_by_name = {name: object() for name in db._player_ids}
+        start = time.perf_counter()
+        read_text(text_connection, text_lookups, objects_by_name, players_by_name)
+        text_time = time.perf_counter() - start
+
+        objects_by_id = [object() for _ in db._location_names]
+        players_by_id = [object() for _ in db._player_names]
+        start = time.perf_counter()
+        read_integer(db._connection, lookups, objects_by_id, players_by_id)
+        integer_time = time.perf_counter() - start
+
+        for label, db_file, elapsed in (("text keys", text_file, text_time), ("integer keys", integer_file, integer_time)):
+            print(
+                f"{label: <13} {os.path.getsize(db_file) / 1024: >8.0f} KiB "
+                f"{elapsed / len(lookups) * 1000: >6.3f}ms to read a phase"
+            )
+
+
+if __name__ == "__main__":
+    main()
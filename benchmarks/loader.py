@@ -0,0 +1,67 @@
+"""
+Counts the SQL statements (and time) it takes to load a board for each phase type.
+
+Run from the repository root: python -m benchmarks.loader [variant config] [dislodged units]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from diplomacy.map_parser.vector.vector import get_parser
+from diplomacy.persistence import phase
+from diplomacy.persistence.db.database import _DatabaseConnection
+from diplomacy.persistence.order import Build, Hold
+from diplomacy.persistence.unit import UnitType
+
+
+def make_boards(datafile: str, dislodged: int):
+    moves = get_parser(datafile).parse()
+    for unit in moves.units:
+        unit.order = Hold()
+
+    retreats = get_parser(datafile).parse()
+    retreats.phase = phase.get("Spring Retreats")
+    for unit in sorted(retreats.units, key=lambda unit: unit.province.name)[:dislodged]:
+        unit.province.unit = None
+        unit.province.dislodged_unit = unit
+        unit.retreat_options = set(unit.province.adjacent)
+
+    builds = get_parser(datafile).parse()
+    builds.phase = phase.get("Winter Builds")
+    for player in builds.players:
+        for center in list(player.centers)[:1]:
+            if center.unit is None:
+                player.build_orders.add(Build(center, UnitType.ARMY))
+
+    return [moves, retreats, builds]
+
+
+def main():
+    datafile = sys.argv[1] if len(sys.argv) > 1 else "classic.json"
+    dislodged = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = _DatabaseConnection(os.path.join(directory, "loader.sqlite"))
+        boards = make_boards(datafile, dislodged)
+        for board in boards:
+            board.board_id = 1
+            db.save_board(board.board_id, board)
+
+        statements = []
+        db._connection.set_trace_callback(statements.append)
+        for board in boards:
+            statements.clear()
+            start = time.perf_counter()
+            db.get_board(board.board_id, board.phase, board.year, 0, None, datafile)
+            elapsed = time.perf_counter() - start
+            dislodged_units = sum(unit.province.dislodged_unit is unit for unit in board.units)
+            print(
+                f"{board.phase.name: <16} {len(statements): >3} statements "
+                f"({dislodged_units} dislodged units) {elapsed * 1000: >7.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
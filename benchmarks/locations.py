@@ -0,0 +1,71 @@
+"""
+Checks Board.get_possible_locations, which only tries the names starting with the first word typed, against the old
+scan of every province and coast, on random abbreviations of the names of a synthetic board, and times both.
+
+Run from the repository root: python -m benchmarks.locations [provinces] [queries]
+"""
+
+import random
+import re
+import sys
+import time
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.province import Coast, Province, ProvinceType
+
+WORDS = ["north", "sea", "norway", "nor", "st", "st.", "petersburg", "gulf", "of", "bothnia", "new", "saint's", "east"]
+
+
+def legacy_get_possible_locations(board: Board, name: str) -> list[Province]:
+    # the lookup as it was before, kept to compare against
+    pattern = r"^{}.*$".format(re.escape(name.strip()).replace("\\ ", r"\S*\s*"))
+    matches = []
+    for province in board.provinces:
+        if re.search(pattern, province.name.lower()):
+            matches.append(province)
+        else:
+            matches += [coast for coast in province.coasts if re.search(pattern, coast.name.lower())]
+    return matches
+
+
+def make_board(count: int, rng: random.Random) -> Board:
+    provinces = {}
+    while len(provinces) < count:
+        name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title()
+        province = Province(name, None, None, None, ProvinceType.LAND, False, set(), set(), None, None, None)
+        for suffix in rng.sample(["nc", "sc", "ec", "coast"], rng.randint(0, 2)):
+            province.coasts.add(Coast(f"{name} {suffix}", None, None, set(), province))
+        provinces.setdefault(name, province)
+    return Board(set(), set(provinces.values()), set(), phase.initial(), {}, None, False)
+
+
+def abbreviate(name: str, rng: random.Random) -> str:
+    words = name.lower().split(" ")
+    return " ".join(word[: rng.randint(1, len(word))] for word in words[: rng.randint(1, len(words))])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    rng = random.Random(0)
+    board = make_board(count, rng)
+    names = [location.name for province in board.provinces for location in (province, *province.coasts)]
+    queries = [abbreviate(rng.choice(names), rng) for _ in range(query_count)]
+
+    start = time.perf_counter()
+    expected = [legacy_get_possible_locations(board, query) for query in queries]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    found = [board.get_possible_locations(query) for query in queries]
+    found_time = time.perf_counter() - start
+
+    print(
+        f"{len(names)} locations, {query_count} queries: {legacy_time / query_count * 1e6:.1f}us before, "
+        f"{found_time / query_count * 1e6:.1f}us now, {sum(old != new for old, new in zip(expected, found))} differ"
+    )
+
+
+if __name__ == "__main__":
+    main()
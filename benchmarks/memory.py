@@ -0,0 +1,77 @@
+"""
+Measures how many bytes each loaded board takes, with its adjacencies resolved and an order for every unit as they are
+once a game is underway, for every variant whose SVG is present (impdip and impdipchaos when their SVGs are there), and
+for boards RasterParser builds from synthetic images, which don't share a topology. Also lists the size of one of each
+model object, which is what __slots__ saves on.
+
+Run from the repository root: python -m benchmarks.memory [boards] [synthetic provinces]
+"""
+
+import glob
+import json
+import os
+import sys
+import tracemalloc
+
+from benchmarks.raster import make_images
+from diplomacy.map_parser.raster.raster_input import RasterParser, get_map_data
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.order import Hold
+
+
+def load(board: Board) -> Board:
+    for province in board.provinces:
+        province.adjacent
+        for coast in province.coasts:
+            coast.adjacent_seas
+            coast.adjacent_coasts
+    for unit in board.units:
+        unit.order = Hold()
+    return board
+
+
+def object_size(value) -> int:
+    size = sys.getsizeof(value)
+    if hasattr(value, "__dict__"):
+        size += sys.getsizeof(value.__dict__)
+    return size
+
+
+def measure(label: str, build, count: int):
+    first = load(build())
+    tracemalloc.start()
+    boards = [load(build()) for _ in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label}: {len(first.provinces)} provinces, {len(first.units)} units, {size / count:,.0f} bytes per board")
+    return first
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    provinces = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    map_data = get_map_data(*make_images(provinces, 1200))
+    board = measure("synthetic", lambda: RasterParser(map_data).parse(), max(count // 10, 1))
+    for config_file in sorted(glob.glob("config/*.json")):
+        with open(config_file, "r") as f:
+            data = json.load(f)
+        if not os.path.isfile(data["file"]):
+            continue
+        parser = Parser(os.path.basename(config_file))
+        board = measure(data["file"], parser.parse, count)
+
+    province = next(province for province in board.provinces if province.coasts)
+    unit = next(iter(board.units))
+    print(
+        "bytes per object: "
+        + ", ".join(
+            f"{type(value).__name__} {object_size(value)}"
+            for value in (province, next(iter(province.coasts)), unit, unit.player, unit.order)
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
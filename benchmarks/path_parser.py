@@ -0,0 +1,135 @@
+"""
+Times parsing every path of the SVGs the variant configs reference with parse_path against the old tokenizer, which
+split on whitespace and transformed one point at a time, and counts the paths whose points differ.
+
+Run from the repository root: python -m benchmarks.path_parser [extra SVG files...]
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from lxml import etree
+
+from diplomacy.map_parser.vector.transform import TransGL3
+from diplomacy.map_parser.vector.utils import parse_path
+
+
+def legacy_parse_path(path_string: str, translation: TransGL3) -> list[list[tuple[float, float]]]:
+    # the parser as it was before, kept to compare against
+    province_coordinates = [[]]
+    command = None
+    expected_arguments = 0
+    current_index = 0
+    path = path_string.split()
+
+    start = None
+    coordinate = (0, 0)
+    while current_index < len(path):
+        if path[current_index][0].isalpha():
+            if len(path[current_index]) != 1:
+                path.insert(current_index + 1, path[current_index][1:])
+                path[current_index] = path[current_index][0]
+
+            command = path[current_index]
+            if command.lower() == "z":
+                province_coordinates[-1].append(translation.transform(start))
+                start = None
+                current_index += 1
+                if current_index < len(path):
+                    province_coordinates += [[]]
+                    continue
+                else:
+                    break
+            elif command.lower() in ["m", "l", "h", "v", "t"]:
+                expected_arguments = 1
+            elif command.lower() in ["s", "q"]:
+                expected_arguments = 2
+            elif command.lower() in ["c"]:
+                expected_arguments = 3
+            elif command.lower() in ["a"]:
+                expected_arguments = 5
+            current_index += 1
+
+        args = [
+            (float(coord_string.split(",")[0]), float(coord_string.split(",")[-1]))
+            for coord_string in path[current_index : current_index + expected_arguments]
+        ]
+        if command.lower() in ["h", "v"]:
+            index = 0 if command.lower() == "h" else 1
+            coordinate = list(coordinate)
+            if command.isupper():
+                coordinate[index] = 0
+            coordinate[index] += args[0][0]
+            coordinate = tuple(coordinate)
+        else:
+            if command.isupper():
+                coordinate = (0, 0)
+            coordinate = (coordinate[0] + args[-1][0], coordinate[1] + args[-1][1])
+
+        if start is None:
+            start = coordinate
+        province_coordinates[-1].append(translation.transform(coordinate))
+        current_index += expected_arguments
+    return province_coordinates
+
+
+def get_svg_files() -> list[str]:
+    svg_files = set(sys.argv[1:])
+    for config_file in glob.glob("config/*.json"):
+        with open(config_file, "r") as f:
+            svg_files.add(json.load(f)["file"])
+    return sorted(svg_files)
+
+
+def same_points(legacy: list[list[tuple[float, float]]], parsed: list[np.ndarray]) -> bool:
+    legacy = [subpath for subpath in legacy if len(subpath) > 1]
+    if len(legacy) != len(parsed):
+        return False
+    return all(np.allclose(np.array(old), new) for old, new in zip(legacy, parsed))
+
+
+def main():
+    for svg_file in get_svg_files():
+        if not os.path.isfile(svg_file):
+            print(f"{svg_file}: missing, skipped")
+            continue
+        svg_root = etree.parse(svg_file)
+        paths = [
+            (element.get("d"), TransGL3(element))
+            for element in svg_root.iter("{http://www.w3.org/2000/svg}path")
+            if element.get("d")
+        ]
+        start = time.perf_counter()
+        parsed = [parse_path(path_string, translation) for path_string, translation in paths]
+        parse_time = time.perf_counter() - start
+        points = sum(len(subpath) for subpaths in parsed for subpath in subpaths)
+
+        legacy_time = 0.0
+        differing = 0
+        failing = 0
+        for (path_string, translation), new in zip(paths, parsed):
+            start = time.perf_counter()
+            try:
+                old = legacy_parse_path(path_string, translation)
+            except (ValueError, IndexError, TypeError, AttributeError):
+                # the old tokenizer gives up on e.g. "1-2" or exponents
+                failing += 1
+                continue
+            finally:
+                legacy_time += time.perf_counter() - start
+            if not same_points(old, new):
+                differing += 1
+
+        print(
+            f"{svg_file}: {len(paths)} paths, {points} points, "
+            f"{legacy_time * 1000:.1f}ms before, {parse_time * 1000:.1f}ms now, "
+            f"{differing} paths differ, {failing} failed before"
+        )
+
+
+if __name__ == "__main__":
+    main()
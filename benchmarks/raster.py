@@ -0,0 +1,121 @@
+"""
+Times the raster map parser's single pass adjacency, owner and unit detection against the old loops, which built a
+mask of the whole image for every province and unit, and checks that both give the same results. Then builds a board
+from the same images with RasterParser. Runs on synthetic images of Voronoi cells with black borders.
+
+Run from the repository root: python -m benchmarks.raster [provinces] [image width]
+"""
+
+import sys
+import time
+
+import numpy as np
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+from diplomacy.map_parser.raster import raster_input
+from diplomacy.map_parser.raster.config import BORDER_COLOR, PROVINCE_COLOR_TYPE_MAP, UNIT_COLOR_TYPE_MAP
+from diplomacy.map_parser.raster.raster_input import RasterParser, get_map_data
+
+
+def legacy_get_adjacencies(province_id_map_expanded, num_provinces):
+    # as before, with find_boundaries(mask, mode="outer") written out as the cross-shaped dilation it does
+    adjacencies = {}
+    for province_id in range(1, num_provinces + 1):
+        mask = province_id_map_expanded == province_id
+        boundaries = ndimage.binary_dilation(mask) & ~mask
+        adjacencies[province_id] = np.setdiff1d(np.unique(province_id_map_expanded * boundaries), [0])
+    return adjacencies
+
+
+def legacy_get_province_owners(provinces, province_id_map, num_provinces):
+    province_owners = {}
+    for province_id in range(1, num_provinces + 1):
+        colors, frequency = np.unique(provinces[province_id_map == province_id], return_counts=True, axis=0)
+        province_owners[province_id] = PROVINCE_COLOR_TYPE_MAP[tuple(colors[np.argmax(frequency)][:3])]
+    return province_owners
+
+
+def legacy_get_units(province_id_map, units_image):
+    units = {}
+    unit_id_map, num_units = ndimage.label((units_image[:, :, 3] != 0), structure=np.ones((3, 3)))
+    for unit_id in range(1, num_units + 1):
+        province_ids, frequency = np.unique(province_id_map[unit_id_map == unit_id], return_counts=True)
+        province_id = province_ids[frequency.argmax()]
+        for color in np.unique(units_image[unit_id_map == unit_id], axis=0):
+            if tuple(color[:3]) in UNIT_COLOR_TYPE_MAP:
+                units[province_id] = {"unit_number": unit_id, "player": UNIT_COLOR_TYPE_MAP[tuple(color[:3])]}
+                break
+    return units
+
+
+def make_images(count: int, width: int):
+    rng = np.random.default_rng(0)
+    height = width * 3 // 4
+    seeds = rng.uniform(0, (height, width), (count, 2))
+    rows, columns = np.mgrid[0:height, 0:width]
+    cells = cKDTree(seeds).query(np.stack([rows.ravel(), columns.ravel()], axis=1))[1].reshape(height, width)
+
+    colors = np.array([(*color, 255) for color in PROVINCE_COLOR_TYPE_MAP], dtype=np.uint8)
+    provinces = colors[rng.integers(0, len(colors), count)][cells]
+    # provinces are labeled with diagonal connections, so a border has to be thick enough to block those too
+    border = ndimage.maximum_filter(cells, size=3) != ndimage.minimum_filter(cells, size=3)
+    provinces[border] = BORDER_COLOR
+
+    def stamp(indices, color):
+        image = np.zeros((height, width, 4), dtype=np.uint8)
+        for row, column in seeds[indices].astype(int):
+            image[max(row - 2, 0) : row + 3, max(column - 2, 0) : column + 3] = (*color, 255)
+        return image
+
+    unit_colors = list(UNIT_COLOR_TYPE_MAP)
+    centers = stamp(np.arange(0, count, 3), (255, 255, 255))
+    armies = stamp(np.arange(0, count, 5), unit_colors[0])
+    fleets = stamp(np.arange(2, count, 5), unit_colors[-1])
+    return provinces, centers, armies, fleets
+
+
+def same(first: dict, second: dict) -> bool:
+    return first.keys() == second.keys() and all(np.array_equal(first[key], second[key]) for key in first)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+
+    provinces_image, centers_image, armies_image, fleets_image = make_images(count, width)
+    province_id_map, num_provinces = ndimage.label((provinces_image != BORDER_COLOR).any(-1), structure=np.ones((3, 3)))
+    expanded = raster_input.expand_labels(province_id_map, distance=6)
+    print(f"{provinces_image.shape[1]}x{provinces_image.shape[0]} pixels, {num_provinces} provinces")
+
+    for label, legacy, function, arguments in (
+        ("adjacencies", legacy_get_adjacencies, raster_input.get_adjacencies, (expanded, num_provinces)),
+        (
+            "owners",
+            legacy_get_province_owners,
+            raster_input.get_province_owners,
+            (provinces_image, province_id_map, num_provinces),
+        ),
+        ("units", legacy_get_units, raster_input.get_units, (province_id_map, armies_image)),
+    ):
+        start = time.perf_counter()
+        expected = legacy(*arguments)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        found = function(*arguments)
+        found_time = time.perf_counter() - start
+        print(
+            f"{label: <12} {legacy_time * 1000: >8.1f}ms before {found_time * 1000: >8.1f}ms now, "
+            f"{'identical' if same(expected, found) else 'DIFFERENT'}"
+        )
+
+    start = time.perf_counter()
+    board = RasterParser(get_map_data(provinces_image, centers_image, armies_image, fleets_image)).parse()
+    print(
+        f"RasterParser: {len(board.provinces)} provinces, {len(board.units)} units, "
+        f"{sum(len(player.centers) for player in board.players)} owned centers in {time.perf_counter() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
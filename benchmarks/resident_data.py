@@ -0,0 +1,106 @@
+"""
+Times parsing a variant from its SVG and drawing its GUI map with initialize_province_resident_data matching elements
+to provinces through one STRtree query, against the old loop that checked every province against every element.
+
+Also matches the labels of a synthetic map of Voronoi cells both ways, checking that they end up in the same provinces.
+
+Run from the repository root: python -m benchmarks.resident_data [variant config] [repeats] [synthetic provinces]
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import shapely
+from shapely.geometry import Point
+
+from diplomacy.adjudicator import mapper
+from diplomacy.adjudicator.mapper import Mapper
+from diplomacy.map_parser.vector import vector
+from diplomacy.map_parser.vector.utils import initialize_province_resident_data
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.province import Province, ProvinceType
+
+
+def legacy_initialize_province_resident_data(provinces, resident_dataset, get_coordinates, resident_data_callback):
+    # the matching as it was before, kept to compare against
+    resident_dataset = set(resident_dataset)
+    for province in provinces:
+        remove = set()
+        for resident_data in resident_dataset:
+            x, y = get_coordinates(resident_data)
+            if not x or not y:
+                remove.add(resident_data)
+                continue
+            if province.geometry.contains(Point((x, y))):
+                resident_data_callback(province, resident_data)
+                remove.add(resident_data)
+        for resident_data in remove:
+            resident_dataset.remove(resident_data)
+
+
+@contextmanager
+def matching(function):
+    originals = vector.initialize_province_resident_data, mapper.initialize_province_resident_data
+    vector.initialize_province_resident_data = mapper.initialize_province_resident_data = function
+    try:
+        yield
+    finally:
+        vector.initialize_province_resident_data, mapper.initialize_province_resident_data = originals
+
+
+def time_variant(datafile: str, repeats: int) -> tuple[float, float]:
+    parse_time = 0.0
+    for _ in range(repeats):
+        parser = Parser(datafile)
+        parser._load_svg()
+        start = time.perf_counter()
+        board = parser._parse_svg()
+        parse_time += time.perf_counter() - start
+
+    board = Parser(datafile).parse()
+    gui_time = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        Mapper(board).draw_gui_map(board.phase, None)
+        gui_time += time.perf_counter() - start
+    return parse_time / repeats, gui_time / repeats
+
+
+def time_synthetic(count: int) -> None:
+    rng = np.random.default_rng(0)
+    points = shapely.MultiPoint(rng.uniform(0, 100 * np.sqrt(count), (count, 2)))
+    provinces = [
+        Province(str(index), cell, None, None, ProvinceType.LAND, False, set(), set(), None, None, None)
+        for index, cell in enumerate(shapely.voronoi_polygons(points).geoms)
+    ]
+    labels = [(point.x, point.y) for point in points.geoms]
+
+    results = []
+    for function in (legacy_initialize_province_resident_data, initialize_province_resident_data):
+        assigned = {}
+        start = time.perf_counter()
+        function(set(provinces), labels, lambda label: label, lambda province, label: assigned.setdefault(label, province))
+        elapsed = time.perf_counter() - start
+        results.append(assigned)
+        print(f"{function.__name__: <42} {count} labels {elapsed * 1000: >8.1f}ms")
+    print(f"same provinces: {results[0] == results[1]}")
+
+
+def main():
+    datafile = sys.argv[1] if len(sys.argv) > 1 else "impdip.json"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+
+    time_synthetic(count)
+
+    with matching(legacy_initialize_province_resident_data):
+        before = time_variant(datafile, repeats)
+    after = time_variant(datafile, repeats)
+    for label, (parse_time, gui_time) in (("every pair", before), ("STRtree", after)):
+        print(f"{label: <10} Parser.parse() from SVG {parse_time * 1000: >8.1f}ms, draw_gui_map {gui_time * 1000: >8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
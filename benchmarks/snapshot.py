@@ -0,0 +1,120 @@
+"""
+Times taking a snapshot of a board and restoring it, against loading the same phase from the DB as rollbacks and
+reloads did, and checks that a board that has been changed at random and restored is the same as it was. Also gives
+how many bytes a snapshot takes. Runs on a board RasterParser builds from synthetic images (which can't be loaded from
+the DB, so only the snapshot is timed), and on every variant whose SVG is present.
+
+Run from the repository root: python -m benchmarks.snapshot [synthetic provinces] [rounds]
+"""
+
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.raster import make_images
+from benchmarks.visibility import shuffle
+from diplomacy.map_parser.raster.raster_input import RasterParser, get_map_data
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.db.database import _DatabaseConnection
+from diplomacy.persistence.order import Hold, Move, Support
+
+
+def give_orders(board: Board, rng: random.Random):
+    for unit in sorted(board.units, key=lambda unit: unit.province.name):
+        neighbours = sorted(unit.province.adjacent, key=lambda province: province.name)
+        choice = rng.random()
+        if choice < 0.3 or not neighbours:
+            unit.order = Hold()
+        elif choice < 0.7:
+            unit.order = Move(rng.choice(neighbours))
+        else:
+            unit.order = Support(unit.location(), rng.choice(neighbours))
+        unit.order.hasFailed = rng.random() < 0.2
+
+
+def state(board: Board) -> list:
+    def order(unit):
+        if unit.order is None:
+            return None
+        return (
+            type(unit.order).__name__,
+            str(getattr(unit.order, "destination", None)),
+            str(getattr(unit.order, "source", None)),
+            unit.order.hasFailed,
+        )
+
+    return [
+        board.phase.name,
+        board.year,
+        sorted(
+            (province.name, str(province.owner), str(province.core), str(province.half_core)) for province in board.provinces
+        ),
+        sorted((str(unit), unit.player.name, order(unit), sorted(map(str, unit.retreat_options or ()))) for unit in board.units),
+        sorted((player.name, sorted(map(str, player.centers)), sorted(map(str, player.units))) for player in board.players),
+    ]
+
+
+def check(label: str, board: Board, datafile: str | None, rounds: int):
+    rng = random.Random(0)
+    snapshot_time = restore_time = load_time = 0.0
+    different = 0
+    size = 0
+    with tempfile.TemporaryDirectory() as directory:
+        db = _DatabaseConnection(os.path.join(directory, "snapshot.sqlite")) if datafile else None
+        board.board_id = 1
+        for _ in range(rounds):
+            shuffle(board, rng)
+            give_orders(board, rng)
+            expected = state(board)
+            start = time.perf_counter()
+            snapshot = board.snapshot()
+            snapshot_time += time.perf_counter() - start
+            size = max(size, snapshot.nbytes)
+
+            if db is not None:
+                db.save_board(1, board)
+                db.save_order_for_units(board, board.units)
+                db.flush()
+                start = time.perf_counter()
+                db.get_board(1, board.phase, board.year, 0, None, datafile)
+                load_time += time.perf_counter() - start
+
+            shuffle(board, rng)
+            give_orders(board, rng)
+            start = time.perf_counter()
+            board.restore(snapshot)
+            restore_time += time.perf_counter() - start
+            different += state(board) != expected
+            board.phase = board.phase.next
+            if board.phase.name == "Spring Moves":
+                board.year += 1
+
+    loaded = f"{load_time / rounds * 1000:.2f}ms to load from the DB, " if datafile else ""
+    print(
+        f"{label}: {len(board.provinces)} provinces, {len(board.units)} units, {size} bytes per snapshot, "
+        f"{snapshot_time / rounds * 1000:.2f}ms to take and {restore_time / rounds * 1000:.2f}ms to restore, "
+        f"{loaded}{different} of {rounds} restored differently"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    check("synthetic", RasterParser(get_map_data(*make_images(count, 1600))).parse(), None, rounds)
+    for config_file in sorted(glob.glob("config/*.json")):
+        with open(config_file, "r") as f:
+            data = json.load(f)
+        if not os.path.isfile(data["file"]):
+            continue
+        datafile = os.path.basename(config_file)
+        check(data["file"], Parser(datafile).parse(), datafile, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares finding the current phase of every game by scanning the whole boards table (how startup used to work)
+with reading it from the current_board table.
+
+Run from the repository root: python -m benchmarks.startup [games] [phases per game]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.db.database import _DatabaseConnection, from_phase_id, to_phase_id
+
+
+def populate(db: _DatabaseConnection, games: int, phases_per_game: int) -> None:
+    boards = []
+    for board_id in range(games):
+        current_phase = phase.get("Spring Moves")
+        year = 0
+        for _ in range(phases_per_game):
+            boards.append((board_id, to_phase_id(current_phase, year), "impdip.json", 0, None))
+            current_phase = current_phase.next
+            if current_phase.name == "Spring Moves":
+                year += 1
+    db.executemany_arbitrary_sql(
+        "INSERT INTO boards (board_id, phase, data_file, fish, name) VALUES (?, ?, ?, ?, ?)", boards
+    )
+
+
+def scan_boards(db: _DatabaseConnection) -> dict[int, str]:
+    # the lookup get_boards used to do before every board was parsed
+    cursor = db._connection.cursor()
+    board_data = cursor.execute("SELECT * FROM boards").fetchall()
+    board_keys = [(row[0], row[1]) for row in board_data]
+    current = {}
+    for board_id, phase_id, data_file, fish, name, base_phase, delta_depth in board_data:
+        current_phase, year = from_phase_id(phase_id)
+        next_phase = current_phase.next
+        next_phase_year = year
+        if next_phase.name == "Spring Moves":
+            next_phase_year += 1
+        if (board_id, to_phase_id(next_phase, next_phase_year)) in board_keys:
+            continue
+        current[board_id] = phase_id
+    cursor.close()
+    return current
+
+
+def read_current_boards(db: _DatabaseConnection) -> dict[int, str]:
+    cursor = db._connection.cursor()
+    board_data = cursor.execute(
+        "SELECT board_id, phase, data_file, fish, name FROM current_board JOIN boards USING (board_id, phase)"
+    ).fetchall()
+    cursor.close()
+    return {board_id: phase_id for board_id, phase_id, data_file, fish, name in board_data}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    phases_per_game = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = _DatabaseConnection(os.path.join(directory, "bench.sqlite"))
+        populate(db, games, phases_per_game)
+        print(f"{games} games, {games * phases_per_game} phases")
+
+        _, elapsed = timed(db._backfill_current_boards)
+        print(f"one-off current_board backfill: {elapsed:.3f}s")
+
+        scanned, elapsed = timed(scan_boards, db)
+        print(f"full boards scan:               {elapsed:.3f}s")
+        indexed, elapsed = timed(read_current_boards, db)
+        print(f"current_board lookup:           {elapsed:.4f}s")
+        assert scanned == indexed
+
+
+if __name__ == "__main__":
+    main()
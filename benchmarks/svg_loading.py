@@ -0,0 +1,54 @@
+"""
+Times loading the SVG of every variant whose SVG is present, and measures how much the loading process' peak memory
+grows, for the full etree.parse the parser and mapper used to do, load_svg as the mapper uses it (without the editor
+data), and load_svg as the parser uses it (only the layers the config names). Each load runs in a fresh process, so
+that the peak memory of one doesn't hide another.
+
+Run from the repository root: python -m benchmarks.svg_loading [variant configs...]
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+from lxml import etree
+
+from diplomacy.map_parser.vector.utils import load_svg
+
+
+def measure(how: str, svg_file: str, layer_ids: set[str]) -> tuple[float, int, int]:
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if how == "etree.parse":
+        svg = etree.parse(svg_file)
+    elif how == "load_svg":
+        svg = load_svg(svg_file)
+    else:
+        svg = load_svg(svg_file, layer_ids)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    return elapsed, peak, sum(1 for _ in svg.iter())
+
+
+def main():
+    config_files = [f"config/{name}" for name in sys.argv[1:]] or sorted(glob.glob("config/*.json"))
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for config_file in config_files:
+            with open(config_file, "r") as f:
+                data = json.load(f)
+            if not os.path.isfile(data["file"]):
+                continue
+            layer_ids = {value for value in data["svg config"].values() if isinstance(value, str)}
+            print(f"{data['file']} ({os.path.getsize(data['file']) / 1024 / 1024:.1f}MiB):")
+            for how in ("etree.parse", "load_svg", "load_svg layers"):
+                elapsed, peak, elements = pool.apply(measure, (how, data["file"], layer_ids))
+                print(f"    {how: <16} {elapsed * 1000: >8.1f}ms {peak / 1024: >8.1f}MiB peak {elements: >8} elements")
+
+
+if __name__ == "__main__":
+    main()
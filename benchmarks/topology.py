@@ -0,0 +1,55 @@
+"""
+Times building boards of a variant with Parser.parse(), and measures how much memory each one takes on top of the
+topology every board of the variant shares. Also checks that two boards share their topology but not their state.
+
+Run from the repository root: python -m benchmarks.topology [variant config] [boards]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from diplomacy.map_parser.vector.vector import Parser
+
+
+def main():
+    datafile = sys.argv[1] if len(sys.argv) > 1 else "impdip.json"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    parser = Parser(datafile)
+    first = parser.parse()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    boards = [parser.parse() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # touching every adjacency resolves it, which is what an adjudication or a map drawing ends up doing
+    start = time.perf_counter()
+    for board in boards:
+        for province in board.provinces:
+            province.adjacent
+            for coast in province.coasts:
+                coast.adjacent_seas
+                coast.adjacent_coasts
+    resolve_time = time.perf_counter() - start
+
+    print(
+        f"{datafile}: {len(first.provinces)} provinces, {elapsed / count * 1000:.2f}ms and {size / count / 1024:.1f}KiB "
+        f"per board, {resolve_time / count * 1000:.2f}ms to resolve its adjacencies"
+    )
+
+    second = boards[0]
+    province = next(iter(first.provinces))
+    other = second.get_province(province.name)
+    shared = province.topology is other.topology and province.geometry is other.geometry
+    independent = province is not other and all(
+        adjacent in second.provinces or adjacent.type.name == "IMPASSIBLE" for adjacent in other.adjacent
+    )
+    print(f"topology shared: {shared}, state independent: {independent}")
+
+
+if __name__ == "__main__":
+    main()
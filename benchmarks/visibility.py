@@ -0,0 +1,121 @@
+"""
+Times fog of war visibility for every player against the old loop over every province and unit, and
+checks that both give the same provinces, at the start and after units have been moved, created and destroyed and
+centers have changed hands at random, both through the Board's methods and directly as the adjudicator does. Runs on a
+board RasterParser builds from synthetic images, and on every variant whose SVG is present.
+
+Run from the repository root: python -m benchmarks.visibility [synthetic provinces] [rounds]
+"""
+
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarks.raster import make_images
+from diplomacy.map_parser.raster.raster_input import RasterParser, get_map_data
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.player import Player
+from diplomacy.persistence.province import Province, ProvinceType, get_adjacent_provinces
+from diplomacy.persistence.unit import UnitType
+
+
+def legacy_get_visible_provinces(board: Board, player: Player) -> set[Province]:
+    visible: set[Province] = set()
+    for province in board.provinces:
+        for unit in player.units:
+            if unit.unit_type == UnitType.ARMY:
+                if province in get_adjacent_provinces(unit.province) and province.type != ProvinceType.SEA:
+                    visible.add(province)
+            if unit.unit_type == UnitType.FLEET:
+                if (unit.coast and province in get_adjacent_provinces(unit.coast)) or (
+                    not unit.coast and province in get_adjacent_provinces(unit.province)
+                ):
+                    visible.add(province)
+
+    for unit in player.units:
+        visible.add(unit.province)
+
+    for province in player.centers:
+        if province.core == player:
+            visible.update(province.adjacent)
+        visible.add(province)
+
+    return visible
+
+
+def shuffle(board: Board, rng: random.Random):
+    players = sorted(board.players, key=lambda player: player.name)
+    units = sorted(board.units, key=lambda unit: unit.province.name)
+    empty = sorted((province for province in board.provinces if province.unit is None), key=lambda p: p.name)
+    for unit in rng.sample(units, len(units) // 4):
+        if not empty:
+            break
+        destination = empty.pop(rng.randrange(len(empty)))
+        if unit.unit_type == UnitType.FLEET and destination.coasts:
+            location = rng.choice(sorted(destination.coasts, key=lambda coast: coast.name))
+        elif unit.unit_type == UnitType.ARMY and destination.type != ProvinceType.SEA:
+            location = destination
+        else:
+            continue
+        if rng.random() < 0.5:
+            board.move_unit(unit, location)
+        else:
+            # the adjudicator moves units itself
+            unit.province.unit = None
+            unit.province = destination
+            unit.coast = None if location is destination else location
+            destination.unit = unit
+    for unit in rng.sample(sorted(board.units, key=lambda unit: unit.province.name), len(board.units) // 10):
+        board.delete_unit(unit.province)
+    for province in rng.sample(empty, min(len(empty), 5)):
+        if province.type != ProvinceType.SEA:
+            board.create_unit(UnitType.ARMY, rng.choice(players), province, None, None)
+    centers = sorted((province for province in board.provinces if province.has_supply_center), key=lambda p: p.name)
+    for province in rng.sample(centers, len(centers) // 5):
+        board.change_owner(province, rng.choice(players + [None]))
+        if rng.random() < 0.3:
+            province.core = province.owner
+
+
+def check(label: str, board: Board, rounds: int):
+    rng = random.Random(0)
+    legacy_time = found_time = 0.0
+    different = 0
+    for _ in range(rounds):
+        for player in board.players:
+            start = time.perf_counter()
+            expected = legacy_get_visible_provinces(board, player)
+            legacy_time += time.perf_counter() - start
+            start = time.perf_counter()
+            found = board.get_visible_provinces(player)
+            found_time += time.perf_counter() - start
+            different += expected != found
+        shuffle(board, rng)
+
+    queries = rounds * len(board.players)
+    print(
+        f"{label}: {len(board.provinces)} provinces, {len(board.units)} units, {len(board.players)} players, "
+        f"{legacy_time / queries * 1000:.2f}ms before {found_time / queries * 1000:.3f}ms now per query, "
+        f"{different} of {queries} different"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    check("synthetic", RasterParser(get_map_data(*make_images(count, 1600))).parse(), rounds)
+    for config_file in sorted(glob.glob("config/*.json")):
+        with open(config_file, "r") as f:
+            data = json.load(f)
+        if not os.path.isfile(data["file"]):
+            continue
+        check(data["file"], Parser(os.path.basename(config_file)).parse(), rounds)
+
+
+if __name__ == "__main__":
+    main()
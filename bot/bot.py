@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import re
@@ -93,6 +94,10 @@ async def before_any_command(ctx):
     # mark the message as seen
     await ctx.message.add_reaction("👍")
 
+    if not manager.variants_ready.is_set() and ctx.guild.id in manager.list_servers():
+        # loading this server's board would parse its variant again while the warm-up is still doing that
+        await asyncio.to_thread(manager.variants_ready.wait)
+
 
 @bot.after_invoke
 async def after_any_command(ctx: discord.ext.commands.Context):
@@ -906,6 +911,15 @@ async def delete_game(ctx: commands.Context) -> None:
     await command.delete_game(ctx, manager)
 
 
+@bot.command(
+    brief="Archives a finished game",
+    description="Moves the game's history out of the live database. Its maps can still be viewed, but it can't be changed.",
+)
+@gm_only("archive the game")
+async def archive_game(ctx: commands.Context) -> None:
+    await command.archive_game(ctx, manager)
+
+
 @bot.command(brief="Changes your nickname")
 async def nick(ctx: commands.Context) -> None:
     await command.nick(ctx, manager)
@@ -939,6 +953,10 @@ async def exec_py(ctx: commands.Context) -> None:
 def run():
     token = os.getenv("DISCORD_TOKEN")
     if token:
-        bot.run(token)
+        manager.warm_up_variants()
+        try:
+            bot.run(token)
+        finally:
+            manager.shutdown()
     else:
         raise RuntimeError("The DISCORD_TOKEN environment variable is not set")
@@ -218,10 +218,7 @@ async def fish(ctx: commands.Context, manager: Manager) -> None:
         fish_message = f"You find nothing but barren water and overfished seas, maybe let the population recover?"
     fish_message += f"\nIn total, {board.fish} fish have been caught!"
     if random.randrange(0, 5) == 0:
-        get_connection().execute_arbitrary_sql(
-            """UPDATE boards SET fish=? WHERE board_id=? AND phase=?""",
-            (board.fish, board.board_id, board.get_phase_and_year_string()),
-        )
+        get_connection().save_fish(board)
 
     if debumblify:
         temporary_bumbles.remove(ctx.author.name)
@@ -231,30 +228,28 @@ async def fish(ctx: commands.Context, manager: Manager) -> None:
 
 
 async def global_leaderboard(ctx: commands.Context, manager: Manager) -> None:
+    fish_by_board = manager.get_fish()
     sorted_boards = sorted(
-        manager._boards.items(), key=lambda board: board[1].fish, reverse=True
+        fish_by_board.items(), key=lambda board: board[1], reverse=True
     )
-    raw_boards = tuple(map(lambda b: b[1], sorted_boards))
-    try:
-        this_board = manager.get_board(ctx.guild.id)
-    except:
-        this_board = None
+    raw_ids = tuple(map(lambda b: b[0], sorted_boards))
+    this_id = ctx.guild.id if ctx.guild.id in raw_ids else None
     sorted_boards = sorted_boards[:9]
     text = ""
-    if this_board is not None:
-        index = str(raw_boards.index(this_board) + 1)
+    if this_id is not None:
+        index = str(raw_ids.index(this_id) + 1)
     else:
         index = "NaN"
 
-    max_fishes = len(str(sorted_boards[0][1].fish))
+    max_fishes = len(str(sorted_boards[0][1]))
 
     for i, board in enumerate(sorted_boards):
-        bold = "**" if this_board == board[1] else ""
+        bold = "**" if this_id == board[0] else ""
         guild = ctx.bot.get_guild(board[0])
         if guild:
-            text += f"\\#{i + 1: >{len(index)}} | {board[1].fish: <{max_fishes}} | {bold}{guild.name}{bold}\n"
-    if this_board is not None and this_board not in raw_boards[:9]:
-        text += f"\n\\#{index} | {this_board.fish: <{max_fishes}} | {ctx.guild.name}"
+            text += f"\\#{i + 1: >{len(index)}} | {board[1]: <{max_fishes}} | {bold}{guild.name}{bold}\n"
+    if this_id is not None and this_id not in raw_ids[:9]:
+        text += f"\n\\#{index} | {fish_by_board[this_id]: <{max_fishes}} | {ctx.guild.name}"
 
     await send_message_and_file(
         channel=ctx.channel, title="Global Fishing Leaderboard", message=text
@@ -369,8 +364,7 @@ async def announce(ctx: commands.Context, manager: Manager) -> None:
 
         message += f"\n- {server.name}"
         if server.id in guilds_with_games:
-            board = manager.get_board(server.id)
-            message += f" - {board.phase.name} {board.get_year_str()}"
+            message += f" - {manager.get_phase_str(server.id)}"
         else:
             message += f" - no active game"
 
@@ -420,8 +414,7 @@ async def servers(ctx: commands.Context, manager: Manager) -> None:
 
         if server.id in servers_with_games:
             servers_with_games.remove(server.id)
-            board = manager.get_board(server.id)
-            board_state = f" - {board.phase.name} {board.get_year_str()}"
+            board_state = f" - {manager.get_phase_str(server.id)}"
         else:
             board_state = f" - no active game"
 
@@ -1103,6 +1096,12 @@ async def delete_game(ctx: commands.Context, manager: Manager) -> None:
     await send_message_and_file(channel=ctx.channel, title="Deleted game")
 
 
+async def archive_game(ctx: commands.Context, manager: Manager) -> None:
+    message = manager.archive(ctx.guild.id)
+    log_command(logger, ctx, message=message)
+    await send_message_and_file(channel=ctx.channel, title=message)
+
+
 async def info(ctx: commands.Context, manager: Manager) -> None:
     try:
         board = manager.get_board(ctx.guild.id)
@@ -2257,6 +2256,6 @@ async def exec_py(ctx: commands.Context, manager: Manager) -> None:
 
     if embed_print.text:
         await send_message_and_file(channel=ctx.channel, message=embed_print.text)
-    manager._database.delete_board(board)
-
-    manager._database.save_board(ctx.guild.id, board)
+    with manager._database.transaction():
+        manager._database.delete_board(board)
+        manager._database.save_board(ctx.guild.id, board)
@@ -5,7 +5,7 @@ from bot.utils import get_unit_type, get_keywords
 from diplomacy.adjudicator.mapper import Mapper
 from diplomacy.persistence import phase
 from diplomacy.persistence.board import Board
-from diplomacy.persistence.db.database import get_connection
+from diplomacy.persistence.db.database import get_connection, get_phase_id
 from diplomacy.persistence.unit import UnitType
 
 _set_phase_str = "set phase"
@@ -109,22 +109,30 @@ def _parse_command(command: str, board: Board) -> None:
 
 
 def _set_phase(keywords: list[str], board: Board) -> None:
-    old_phase_string = board.get_phase_and_year_string()
+    old_phase_id = get_phase_id(board)
     new_phase = phase.get(keywords[0])
     if new_phase is None:
         raise ValueError(f"{keywords[0]} is not a valid phase name")
     board.phase = new_phase
     get_connection().execute_arbitrary_sql(
         "UPDATE boards SET phase=? WHERE board_id=? and phase=?",
-        (board.get_phase_and_year_string(), board.board_id, old_phase_string),
+        (get_phase_id(board), board.board_id, old_phase_id),
+    )
+    get_connection().execute_arbitrary_sql(
+        "UPDATE boards SET base_phase=? WHERE board_id=? and base_phase=?",
+        (get_phase_id(board), board.board_id, old_phase_id),
+    )
+    get_connection().execute_arbitrary_sql(
+        "UPDATE current_board SET phase=? WHERE board_id=? and phase=?",
+        (get_phase_id(board), board.board_id, old_phase_id),
     )
     get_connection().execute_arbitrary_sql(
         "UPDATE provinces SET phase=? WHERE board_id=? and phase=?",
-        (board.get_phase_and_year_string(), board.board_id, old_phase_string),
+        (get_phase_id(board), board.board_id, old_phase_id),
     )
     get_connection().execute_arbitrary_sql(
         "UPDATE units SET phase=? WHERE board_id=? and phase=?",
-        (board.get_phase_and_year_string(), board.board_id, old_phase_string),
+        (get_phase_id(board), board.board_id, old_phase_id),
     )
 
 
@@ -132,20 +140,14 @@ def _set_province_core(keywords: list[str], board: Board) -> None:
     province = board.get_province(keywords[0])
     player = board.get_player(keywords[1])
     province.core = player
-    get_connection().execute_arbitrary_sql(
-        "UPDATE provinces SET core=? WHERE board_id=? and phase=? and province_name=?",
-        (player.name if player is not None else None, board.board_id, board.get_phase_and_year_string(), province.name),
-    )
+    get_connection().save_province(board, province)
 
 
 def _set_province_half_core(keywords: list[str], board: Board) -> None:
     province = board.get_province(keywords[0])
     player = board.get_player(keywords[1])
     province.half_core = player
-    get_connection().execute_arbitrary_sql(
-        "UPDATE provinces SET half_core=? WHERE board_id=? and phase=? and province_name=?",
-        (player.name if player is not None else None, board.board_id, board.get_phase_and_year_string(), province.name),
-    )
+    get_connection().save_province(board, province)
 
 
 def _set_player_color(keywords: list[str], board: Board) -> None:
@@ -165,10 +167,7 @@ def _set_province_owner(keywords: list[str], board: Board) -> None:
     province = board.get_province(keywords[0])
     player = board.get_player(keywords[1])
     board.change_owner(province, player)
-    get_connection().execute_arbitrary_sql(
-        "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
-        (player.name if player is not None else None, board.board_id, board.get_phase_and_year_string(), province.name),
-    )
+    get_connection().save_province(board, province)
 
 
 def _create_unit(keywords: list[str], board: Board) -> None:
@@ -182,12 +181,12 @@ def _create_unit(keywords: list[str], board: Board) -> None:
         "ON CONFLICT (board_id, phase, location, is_dislodged) DO UPDATE SET owner=?, is_army=?",
         (
             board.board_id,
-            board.get_phase_and_year_string(),
-            unit.location().name,
+            get_phase_id(board),
+            get_connection().get_location_id(unit.location().name),
             False,
-            player.name,
+            get_connection().get_player_id(player.name),
             unit_type == UnitType.ARMY,
-            player.name,
+            get_connection().get_player_id(player.name),
             unit_type == UnitType.ARMY,
         ),
     )
@@ -208,19 +207,19 @@ def _create_dislodged_unit(keywords: list[str], board: Board) -> None:
             "ON CONFLICT (board_id, phase, location, is_dislodged) DO UPDATE SET owner=?, is_army=?",
             (
                 board.board_id,
-                board.get_phase_and_year_string(),
-                unit.location().name,
+                get_phase_id(board),
+                get_connection().get_location_id(unit.location().name),
                 True,
-                player.name,
+                get_connection().get_player_id(player.name),
                 unit_type == UnitType.ARMY,
-                player.name,
+                get_connection().get_player_id(player.name),
                 unit_type == UnitType.ARMY,
             ),
         )
         get_connection().executemany_arbitrary_sql(
             "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
             [
-                (board.board_id, board.get_phase_and_year_string(), unit.location().name, option.name)
+                (board.board_id, get_phase_id(board), get_connection().get_location_id(unit.location().name), get_connection().get_location_id(option.name))
                 for option in retreat_options
             ],
         )
@@ -233,7 +232,7 @@ def _delete_unit(keywords: list[str], board: Board) -> None:
     unit = board.delete_unit(province)
     get_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
-        (board.board_id, board.get_phase_and_year_string(), unit.location().name, False),
+        (board.board_id, get_phase_id(board), get_connection().get_location_id(unit.location().name), False),
     )
 
 
@@ -242,11 +241,11 @@ def _delete_dislodged_unit(keywords: list[str], board: Board) -> None:
     unit = board.delete_dislodged_unit(province)
     get_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
-        (board.board_id, board.get_phase_and_year_string(), unit.location().name, True),
+        (board.board_id, get_phase_id(board), get_connection().get_location_id(unit.location().name), True),
     )
     get_connection().execute_arbitrary_sql(
         "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
-        (board.board_id, board.get_phase_and_year_string(), unit.location().name),
+        (board.board_id, get_phase_id(board), get_connection().get_location_id(unit.location().name)),
     )
 
 
@@ -258,16 +257,16 @@ def _move_unit(keywords: list[str], board: Board) -> None:
     board.move_unit(unit, new_location)
     get_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
-        (board.board_id, board.get_phase_and_year_string(), old_location.name, False),
+        (board.board_id, get_phase_id(board), get_connection().get_location_id(old_location.name), False),
     )
     get_connection().execute_arbitrary_sql(
         "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
         (
             board.board_id,
-            board.get_phase_and_year_string(),
-            unit.location().name,
+            get_phase_id(board),
+            get_connection().get_location_id(unit.location().name),
             False,
-            unit.player.name,
+            get_connection().get_player_id(unit.player.name),
             unit.unit_type == UnitType.ARMY,
         ),
     )
@@ -288,7 +287,7 @@ def _dislodge_unit(keywords: list[str], board: Board) -> None:
         unit = board.delete_unit(province)
         get_connection().execute_arbitrary_sql(
             "UPDATE units SET is_dislodged = True where board_id=? and phase=? and location=?",
-            (board.board_id, board.get_phase_and_year_string(), province.name),
+            (board.board_id, get_phase_id(board), get_connection().get_location_id(province.name)),
         )
     else:
         raise RuntimeError("Cannot create a dislodged unit in move phase")
@@ -301,10 +300,7 @@ def _make_units_claim_provinces(keywords: list[str], board: Board) -> None:
     for unit in board.units:
         if claim_centers or not unit.province.has_supply_center:
             board.change_owner(unit.province, unit.player)
-            get_connection().execute_arbitrary_sql(
-                "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
-                (unit.player.name, board.board_id, board.get_phase_and_year_string(), unit.province.name),
-            )
+            get_connection().save_province(board, unit.province)
 
 def _set_player_points(keywords: list[str], board: Board) -> None:
     player = board.get_player(keywords[0])
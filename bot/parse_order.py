@@ -9,7 +9,7 @@ from bot.config import ERROR_COLOUR, PARTIAL_ERROR_COLOUR
 from bot.utils import get_unit_type, get_keywords, _manage_coast_signature, send_message_and_file
 from diplomacy.persistence import order, phase
 from diplomacy.persistence.board import Board
-from diplomacy.persistence.db.database import get_connection
+from diplomacy.persistence.db.database import get_connection, get_phase_id
 from diplomacy.persistence.player import Player
 from diplomacy.persistence.province import Province, Location, Coast, ProvinceType
 from diplomacy.persistence.unit import Unit, UnitType
@@ -395,7 +395,7 @@ def parse_remove_order(message: str, player_restriction: Player | None, board: B
     for province in provinces_with_removed_builds:
         database.execute_arbitrary_sql(
             "DELETE FROM builds WHERE board_id=? and phase=? and location=?",
-            (board.board_id, board.get_phase_and_year_string(), province),
+            (board.board_id, get_phase_id(board), database.get_location_id(province)),
         )
 
     if invalid:
@@ -475,7 +475,7 @@ def remove_player_order_for_location(board: Board, player: Player, location: Loc
             database = get_connection()
             database.execute_arbitrary_sql(
                 "DELETE FROM builds WHERE board_id=? and phase=? and location=?",
-                (board.board_id, board.get_phase_and_year_string(), player_order.location.name),
+                (board.board_id, get_phase_id(board), database.get_location_id(player_order.location.name)),
             )
             return True
     return False
@@ -486,5 +486,5 @@ def remove_relationship_order(board: Board, order: order.RelationshipOrder, play
     database = get_connection()
     database.execute_arbitrary_sql(
         "DELETE FROM vassal_orders WHERE board_id=? and phase=? and player=? and target_player=?",
-        (board.board_id, board.get_phase_and_year_string(), player.name, order.player.name)
+        (board.board_id, get_phase_id(board), database.get_player_id(player.name), database.get_player_id(order.player.name))
     )
\ No newline at end of file
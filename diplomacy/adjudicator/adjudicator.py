@@ -1,5 +1,4 @@
 import abc
-import collections
 import logging
 
 from diplomacy.adjudicator.defs import (
@@ -10,6 +9,7 @@ from diplomacy.adjudicator.defs import (
 )
 from diplomacy.persistence import phase
 from diplomacy.persistence.board import Board
+from diplomacy.persistence.graph import EdgeType
 from diplomacy.persistence.order import (
     Order,
     Hold,
@@ -43,41 +43,34 @@ logger = logging.getLogger(__name__)
 
 def convoy_is_possible(start: Province, end: Province, check_fleet_orders=False) -> bool:
     """
-    Breadth-first search to figure out if start -> end is possible passing over fleets
+    Breadth-first search over the map graph to figure out if start -> end is possible passing over fleets
 
     :param start: Start province
     :param end: End province
     :param check_fleet_orders: if True, check that the fleets along the way are actually convoying the unit
     :return: True if there are fleets connecting start -> end
     """
-    visited: set[str] = set()
-    to_visit = collections.deque()
-    to_visit.append(start)
-    while 0 < len(to_visit):
-        current = to_visit.popleft()
-
-        if current.name in visited:
-            continue
-        visited.add(current.name)
-
-        for adjacent_province in current.adjacent:
-            if adjacent_province == end:
-                return True
-            if adjacent_province.type != ProvinceType.SEA:
-                continue
-            if adjacent_province.unit is None or adjacent_province.unit.unit_type != UnitType.FLEET:
-                continue
-            if check_fleet_orders:
-                fleet_order = adjacent_province.unit.order
-                if fleet_order is None:
-                    continue
-                if not isinstance(fleet_order, ConvoyTransport):
-                    continue
-                if fleet_order.source is not start or fleet_order.destination is not end:
-                    continue
-            to_visit.append(adjacent_province)
-
-    return False
+    graph = start.graph
+    if end.graph is not graph:
+        return False
+
+    def passable(node: int) -> bool:
+        if not graph.sea[node]:
+            return False
+        unit = start.at(node).unit
+        if unit is None or unit.unit_type != UnitType.FLEET:
+            return False
+        if check_fleet_orders:
+            fleet_order = unit.order
+            if fleet_order is None:
+                return False
+            if not isinstance(fleet_order, ConvoyTransport):
+                return False
+            if fleet_order.source is not start or fleet_order.destination is not end:
+                return False
+        return True
+
+    return graph.reachable(start.node, end.node, EdgeType.PROVINCE, passable)
 
 
 def order_is_valid(location: Location, order: Order, strict_convoys_supports=False, strict_coast_movement=True) -> tuple[bool, str | None]:
@@ -661,28 +654,22 @@ class MovesAdjudicator(Adjudicator):
         return bounces_and_occupied
 
     def _adjudicate_convoys_for_order(self, order: AdjudicableOrder) -> Resolution:
-        # Breadth-first search to determine if there is a convoy connection for order.
+        # Breadth-first search over the map graph to determine if there is a convoy connection for order.
         # Only considers it a success if it passes through at least one fleet to get to the destination
         assert order.type == OrderType.MOVE
-        visited: set[str] = set()
-        to_visit = collections.deque()
-        to_visit.append(order.source_province)
-        while 0 < len(to_visit):
-            current = to_visit.popleft()
-            # Have to pass through at least one convoying fleet
-            if current != order.source_province and order.destination_province in current.adjacent:
-                return Resolution.SUCCEEDS
-
-            visited.add(current.name)
-
-            adjacent_convoys = {
-                convoy_order for convoy_order in order.convoys if convoy_order.current_province in current.adjacent
-            }
-            for convoy in adjacent_convoys:
-                if convoy.current_province.name in visited:
-                    continue
-                if self._resolve_order(convoy) == Resolution.SUCCEEDS:
-                    to_visit.append(convoy.current_province)
+        source = order.source_province
+        graph = source.graph
+        if order.destination_province.graph is not graph:
+            return Resolution.FAILS
+        convoys = {convoy_order.current_province.node: convoy_order for convoy_order in order.convoys}
+
+        def passable(node: int) -> bool:
+            convoy = convoys.get(node)
+            return convoy is not None and self._resolve_order(convoy) == Resolution.SUCCEEDS
+
+        # Have to pass through at least one convoying fleet
+        if graph.reachable(source.node, order.destination_province.node, EdgeType.PROVINCE, passable, min_steps=2):
+            return Resolution.SUCCEEDS
         return Resolution.FAILS
 
     def _adjudicate_order(self, order: AdjudicableOrder) -> Resolution:
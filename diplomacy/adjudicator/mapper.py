@@ -1,5 +1,6 @@
 import copy
 import itertools
+import os
 import re
 import sys
 from xml.etree.ElementTree import ElementTree, Element, register_namespace
@@ -12,7 +13,7 @@ import math
 # from diplomacy.adjudicator import utils
 # from diplomacy.map_parser.vector import config_svg as svgcfg
 
-from diplomacy.map_parser.vector.utils import get_element_color, get_svg_element, get_unit_coordinates, initialize_province_resident_data
+from diplomacy.map_parser.vector.utils import get_element_color, get_svg_element, get_unit_coordinates, initialize_province_resident_data, load_svg
 from diplomacy.persistence import phase
 from diplomacy.persistence.board import Board
 from diplomacy.persistence.db.database import logger
@@ -47,6 +48,19 @@ NAMESPACE: dict[str, str] = {
 # OUTPUTLAYER = "layer16"
 # UNITLAYER = "layer17"
 
+# every Mapper draws on its own copy, so each SVG is only parsed again when it changes on disk
+_board_svgs: dict[str, tuple[tuple[int, int], ElementTree]] = {}
+
+
+def _load_board_svg(svg_file: str) -> ElementTree:
+    stat = os.stat(svg_file)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _board_svgs.get(svg_file)
+    if cached is None or cached[0] != signature:
+        cached = (signature, load_svg(svg_file))
+        _board_svgs[svg_file] = cached
+    return copy.deepcopy(cached[1])
+
 
 # if you make any rendering changes,
 # make sure to sync them with mapper.js
@@ -59,7 +73,7 @@ class Mapper:
         register_namespace('xlink', "http://www.w3.org/1999/xlink")
         
         self.board: Board = board
-        self.board_svg: ElementTree = etree.parse(self.board.data["file"])
+        self.board_svg: ElementTree = _load_board_svg(self.board.data["file"])
         self.player_restriction: Player | None = None
 
         self._initialize_scoreboard_locations()
@@ -515,7 +529,8 @@ class Mapper:
             return []
         options = []
         new_checked = already_checked + (current,)
-        for possibility in current.adjacent:
+        for node in current.graph.neighbours(current.node):
+            possibility = current.at(node)
             if possibility not in self.adjacent_provinces:
                 continue
 
@@ -17,3 +17,9 @@ UNIT_COLOR_TYPE_MAP = {
     (182, 255, 0): "green",
     (255, 0, 221): "red",
 }
+
+# Province types above that aren't players
+NON_PLAYERS = {"ocean", "neutral", "impassable"}
+
+# Names of provinces by id (in the order they are labeled, row by row from the top left); unnamed ones use their id
+PROVINCE_NAMES: dict[int, str] = {}
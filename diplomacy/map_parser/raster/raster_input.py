@@ -1,46 +1,109 @@
+import logging
+import time
+
 import numpy as np
-from PIL import Image
+import shapely
 from scipy import ndimage
-from skimage.segmentation import expand_labels, find_boundaries
 
 from diplomacy.map_parser.raster.config import *
+from diplomacy.persistence import phase
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.player import Player
+from diplomacy.persistence.province import Province, ProvinceType
+from diplomacy.persistence.unit import Unit, UnitType
+
+logger = logging.getLogger(__name__)
 
 
-def read_map_data():
+def read_map_data() -> dict:
+    from PIL import Image
+
     provinces_image = np.asarray(Image.open(PROVINCES_IMAGE).convert("RGBA"))
     centers_image = np.asarray(Image.open(CENTERS_IMAGE).convert("RGBA"))
     armies_image = np.asarray(Image.open(ARMIES_IMAGE).convert("RGBA"))
     fleets_image = np.asarray(Image.open(FLEETS_IMAGE).convert("RGBA"))
+    return get_map_data(provinces_image, centers_image, armies_image, fleets_image)
+
 
+def get_map_data(provinces_image, centers_image, armies_image, fleets_image) -> dict:
     province_id_map, num_provinces = ndimage.label((provinces_image != BORDER_COLOR).any(-1), structure=np.ones((3, 3)))
     province_id_map_expanded = expand_labels(province_id_map, distance=6)
 
-    adjacencies = get_adjacencies(province_id_map_expanded, num_provinces)
-    province_owners = get_province_owners(provinces_image, province_id_map, num_provinces)
-    centers = get_centers(province_id_map, centers_image)
-    armies = get_units(province_id_map, armies_image)
-    fleets = get_units(province_id_map, fleets_image)
+    return {
+        "province_id_map": province_id_map,
+        "num_provinces": num_provinces,
+        "adjacencies": get_adjacencies(province_id_map_expanded, num_provinces),
+        "province_owners": get_province_owners(provinces_image, province_id_map, num_provinces),
+        "centers": get_centers(province_id_map, centers_image),
+        "armies": get_units(province_id_map, armies_image),
+        "fleets": get_units(province_id_map, fleets_image),
+    }
 
 
-def get_adjacencies(province_id_map_expanded, num_provinces):
-    adjacencies = {}
+def expand_labels(label_image, distance):
+    # the same as skimage.segmentation.expand_labels: every unlabeled pixel within distance of a label gets the nearest
+    distances, nearest = ndimage.distance_transform_edt(label_image == 0, return_indices=True)
+    expanded = label_image[tuple(nearest)]
+    expanded[distances > distance] = 0
+    return expanded
+
+
+def _rgba_to_int(image):
+    # big-endian, so the ints sort the same way np.unique(..., axis=0) sorts the RGBA rows
+    return np.ascontiguousarray(image, dtype=np.uint8).reshape(-1, 4).view(">u4").ravel().astype(np.uint64)
 
-    for province_id in range(1, num_provinces + 1):
-        boundaries = find_boundaries(province_id_map_expanded == province_id, mode="outer")
-        adjacencies[province_id] = np.setdiff1d(np.unique(province_id_map_expanded * boundaries), [0])
 
-    return adjacencies
+def _int_to_rgba(colors):
+    return np.atleast_1d(colors).astype(">u4").view(np.uint8).reshape(-1, 4)
+
+
+def _count_pairs(ids, values, num_ids):
+    """
+    How many times each value appears with each id (1 to num_ids), with the values of each id in ascending order, as
+    (values, counts, starts), where the values and counts of id i are at [starts[i - 1]:starts[i]].
+    """
+    keys, counts = np.unique((ids.astype(np.uint64) << np.uint64(32)) | values.astype(np.uint64), return_counts=True)
+    starts = np.searchsorted(keys >> np.uint64(32), np.arange(1, num_ids + 2, dtype=np.uint64))
+    return keys & np.uint64(0xFFFFFFFF), counts, starts
+
+
+def get_adjacencies(province_id_map_expanded, num_provinces):
+    # provinces are adjacent where a pixel of one is directly beside or above (not diagonal to) one of the other
+    pairs = []
+    for first, second in (
+        (province_id_map_expanded[:, :-1], province_id_map_expanded[:, 1:]),
+        (province_id_map_expanded[:-1, :], province_id_map_expanded[1:, :]),
+    ):
+        touching = (first != second) & (first != 0) & (second != 0)
+        pairs += [(first[touching], second[touching]), (second[touching], first[touching])]
+
+    ids = np.concatenate([first for first, _ in pairs])
+    neighbours = np.concatenate([second for _, second in pairs])
+    neighbours, _, starts = _count_pairs(ids, neighbours, num_provinces)
+    neighbours = neighbours.astype(province_id_map_expanded.dtype)
+    return {
+        province_id: neighbours[starts[province_id - 1] : starts[province_id]]
+        for province_id in range(1, num_provinces + 1)
+    }
 
 
 def get_province_owners(provinces, province_id_map, num_provinces):
     province_owners = {}
 
+    inside = province_id_map.ravel() != 0
+    colors, frequencies, starts = _count_pairs(
+        province_id_map.ravel()[inside], _rgba_to_int(provinces)[inside], num_provinces
+    )
     for province_id in range(1, num_provinces + 1):
-        colors, frequency = np.unique(provinces[province_id_map == province_id], return_counts=True, axis=0)
-        if len(colors) != 1:
-            print(f"Province #{province_id} is not one solid color: {colors} with frequency: {frequency}.")
+        start, end = starts[province_id - 1], starts[province_id]
+        frequency = frequencies[start:end]
+        if end - start != 1:
+            print(
+                f"Province #{province_id} is not one solid color: {_int_to_rgba(colors[start:end])} "
+                f"with frequency: {frequency}."
+            )
 
-        top_color = tuple(colors[np.argmax(frequency)][:3])
+        top_color = tuple(_int_to_rgba(colors[start + np.argmax(frequency)])[0][:3])
         assert (
             top_color in PROVINCE_COLOR_TYPE_MAP
         ), f"{top_color} is not in the color to province type dictionary (province #{province_id})."
@@ -60,22 +123,155 @@ def get_units(province_id_map, units_image):
     units = {}
 
     unit_id_map, num_units = ndimage.label((units_image[:, :, 3] != 0), structure=np.ones((3, 3)))
+    in_unit = unit_id_map.ravel() != 0
+    unit_ids = unit_id_map.ravel()[in_unit]
+    province_ids, frequencies, province_starts = _count_pairs(unit_ids, province_id_map.ravel()[in_unit], num_units)
+    unit_colors, _, color_starts = _count_pairs(unit_ids, _rgba_to_int(units_image)[in_unit], num_units)
+
     for unit_id in range(1, num_units + 1):
-        province_ids, frequency = np.unique(province_id_map[unit_id_map == unit_id], return_counts=True)
-        province_id = province_ids[frequency.argmax()]
+        start, end = province_starts[unit_id - 1], province_starts[unit_id]
+        province_id = province_ids[start + frequencies[start:end].argmax()].astype(province_id_map.dtype)
 
-        unit_colors = np.unique(units_image[unit_id_map == unit_id], axis=0)
+        colors = _int_to_rgba(unit_colors[color_starts[unit_id - 1] : color_starts[unit_id]])
         unit_player = None
-        for color in unit_colors:
+        for color in colors:
             color = tuple(color[:3])
             if color in UNIT_COLOR_TYPE_MAP:
                 unit_player = UNIT_COLOR_TYPE_MAP[color]
                 break
-        assert unit_player is not None, f"Could not find player for unit {unit_id} with colors {unit_colors}"
+        assert unit_player is not None, f"Could not find player for unit {unit_id} with colors {colors}"
         units[province_id] = {"unit_number": unit_id, "player": unit_player}
 
     return units
 
 
+def get_geometries(province_id_map, num_provinces) -> list[shapely.Geometry]:
+    """The area of every province in pixel coordinates, made from the runs of its pixels along each row."""
+    height, width = province_id_map.shape
+    padded = np.zeros((height, width + 2), dtype=province_id_map.dtype)
+    padded[:, 1:-1] = province_id_map
+    # a run starts wherever a row changes from one id to another, and ends where the next one starts
+    rows, columns = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    in_row = rows[:-1] == rows[1:]
+    rows, starts, ends = rows[:-1][in_row], columns[:-1][in_row], columns[1:][in_row]
+    labels = province_id_map[rows, starts]
+    boxes = shapely.box(starts, rows, ends, rows + 1)
+
+    order = np.argsort(labels, kind="stable")
+    splits = np.searchsorted(labels[order], np.arange(1, num_provinces + 2))
+    return [
+        # the runs tile the province without overlapping, which coverage_union_all relies on
+        shapely.coverage_union_all(boxes[order[splits[province_id - 1] : splits[province_id]]])
+        for province_id in range(1, num_provinces + 1)
+    ]
+
+
+class RasterParser:
+    """
+    Builds boards from a variant drawn as images rather than an SVG, the same way Parser.parse() does. Provinces are
+    named by PROVINCE_NAMES, or after their ids (in the order ndimage.label finds them) when they aren't in there.
+    """
+
+    def __init__(self, map_data: dict | None = None):
+        self._map_data = map_data
+
+    def parse(self) -> Board:
+        start = time.time()
+        if self._map_data is None:
+            self._map_data = read_map_data()
+        map_data = self._map_data
+
+        owners = map_data["province_owners"]
+        player_colors = {name: color for color, name in PROVINCE_COLOR_TYPE_MAP.items() if name not in NON_PLAYERS}
+        players = {
+            name: Player(name, "%02x%02x%02x" % color, "classic", 0, 0, set(), set())
+            for name, color in player_colors.items()
+        }
+
+        geometries = get_geometries(map_data["province_id_map"], map_data["num_provinces"])
+        coordinates = shapely.get_coordinates(shapely.point_on_surface(geometries))
+        provinces: dict[int, Province] = {}
+        for province_id, geometry in enumerate(geometries, start=1):
+            owner = owners[province_id]
+            if owner == "ocean":
+                province_type = ProvinceType.SEA
+            elif owner == "impassable":
+                province_type = ProvinceType.IMPASSIBLE
+            else:
+                province_type = ProvinceType.LAND
+            x, y = coordinates[province_id - 1]
+            coordinate = (float(x), float(y))
+            provinces[province_id] = Province(
+                PROVINCE_NAMES.get(province_id, str(province_id)),
+                geometry,
+                coordinate,
+                coordinate,
+                province_type,
+                province_id in map_data["centers"],
+                set(),
+                set(),
+                None,
+                players.get(owner),
+                None,
+            )
+            provinces[province_id].all_locs = provinces[province_id].all_rets = (coordinate,)
+
+        for province_id, adjacent in map_data["adjacencies"].items():
+            for other in adjacent:
+                provinces[province_id].set_adjacent(provinces[other])
+        for province in provinces.values():
+            province.set_coasts()
+        for province in provinces.values():
+            for coast in province.coasts:
+                coast.primary_unit_coordinate = coast.retreat_unit_coordinate = province.primary_unit_coordinate
+                coast.all_locs = coast.all_rets = province.all_locs
+                coast.set_adjacent_coasts()
+
+        for province in provinces.values():
+            if province.has_supply_center and province.owner is not None:
+                province.core = province.owner
+                province.owner.centers.add(province)
+
+        units: set[Unit] = set()
+        for unit_type, placed in ((UnitType.ARMY, map_data["armies"]), (UnitType.FLEET, map_data["fleets"])):
+            for province_id, data in placed.items():
+                if province_id == 0:
+                    logger.warning(f"Unit #{data['unit_number']} isn't on a province, ignoring it")
+                    continue
+                province = provinces[province_id]
+                player = players[data["player"]]
+                coast = province.coast() if unit_type == UnitType.FLEET and province.coasts else None
+                unit = Unit(unit_type, player, province, coast, None)
+                province.unit = unit
+                player.units.add(unit)
+                units.add(unit)
+
+        # the classic victory condition, more than half of the centers
+        victory_count = len(map_data["centers"]) // 2 + 1
+        for player in players.values():
+            player.vscc = victory_count
+            player.iscc = len(player.centers)
+
+        data = {
+            "name": "raster",
+            "players": {name: {"color": player.default_color} for name, player in players.items()},
+            "victory_conditions": "classic",
+            "victory_count": victory_count,
+        }
+        board = Board(
+            set(players.values()),
+            {province for province in provinces.values() if province.type != ProvinceType.IMPASSIBLE},
+            units,
+            phase.initial(),
+            data,
+            None,
+            False,
+        )
+        logger.info(f"map_parser.raster.parse: {time.time() - start}s")
+        return board
+
+
 if __name__ == "__main__":
-    read_map_data()
+    start = time.time()
+    board = RasterParser().parse()
+    print(f"{len(board.provinces)} provinces and {len(board.units)} units in {time.time() - start:.2f}s")
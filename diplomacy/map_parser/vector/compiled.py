@@ -0,0 +1,343 @@
+import hashlib
+import logging
+import os
+import pickle
+import re
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where concurrent first builds each compile the variant; the atomic rename in
+    # save_compiled still means that none of them can read a half written artifact
+    fcntl = None
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.graph import EdgeType, MapGraph
+from diplomacy.persistence.player import Player
+from diplomacy.persistence.province import (
+    Coast,
+    CoastTopology,
+    Location,
+    LocationTopology,
+    Province,
+    ProvinceTopology,
+    ProvinceType,
+)
+from diplomacy.persistence.unit import Unit, UnitType
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the layout of the compiled artifact (or the way the parser fills it in) changes,
+# so that artifacts written by older code are rebuilt instead of trusted
+COMPILED_VERSION = 3
+
+COMPILED_DIR = os.getenv("compiled_variants_dir", "cache")
+
+
+def get_source_signature(config_file: str, svg_file: str) -> tuple:
+    """Cheap stat-based signature used to notice that an input file changed without rehashing it."""
+    signature = []
+    for file in (config_file, svg_file):
+        try:
+            stat = os.stat(file)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def get_variant_hash(config_file: str, svg_file: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"compiled-v{COMPILED_VERSION}".encode())
+    for file in (config_file, svg_file):
+        with open(file, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def get_compiled_path(datafile: str, variant_hash: str) -> str:
+    name = os.path.splitext(os.path.basename(datafile))[0]
+    return os.path.join(COMPILED_DIR, f"{name}.{variant_hash[:16]}.compiled")
+
+
+def load_compiled(path: str, variant_hash: str) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            compiled = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as ex:
+        logger.warning(f"Ignoring unreadable compiled variant {path}", exc_info=ex)
+        return None
+
+    if compiled.get("version") != COMPILED_VERSION or compiled.get("hash") != variant_hash:
+        logger.info(f"Compiled variant {path} is stale, rebuilding")
+        return None
+    return compiled
+
+
+def save_compiled(path: str, compiled: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # write to a temporary file first so that a crash never leaves a truncated artifact behind
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+    # artifacts for older versions of the same variant are never read again
+    directory = os.path.dirname(path) or "."
+    name = os.path.basename(path)
+    older = re.compile(rf"{re.escape(name.rsplit('.', 2)[0])}\.[0-9a-f]{{16}}\.compiled(\.lock)?")
+    for file in os.listdir(directory):
+        if older.fullmatch(file) and not file.startswith(name):
+            try:
+                os.remove(os.path.join(directory, file))
+            except OSError:
+                pass
+
+
+@contextmanager
+def compile_lock(path: str):
+    """
+    Held while the artifact at path is built, so that processes which start at the same time compile a variant once
+    instead of each of them. Whoever gets it second should check whether the artifact exists by then.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _name(value) -> str | None:
+    return None if value is None else value.name
+
+
+def _compile_location(location: Province | Coast) -> dict:
+    return {
+        "name": location.name,
+        "primary_unit_coordinate": location.primary_unit_coordinate,
+        "retreat_unit_coordinate": location.retreat_unit_coordinate,
+        "all_locs": tuple(location.all_locs),
+        "all_rets": tuple(location.all_rets),
+    }
+
+
+def compile_board(board: Board, variant_hash: str) -> dict:
+    """Flattens a freshly parsed board into plain data that can be turned back into a Board without the SVG."""
+    provinces = []
+    impassibles: dict[str, Province] = {}
+    for province in board.provinces:
+        record = _compile_location(province)
+        record.update(
+            {
+                "type": province.type.name,
+                "geometry": province.geometry,
+                "has_supply_center": province.has_supply_center,
+                "adjacent": tuple(adjacent.name for adjacent in province.adjacent),
+                "impassible_adjacent": tuple(adjacent.name for adjacent in province.impassible_adjacent),
+                "nonadjacent_coasts": tuple(province.nonadjacent_coasts),
+                "owner": _name(province.owner),
+                "core": _name(province.core),
+                "half_core": _name(province.half_core),
+                "coasts": [],
+            }
+        )
+        for coast in province.coasts:
+            coast_record = _compile_location(coast)
+            coast_record["adjacent_seas"] = tuple(sea.name for sea in coast.adjacent_seas)
+            coast_record["adjacent_coasts"] = tuple(other.name for other in coast.adjacent_coasts)
+            record["coasts"].append(coast_record)
+        provinces.append(record)
+        for impassible in province.impassible_adjacent:
+            impassibles[impassible.name] = impassible
+
+    players = [
+        {
+            "name": player.name,
+            "color": player.color_dict if player.color_dict is not None else player.default_color,
+            "win_type": player.win_type,
+            "vscc": player.vscc,
+            "iscc": player.iscc,
+            "centers": tuple(center.name for center in player.centers),
+        }
+        for player in board.players
+    ]
+
+    units = [
+        {
+            "type": unit.unit_type.value,
+            "player": unit.player.name,
+            "province": unit.province.name,
+            "coast": _name(unit.coast),
+        }
+        for unit in board.units
+    ]
+
+    return {
+        "version": COMPILED_VERSION,
+        "hash": variant_hash,
+        "initial_phase": board.phase.name,
+        "players": players,
+        "provinces": provinces,
+        "impassibles": [
+            {"name": impassible.name, "geometry": impassible.geometry} for impassible in impassibles.values()
+        ],
+        "units": units,
+    }
+
+
+def _set_coordinates(location: LocationTopology, record: dict, coordinates: dict) -> None:
+    # most locations have a single place for a unit, so a tuple of the one coordinate (which coordinates makes every
+    # location that uses it share) takes much less than a set would
+    def intern(coordinate):
+        return None if coordinate is None else coordinates.setdefault(coordinate, coordinate)
+
+    location.primary_unit_coordinate = intern(location.primary_unit_coordinate)
+    location.retreat_unit_coordinate = intern(location.retreat_unit_coordinate)
+    location.all_locs = tuple(intern(coordinate) for coordinate in dict.fromkeys(record["all_locs"]))
+    location.all_rets = tuple(intern(coordinate) for coordinate in dict.fromkeys(record["all_rets"]))
+
+
+def _build_graph(topology: dict[str, ProvinceTopology]) -> MapGraph:
+    # numbers every province that isn't impassible and then every coast, and gives each its node of the variant's graph
+    provinces = [province for province in topology.values() if province.type != ProvinceType.IMPASSIBLE]
+    coasts = [coast for province in provinces for coast in province.coasts]
+    locations: list[LocationTopology] = [*provinces, *coasts]
+    nodes = {location.name: node for node, location in enumerate(locations)}
+    province_of = [nodes[province.name] for province in provinces]
+    province_of += [nodes[province.name] for province in provinces for _ in province.coasts]
+    no_edges = [[] for _ in coasts]
+
+    def split(adjacent: tuple[str, ...], sea: bool) -> list[int]:
+        return [nodes[name] for name in adjacent if (topology[name].type == ProvinceType.SEA) == sea]
+
+    graph = MapGraph(
+        [location.name for location in locations],
+        [province.type == ProvinceType.SEA for province in provinces] + [False] * len(coasts),
+        province_of,
+        {
+            EdgeType.LAND: [split(province.adjacent, False) for province in provinces] + no_edges,
+            EdgeType.SEA: [split(province.adjacent, True) for province in provinces] + no_edges,
+            EdgeType.COAST: [[] for _ in provinces]
+            + [[nodes[name] for name in (*coast.adjacent_seas, *coast.adjacent_coasts)] for coast in coasts],
+        },
+    )
+    for node, location in enumerate(locations):
+        location.graph = graph
+        location.node = node
+    return graph
+
+
+def build_topology(compiled: dict) -> dict[str, ProvinceTopology]:
+    """
+    The topology of every province of a compiled variant, impassible ones included, by name, with the map graph its
+    locations are nodes of. It is built once per variant and shared by every board built from it.
+    """
+    topology: dict[str, ProvinceTopology] = {}
+    coordinates: dict[tuple[float, float], tuple[float, float]] = {}
+    impassible_adjacent: dict[str, list[str]] = {}
+    for record in compiled["impassibles"]:
+        topology[record["name"]] = ProvinceTopology(
+            record["name"], record["geometry"], None, None, ProvinceType.IMPASSIBLE, False
+        )
+        impassible_adjacent[record["name"]] = []
+
+    for record in compiled["provinces"]:
+        province = ProvinceTopology(
+            record["name"],
+            record["geometry"],
+            record["primary_unit_coordinate"],
+            record["retreat_unit_coordinate"],
+            ProvinceType[record["type"]],
+            record["has_supply_center"],
+        )
+        _set_coordinates(province, record, coordinates)
+        province.nonadjacent_coasts = frozenset(record["nonadjacent_coasts"])
+        province.adjacent = tuple(record["adjacent"])
+        province.impassible_adjacent = tuple(record["impassible_adjacent"])
+        for name in record["impassible_adjacent"]:
+            impassible_adjacent[name].append(province.name)
+
+        coasts = []
+        for coast_record in record["coasts"]:
+            coast = CoastTopology(
+                coast_record["name"], coast_record["primary_unit_coordinate"], coast_record["retreat_unit_coordinate"]
+            )
+            _set_coordinates(coast, coast_record, coordinates)
+            coast.adjacent_seas = tuple(coast_record["adjacent_seas"])
+            coast.adjacent_coasts = tuple(coast_record["adjacent_coasts"])
+            coasts.append(coast)
+        province.coasts = tuple(coasts)
+        topology[province.name] = province
+
+    for name, adjacent in impassible_adjacent.items():
+        topology[name].adjacent = tuple(adjacent)
+
+    _build_graph(topology)
+    return topology
+
+
+def build_board(
+    compiled: dict, topology: dict[str, ProvinceTopology], data: dict, datafile: str, fow: bool, year_offset: int
+) -> Board:
+    """
+    Builds a fresh, independent Board for a new game or DB load from a compiled variant. Its provinces share topology
+    with every other board of the variant, so only their state is new.
+    """
+    players: dict[str, Player] = {}
+    for record in compiled["players"]:
+        players[record["name"]] = Player(
+            record["name"], record["color"], record["win_type"], record["vscc"], record["iscc"], set(), set()
+        )
+
+    def get_player(name: str | None) -> Player | None:
+        return None if name is None else players[name]
+
+    locations: dict[str, Location] = {}
+    for province_topology in topology.values():
+        province = Province.from_topology(province_topology, locations)
+        locations[province.name] = province
+        for coast in province.coasts:
+            locations[coast.name] = coast
+
+    provinces: set[Province] = set()
+    for record in compiled["provinces"]:
+        province = locations[record["name"]]
+        province.core = get_player(record["core"])
+        province.owner = get_player(record["owner"])
+        province.half_core = get_player(record["half_core"])
+        provinces.add(province)
+
+    for record in compiled["players"]:
+        players[record["name"]].centers.update(locations[name] for name in record["centers"])
+
+    units: set[Unit] = set()
+    for record in compiled["units"]:
+        player = players[record["player"]]
+        province = locations[record["province"]]
+        coast = None if record["coast"] is None else locations[record["coast"]]
+        unit = Unit(UnitType(record["type"]), player, province, coast, None)
+        province.unit = unit
+        player.units.add(unit)
+        units.add(unit)
+
+    return Board(
+        set(players.values()),
+        provinces,
+        units,
+        phase.get(compiled["initial_phase"]),
+        data,
+        datafile,
+        fow,
+        year_offset,
+    )
@@ -1,64 +1,97 @@
 import re
+from functools import lru_cache
 from xml.etree.ElementTree import Element
 import numpy as np
 
+_TRANSFORM_RE = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def _get_matrix(name: str, values: list[float]) -> np.ndarray:
+    x_dx, y_dx, x_dy, y_dy, x_c, y_c = 1, 0, 0, 1, 0, 0
+    if name == "matrix" and len(values) == 6:
+        x_dx, y_dx, x_dy, y_dy, x_c, y_c = values
+    elif name == "translate" and len(values) in (1, 2):
+        x_c = values[0]
+        y_c = values[1] if len(values) == 2 else 0
+    elif name == "scale" and len(values) in (1, 2):
+        x_dx = values[0]
+        y_dy = values[1] if len(values) == 2 else values[0]
+    elif name == "rotate" and len(values) in (1, 3):
+        angle = values[0] * np.pi / 180
+        cos = np.cos(angle)
+        sin = np.sin(angle)
+        x_dx, y_dx, x_dy, y_dy = cos, sin, -sin, cos
+        if len(values) == 3:
+            # rotating about (cx, cy) is moving it to the origin, rotating and moving it back
+            cx, cy = values[1:]
+            x_c = cx - cx * cos + cy * sin
+            y_c = cy - cx * sin - cy * cos
+    elif name == "skewX" and len(values) == 1:
+        x_dy = np.tan(values[0] * np.pi / 180)
+    elif name == "skewY" and len(values) == 1:
+        y_dx = np.tan(values[0] * np.pi / 180)
+    else:
+        raise Exception(f"Unknown transformation: {name}({', '.join(map(str, values))})")
+    # the matrix represents the tranformation from (x, y, const) to (x, y const)
+    # we preserve the const via a 1 so that convolutions work correctly
+    return np.array([
+        [x_dx, y_dx, 0],
+        [x_dy, y_dy, 0],
+        [x_c , y_c , 1]
+    ])
+
+
+@lru_cache(maxsize=None)
+def _parse_transform(transform_string: str) -> np.ndarray:
+    # the same transform attributes appear on many elements, so each distinct one is only parsed once
+    matrix = np.identity(3)
+    for name, arguments in _TRANSFORM_RE.findall(transform_string):
+        values = [float(value) for value in _NUMBER_RE.findall(arguments)]
+        # in "a(..) b(..)" b is applied first, and points are row vectors, so its matrix goes on the left
+        matrix = _get_matrix(name, values) @ matrix
+    if _TRANSFORM_RE.sub("", transform_string).strip(" ,\t\r\n"):
+        raise Exception(f"Unknown transformation: {transform_string}")
+    matrix.setflags(write=False)
+    return matrix
+
+
+@lru_cache(maxsize=4096)
+def _compose_transforms(transform_strings: tuple[str, ...]) -> np.ndarray:
+    # transform_strings go from the innermost element outwards, which is the order they apply in
+    matrix = np.identity(3)
+    for transform_string in transform_strings:
+        matrix = matrix @ _parse_transform(transform_string)
+    matrix.setflags(write=False)
+    return matrix
+
+
 class TransGL3:
     def __init__(self, transform_string: str | Element | None=None):
         if transform_string is None:
             transform_string = ""
         if not isinstance(transform_string, str):
             transform_string = transform_string.get("transform", "")
-        
-        x_dx = 1
-        y_dy = 1
-        x_dy = 0
-        y_dx = 0
-        x_c = 0
-        y_c = 0
-        transform_string = transform_string.strip()
-
-        if transform_string.startswith("matrix"):
-            match = re.search(r"matrix\((.*),(.*),(.*),(.*),(.*),(.*)\)", transform_string)
-            x_dx = float(match.group(1))
-            y_dx = float(match.group(2))
-            x_dy = float(match.group(3))
-            y_dy = float(match.group(4))
-            x_c = float(match.group(5))
-            y_c = float(match.group(6))
+        # shared between every TransGL3 of the same string, so it is never modified in place
+        self.matrix = _parse_transform(transform_string.strip())
 
-        elif transform_string.startswith("translate"):
-            match = re.search(r"translate\((.*),(.*)\)", transform_string)
-            x_c = float(match.group(1))
-            y_c = float(match.group(2))
-        elif transform_string.startswith("rotate"):
-            match = re.search(r"rotate\((.*),(.*),(.*)\)", transform_string)
-            if not match:
-                match = re.search(r"rotate\((.*)\)", transform_string)
-                coord = 0, 0
-            else:
-                coord = float(match.group(2)), float(match.group(3))
-            angle = float(match.group(1)) * np.pi / 180
-            pre = TransGL3().init(x_c=-coord[0], y_c=-coord[1])
-            post = TransGL3().init(x_c=coord[0], y_c=coord[1])
-            cos = np.cos(angle)
-            sin = np.sin(angle)
-            x_dx =  cos
-            y_dx =  sin
-            x_dy = -sin
-            y_dy =  cos
-
-        elif transform_string != "":
-            raise Exception(f"Unknown transformation: {transform_string}")
-        
-        # the matrix represents the tranformation from (x, y, const) to (x, y const)
-        # we preserve the const via a 1 so that convolutions work correctly
-        self.matrix = np.array([
-            [x_dx, y_dx, 0],
-            [x_dy, y_dy, 0],
-            [x_c , y_c , 1]
-        ])
-        if transform_string.startswith("rotate"):
-            self.matrix = pre.matrix @ self.matrix @ post.matrix
+    @classmethod
+    def for_element(cls, element: Element, up_to: Element | None = None) -> "TransGL3":
+        """
+        The transformation from element's coordinates into those of up_to's parent (or the document, if up_to is None),
+        i.e. the transforms of element and every ancestor up to and including up_to
+        """
+        transform_strings = []
+        while element is not None:
+            transform_string = element.get("transform")
+            if transform_string:
+                transform_strings.append(transform_string.strip())
+            if element is up_to:
+                break
+            element = element.getparent()
+        out = cls()
+        out.matrix = _compose_transforms(tuple(transform_strings))
+        return out
 
     # this is so that functions can create TransGL3 with specific values, not from an element
     def init(self, x_dx=1, y_dy=1, x_dy=0, y_dx=0, x_c=0, y_c=0):
@@ -70,11 +103,20 @@ class TransGL3:
         return self
 
     def transform(self, point: tuple[float, float]) -> tuple[float, float]:
-        point = np.concatenate((point, (1,)))
-        return tuple((point @ self.matrix)[:2].tolist())
+        (x_dx, y_dx, _), (x_dy, y_dy, _), (x_c, y_c, _) = self.matrix.tolist()
+        x, y = point
+        return (x * x_dx + y * x_dy + x_c, x * y_dx + y * y_dy + y_c)
+
+    def transform_points(self, points: np.ndarray, in_place: bool = False) -> np.ndarray:
+        """Transforms an Nx2 array of points with one matrix multiply, overwriting points if in_place is set"""
+        if not in_place:
+            return points @ self.matrix[:2, :2] + self.matrix[2, :2]
+        np.matmul(points, self.matrix[:2, :2], out=points)
+        points += self.matrix[2, :2]
+        return points
 
     # represents a convolution
-    # (t1 * t2).transform(p) == t1.transform(t2.transform(p))
+    # (t1 * t2).transform(p) == t2.transform(t1.transform(p))
     def __mul__(self, other):
         out = TransGL3()
         out.matrix = self.matrix @ other.matrix
@@ -1,3 +1,5 @@
+import re
+
 import numpy as np
 
 from xml.etree.ElementTree import Element, ElementTree
@@ -7,12 +9,60 @@ from diplomacy.persistence.player import Player
 from diplomacy.persistence.unit import UnitType
 import logging
 
-from shapely.geometry import Point
-from typing import Callable
+import shapely
+from lxml import etree
+from typing import Callable, Collection
 from diplomacy.persistence.province import Province
 
 logger = logging.getLogger(__name__)
 
+_INKSCAPE = "{http://www.inkscape.org/namespaces/inkscape}"
+_SODIPODI = "{http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd}"
+_EDITOR_NAMESPACES = (_INKSCAPE, _SODIPODI)
+# provinces are matched by their labels, unit types and positions are read from the polygons' sides and centres
+_KEPT_EDITOR_ATTRIBUTES = {
+    f"{_INKSCAPE}label",
+    f"{_INKSCAPE}groupmode",
+    f"{_SODIPODI}type",
+    f"{_SODIPODI}sides",
+    f"{_SODIPODI}cx",
+    f"{_SODIPODI}cy",
+}
+_METADATA_TAG = "{http://www.w3.org/2000/svg}metadata"
+
+
+def load_svg(svg_file: str, layer_ids: Collection[str] | None = None) -> ElementTree:
+    """
+    Parses svg_file without the editor data that nothing here reads: the metadata, Inkscape's and Sodipodi's elements,
+    and their attributes other than the few the parser relies on. If layer_ids is given, only the top-level elements
+    with those ids are kept, and every other layer is thrown away as soon as it is parsed.
+    """
+    root = None
+    # how deep into a layer that isn't kept the parser is, 0 when outside of one
+    skipping = 0
+    for event, element in etree.iterparse(svg_file, events=("start", "end"), huge_tree=True):
+        if event == "start":
+            if root is None:
+                root = element
+            elif skipping or (layer_ids is not None and element.getparent() is root and element.get("id") not in layer_ids):
+                skipping += 1
+            continue
+
+        parent = element.getparent()
+        if skipping:
+            # its children are gone already, so the layer never takes more memory than its deepest element
+            skipping -= 1
+            parent.remove(element)
+            continue
+        if parent is not None and (element.tag == _METADATA_TAG or element.tag.startswith(_EDITOR_NAMESPACES)):
+            parent.remove(element)
+            continue
+        for attribute in list(element.attrib):
+            if attribute.startswith(_EDITOR_NAMESPACES) and attribute not in _KEPT_EDITOR_ATTRIBUTES:
+                del element.attrib[attribute]
+    return etree.ElementTree(root)
+
+
 def get_svg_element(svg_root: ElementTree, element_id: str) -> Element:
     try:
         return svg_root.find(f'*[@id="{element_id}"]')
@@ -46,8 +96,7 @@ def get_unit_coordinates(
         # take the center of the bounding box
         for path in unit_data.findall("{http://www.w3.org/2000/svg}path"):
             pathstr = path.get("d")
-            coordinates = parse_path(pathstr, TransGL3(path))
-            coordinates = np.array(sum(coordinates, start = []))
+            coordinates = np.concatenate(parse_path(pathstr, TransGL3(path)))
             minp = np.min(coordinates, axis=0)
             maxp = np.max(coordinates, axis=0)
             return ((minp + maxp) / 2).tolist()
@@ -58,106 +107,133 @@ def get_unit_coordinates(
         return TransGL3(path).transform((x, y))
 
 
-def move_coordinate(
-    former_coordinate: tuple[float, float],
-    coordinate: tuple[float, float],
-) -> tuple[float, float]:
-    return (former_coordinate[0] + coordinate[0], former_coordinate[1] + coordinate[1])
-
-
-
-# returns:
-# new base_coordinate (= base_coordinate if not applicable),
-# new former_coordinate (= former_coordinate if not applicable),
-def _parse_path_command(
-    command: str,
-    args: list[tuple[float, float]],
-    coordinate: tuple[float, float],
-) -> tuple[tuple[float, float], tuple[float, float]]:
-    reset = command.isupper()
-    command = command.lower()
-
-    if command in ["m", "c", "l", "t", "s", "q", "a"]:
-        if reset:
-            coordinate = (0, 0)
-        return move_coordinate(coordinate, args[-1])  # Ignore all args except the last
-    elif command in ["h", "v"]:
-        coordinate = list(coordinate)
-        if command == "h":
-            index = 0
-        else:
-            index = 1
-        if reset:
-            coordinate[index] = 0
-        coordinate[index] += args[0][0]
-        return tuple(coordinate)
+# one number of an SVG path, e.g. 10, -.5, 1.5e-3
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_NUMBER_RE = re.compile(_NUMBER)
+_COMMAND_RE = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])")
+_SEPARATOR = r"[\s,]*"
+# the flags of an arc are a single 0 or 1 and may be written without anything separating them from what follows
+_ARC_RE = re.compile(
+    _SEPARATOR.join([f"({_NUMBER})"] * 3 + ["([01])"] * 2 + [f"({_NUMBER})"] * 2) + _SEPARATOR
+)
+# numbers written without a separator between them, like 1-2 or .5.5, which splitting on whitespace would miss
+_GLUED_NUMBERS_RE = re.compile(r"[\d.][-+]|\.\d*\.")
+_INVALID_RE = re.compile(r"[^\d\s,.eE+-]")
+# how many numbers each repetition of a command takes; the last two (or one, for h and v) are the end point
+_ARGUMENT_COUNTS = {"m": 2, "l": 2, "t": 2, "h": 1, "v": 1, "s": 4, "q": 4, "c": 6, "a": 7}
+
+
+def _parse_path_arguments(command: str, argument_string: str) -> np.ndarray:
+    if command.lower() == "a":
+        rows = _ARC_RE.findall(argument_string)
+        leftover = _ARC_RE.sub("", argument_string)
+        arguments = np.array(rows, dtype=float).reshape(-1, 7)
+        leftover = re.sub(r"[\s,]+", " ", leftover).strip()
+        if leftover:
+            raise RuntimeError(f"Unknown SVG path command: {leftover}")
+        return arguments
+
+    invalid = _INVALID_RE.search(argument_string)
+    if invalid:
+        raise RuntimeError(f"Unknown SVG path command: {invalid.group()}")
+    if _GLUED_NUMBERS_RE.search(argument_string):
+        numbers = _NUMBER_RE.findall(argument_string)
     else:
-        raise RuntimeError(f"Unknown SVG path command: {command}")
-
-def parse_path(path_string: str, translation: TransGL3):
-    province_coordinates = [[]]
-    command = None
-    expected_arguments = 0
-    current_index = 0
-    path: list[str] = path_string.split()
-
+        numbers = argument_string.replace(",", " ").split()
+    return np.array(numbers, dtype=float)
+
+
+def _get_end_points(command: str, arguments: np.ndarray, coordinate: np.ndarray) -> np.ndarray:
+    # only the end point of every segment is kept; curves are approximated by the line between their ends
+    count = _ARGUMENT_COUNTS[command.lower()]
+    if arguments.size == 0 or arguments.size % count:
+        raise RuntimeError(f"Ran out of arguments for {command}")
+    arguments = arguments.reshape(-1, count)
+    relative = command.islower()
+
+    if count == 1:
+        axis = 0 if command.lower() == "h" else 1
+        values = arguments[:, 0]
+        if relative:
+            values = coordinate[axis] + np.cumsum(values)
+        points = np.repeat(coordinate[np.newaxis], len(values), axis=0)
+        points[:, axis] = values
+        return points
+
+    points = arguments[:, -2:]
+    if relative:
+        points = coordinate + np.cumsum(points, axis=0)
+    return points
+
+
+def parse_path(path_string: str, translation: TransGL3) -> list[np.ndarray]:
+    """
+    Returns the points of every subpath of an SVG path as an Nx2 array, transformed by translation. A closed subpath
+    ends with its first point again, and leaves the current point at its start. Every moveto starts a new subpath, and
+    subpaths of a single point are left out, since they have no outline.
+    """
+    subpaths: list[np.ndarray] = []
+    current: list[np.ndarray] = []
     start = None
-    coordinate = (0, 0)
-    while current_index < len(path):
-        if path[current_index][0].isalpha():
-            if len(path[current_index]) != 1:
-                # m20,70 is valid syntax, so move the 20,70 to the next element
-                path.insert(current_index + 1, path[current_index][1:])
-                path[current_index] = path[current_index][0]
-
-            command = path[current_index]
-            if command.lower() == "z":
-                if start == None:
-                    raise Exception("Invalid geometry: got 'z' on first element in a subgeometry")
-                province_coordinates[-1].append(translation.transform(start))
-                start = None
-                current_index += 1
-                if current_index < len(path):
-                    # If we are closing, and there is more, there must be a second polygon (Chukchi Sea)
-                    province_coordinates += [[]]
-                    continue
-                else:
-                    break
-
-            elif command.lower() in ["m", "l", "h", "v", "t"]:
-                expected_arguments = 1
-            elif command.lower() in ["s", "q"]:
-                expected_arguments = 2
-            elif command.lower() in ["c"]:
-                expected_arguments = 3
-            elif command.lower() in ["a"]:
-                expected_arguments = 5
-            else:
-                raise RuntimeError(f"Unknown SVG path command {command}")
-
-            current_index += 1
-
-        if command.lower() == "z":
-            raise Exception("Invalid path, 'z' was followed by arguments")
-
-        if len(path) < (current_index + expected_arguments):
-            raise RuntimeError(f"Ran out of arguments for {command}")
-
-        args = [
-            (float(coord_string.split(",")[0]), float(coord_string.split(",")[-1]))
-            for coord_string in path[current_index : current_index + expected_arguments]
-        ]
-
-        coordinate = _parse_path_command(
-            command, args, coordinate
-        )
-
-        if start == None:
+    coordinate = np.zeros(2)
+
+    def end_subpath():
+        if sum(len(points) for points in current) > 1:
+            subpaths.append(translation.transform_points(np.concatenate(current), in_place=True))
+        current.clear()
+
+    pieces = _COMMAND_RE.split(path_string)
+    if pieces[0].strip(" ,\t\r\n"):
+        raise RuntimeError(f"SVG path doesn't start with a command: {path_string[:20]}")
+    for command, argument_string in zip(pieces[1::2], pieces[2::2]):
+        if command in "Zz":
+            if start is None:
+                raise Exception("Invalid geometry: got 'z' on first element in a subgeometry")
+            if argument_string.strip(" ,\t\r\n"):
+                raise Exception("Invalid path, 'z' was followed by arguments")
+            current.append(start[np.newaxis])
+            end_subpath()
+            # a closed subpath leaves the current point at its start
+            coordinate = start
+            start = None
+            continue
+
+        arguments = _parse_path_arguments(command, argument_string)
+        points = _get_end_points(command, arguments, coordinate)
+        if command in "Mm":
+            # a move starts a new subpath; the pairs after the first are implicit lines
+            end_subpath()
+            start = points[0]
+        elif start is None:
+            # drawing straight after a 'z' continues from the start of the closed subpath
             start = coordinate
+            current.append(start[np.newaxis])
+        current.append(points)
+        coordinate = points[-1]
+
+    end_subpath()
+    return subpaths
+
+def get_nearby_pairs(geometries: list[shapely.Geometry], margin: float) -> list[tuple[int, int]]:
+    """
+    Returns the index pairs (i, j) with i < j of the geometries less than margin apart, in order; the same as checking
+    every pair, but only pairs whose bounds are close enough get their distance measured
+    """
+    geometries = np.array(geometries, dtype=object)
+    tree = shapely.STRtree(geometries)
+    # dwithin also keeps pairs exactly margin apart, which are filtered out below
+    first, second = tree.query(geometries, predicate="dwithin", distance=margin)
+    keep = first < second
+    first, second = first[keep], second[keep]
+    keep = shapely.distance(geometries[first], geometries[second]) < margin
+    first, second = first[keep], second[keep]
+    order = np.lexsort((second, first))
+    return list(zip(first[order].tolist(), second[order].tolist()))
+
+
+def _describe_element(element: Element) -> str:
+    return element.get("{http://www.inkscape.org/namespaces/inkscape}label") or element.get("id") or str(element.tag)
 
-        province_coordinates[-1].append(translation.transform(coordinate))
-        current_index += expected_arguments
-    return province_coordinates
 
 # Initializes relevant province data
 # resident_dataset: SVG element whose children each live in some province
@@ -170,26 +246,41 @@ def initialize_province_resident_data(
     get_coordinates: Callable[[Element], tuple[float, float]],
     resident_data_callback: Callable[[Province, Element], None],
 ) -> None:
-    resident_dataset = set(resident_dataset)
-    for province in provinces:
-        remove = set()
-
-        found = False
-        for resident_data in resident_dataset:
-            x, y = get_coordinates(resident_data)
-
-            if not x or not y:
-                remove.add(resident_data)
-                continue
-
-            point = Point((x, y))
-            if province.geometry.contains(point):
-                found = True
-                resident_data_callback(province, resident_data)
-                remove.add(resident_data)
-
-        # if not found:
-        #     print("Not found!")
-
-        for resident_data in remove:
-            resident_dataset.remove(resident_data)
+    provinces = list(provinces)
+    elements = []
+    coordinates = []
+    for resident_data in resident_dataset:
+        x, y = get_coordinates(resident_data)
+        if not x or not y:
+            continue
+        elements.append(resident_data)
+        coordinates.append((x, y))
+    if not elements or not provinces:
+        return
+
+    # every element is matched against every province in one query
+    tree = shapely.STRtree([province.geometry for province in provinces])
+    element_indices, province_indices = tree.query(shapely.points(np.array(coordinates)), predicate="within")
+
+    matches: dict[int, list[int]] = {}
+    for element_index, province_index in zip(element_indices.tolist(), province_indices.tolist()):
+        matches.setdefault(element_index, []).append(province_index)
+
+    unmatched = [_describe_element(elements[index]) for index in range(len(elements)) if index not in matches]
+    if unmatched:
+        logger.warning(f"{len(unmatched)} elements aren't inside any province: {', '.join(unmatched)}")
+
+    assignments = []
+    for element_index, province_matches in matches.items():
+        # provinces used to be checked one at a time, so the first one that contains the element keeps it
+        province_index = min(province_matches)
+        if len(province_matches) > 1:
+            logger.warning(
+                f"{_describe_element(elements[element_index])} is inside "
+                f"{', '.join(sorted(str(provinces[index].name) for index in province_matches))}, "
+                f"assigning it to {provinces[province_index].name}"
+            )
+        assignments.append((province_index, element_index))
+
+    for province_index, element_index in sorted(assignments):
+        resident_data_callback(provinces[province_index], elements[element_index])
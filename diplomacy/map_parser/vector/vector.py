@@ -1,20 +1,41 @@
 import copy
-import itertools
 import json
 import logging
+import os
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable
 import numpy as np
 from xml.etree.ElementTree import Element, tostring
 
 import shapely
-from lxml import etree
 
+from diplomacy.map_parser.vector.compiled import (
+    build_board,
+    build_topology,
+    compile_board,
+    compile_lock,
+    get_compiled_path,
+    get_source_signature,
+    get_variant_hash,
+    load_compiled,
+    save_compiled,
+)
 from diplomacy.map_parser.vector.transform import TransGL3
-from diplomacy.map_parser.vector.utils import get_element_color, get_unit_coordinates, get_svg_element, parse_path, initialize_province_resident_data
+from diplomacy.map_parser.vector.utils import (
+    get_element_color,
+    get_nearby_pairs,
+    get_svg_element,
+    get_unit_coordinates,
+    initialize_province_resident_data,
+    load_svg,
+    parse_path,
+)
 from diplomacy.persistence import phase
 from diplomacy.persistence.board import Board
 from diplomacy.persistence.player import Player
-from diplomacy.persistence.province import Province, ProvinceType, Coast
+from diplomacy.persistence.province import Province, ProvinceTopology, ProvinceType, Coast
 from diplomacy.persistence.unit import Unit, UnitType
 
 # TODO: (BETA) all attribute getting should be in utils which we import and call utils.my_unit()
@@ -32,13 +53,37 @@ class Parser:
     def __init__(self, data: str):
         self.datafile = data
 
-        with open(f"config/{data}", "r") as f:
-            self.data = json.load(f)
+        self._load_config()
+
+        self.compiled: dict | None = None
+        self.topology: dict[str, ProvinceTopology] | None = None
+        self._compiled_signature: tuple | None = None
 
-        svg_root = etree.parse(self.data["file"])
+    def _load_config(self) -> None:
+        with open(f"config/{self.datafile}", "r") as f:
+            self.data = json.load(f)
 
         self.layers = self.data["svg config"]
 
+        self.fow = self.layers.get("fow", False)
+        self.year_offset = self.layers.get("year", 1642)
+
+        self.color_to_player: dict[str, Player | None] = {}
+        self.name_to_province: dict[str, Province] = {}
+
+        self.cache_provinces: set[Province] | None = None
+        self.cache_adjacencies: set[tuple[str, str]] | None = None
+
+        self._svg_loaded = False
+
+    def _load_svg(self) -> None:
+        if self._svg_loaded:
+            return
+
+        # the parser only reads layers that the config names, so the rest of the map isn't kept in memory
+        layer_ids = {value for value in self.layers.values() if isinstance(value, str)}
+        svg_root = load_svg(self.data["file"], layer_ids)
+
         for layer in ["land_layer", "island_borders", "island_fill_layer", "sea_borders", "province_names", "supply_center_icons", "army", "retreat_army", "fleet", "retreat_fleet"]:
             if get_svg_element(svg_root, self.layers[layer]) is None:
                 print(f"bad layer: {layer}")
@@ -66,19 +111,52 @@ class Parser:
         self.phantom_primary_fleets_layer: Element = get_svg_element(svg_root, self.layers["fleet"])
         self.phantom_retreat_fleets_layer: Element = get_svg_element(svg_root, self.layers["retreat_fleet"])
 
-        self.fow = self.layers.get("fow", False)
-        self.year_offset = self.layers.get("year", 1642)
-
-        self.color_to_player: dict[str, Player | None] = {}
-        self.name_to_province: dict[str, Province] = {}
-
-        self.cache_provinces: set[Province] | None = None
-        self.cache_adjacencies: set[tuple[str, str]] | None = None
+        self._svg_loaded = True
 
     def parse(self) -> Board:
+        """Returns a new board in the variant's starting state, built from the compiled variant."""
+        compiled = self.get_compiled()
+        return build_board(compiled, self.topology, self.data, self.datafile, self.fow, self.year_offset)
+
+    def get_compiled(self) -> dict:
+        config_file = f"config/{self.datafile}"
+        signature = get_source_signature(config_file, self.data["file"])
+        if self.compiled is not None and signature == self._compiled_signature:
+            return self.compiled
+
+        if self._compiled_signature is not None:
+            logger.info(f"Variant {self.datafile} changed on disk, recompiling")
+            self._load_config()
+            signature = get_source_signature(config_file, self.data["file"])
+
+        variant_hash = get_variant_hash(config_file, self.data["file"])
+        path = get_compiled_path(self.datafile, variant_hash)
+        compiled = load_compiled(path, variant_hash)
+        if compiled is None:
+            with compile_lock(path):
+                # another process may have compiled it while this one waited for the lock
+                compiled = load_compiled(path, variant_hash)
+                if compiled is None:
+                    start = time.time()
+                    compiled = compile_board(self._parse_svg(), variant_hash)
+                    save_compiled(path, compiled)
+                    logger.info(f"Compiled variant {self.datafile} to {path} in {time.time() - start}s")
+
+        self.set_compiled(compiled, signature)
+        return compiled
+
+    def set_compiled(self, compiled: dict, signature: tuple) -> None:
+        """Uses compiled, built from the variant's files as they were when they had signature, for new boards."""
+        self.topology = build_topology(compiled)
+        self._compiled_signature = signature
+        self.compiled = compiled
+
+    def _parse_svg(self) -> Board:
         logger.debug("map_parser.vector.parse.start")
         start = time.time()
 
+        self._load_svg()
+
         self.players = set()
 
         self.autodetect_players = self.data["players"] == "chaos"
@@ -342,9 +420,13 @@ class Parser:
                 print(tostring(province_data))
                 continue
                 raise RuntimeError("Province path data not found")
-            translation = TransGL3(provinces_layer) * TransGL3(province_data)
+            # the province's own transform applies before the layer's, as in SVG
+            translation = TransGL3.for_element(province_data, up_to=provinces_layer)
 
             province_coordinates = parse_path(path_string, translation)
+            if not province_coordinates:
+                label = self._get_province_name(province_data) or province_data.get("id")
+                raise RuntimeError(f"Province {label} has no outline, its path is a single point: {path_string[:40]}")
 
             if len(province_coordinates) <= 1:
                 poly = shapely.Polygon(province_coordinates[0])
@@ -489,22 +571,17 @@ class Parser:
             (self.phantom_retreat_armies_layer, "retreat_unit_coordinate"),
         ]
         for layer, province_key in army_layer_to_key:
-            layer_translation = TransGL3(layer)
             for unit_data in layer.getchildren():
-                unit_translation = TransGL3(unit_data)
                 province = self._get_province(unit_data)
                 coordinate = get_unit_coordinates(unit_data)
-                setattr(province, province_key, layer_translation.transform(unit_translation.transform(coordinate)))
+                setattr(province, province_key, TransGL3.for_element(unit_data, up_to=layer).transform(coordinate))
 
         fleet_layer_to_key = [
             (self.phantom_primary_fleets_layer, "primary_unit_coordinate"),
             (self.phantom_retreat_fleets_layer, "retreat_unit_coordinate"),
         ]
         for layer, province_key in fleet_layer_to_key:
-
-            layer_translation = TransGL3(layer)
             for unit_data in layer.getchildren():
-                unit_translation = TransGL3(unit_data)
                 # This could either be a sea province or a land coast
                 province_name = self._get_province_name(unit_data)
                 # this is me writing bad code to get this out faster, will fix later when we clean up this file
@@ -525,7 +602,7 @@ class Parser:
                         continue
 
                 coordinate = get_unit_coordinates(unit_data)
-                translated_coordinate = layer_translation.transform(unit_translation.transform(coordinate))
+                translated_coordinate = TransGL3.for_element(unit_data, up_to=layer).transform(coordinate)
                 if coast:
                     setattr(coast, province_key, translated_coordinate)
                 else:
@@ -557,22 +634,13 @@ class Parser:
 
     # Returns province adjacency set
     def _get_adjacencies(self, provinces: set[Province]) -> set[tuple[str, str]]:
-        adjacencies = set()
-        try:
-            f = open(f"config/{self.datafile}_adjacencies.txt", "r")
-        except FileNotFoundError:
-            f = open(f"config/{self.datafile}_adjacencies.txt", "w")
-            # Combinations so that we only have (A, B) and not (B, A) or (A, A)
-            for province1, province2 in itertools.combinations(provinces, 2):
-                if shapely.distance(province1.geometry, province2.geometry) < self.layers["border_margin_hint"]:
-                    adjacencies.add((province1.name, province2.name))
-                    f.write(f"{province1.name},{province2.name}\n")
-        else:
-            for line in f:
-                adjacencies.add(tuple(line[:-1].split(',')))
-        finally:
-            f.close()
-        return adjacencies
+        # only (A, B) and not (B, A) or (A, A), in the order itertools.combinations(provinces, 2) would give
+        provinces = list(provinces)
+        geometries = [province.geometry for province in provinces]
+        return {
+            (provinces[index1].name, provinces[index2].name)
+            for index1, index2 in get_nearby_pairs(geometries, self.layers["border_margin_hint"])
+        }
 
     def get_element_player(self, element: Element, province_name: str="") -> Player:
         color = get_element_color(element)
@@ -615,13 +683,60 @@ class Parser:
 
 
 parsers = {}
+# warm_up hands parsers their variants from a background thread
+_parsers_lock = threading.Lock()
 
 
 def get_parser(name: str) -> Parser:
-    if name not in parsers:
-        logger.info(f"Creating new Parser for board named {name}")
-        parsers[name] = Parser(name)
-    return parsers[name]
+    with _parsers_lock:
+        if name not in parsers:
+            logger.info(f"Creating new Parser for board named {name}")
+            parsers[name] = Parser(name)
+        return parsers[name]
+
+
+def _compile_variant(name: str) -> tuple[dict, tuple]:
+    # runs in a worker process, and the compiled variant is pickled back to the one that warms up
+    parser = Parser(name)
+    return parser.get_compiled(), parser._compiled_signature
+
+
+def warm_up(names: Iterable[str], max_workers: int | None = None) -> threading.Event:
+    """
+    Starts compiling (or loading the compiled) variants in parallel worker processes, and returns straight away. A
+    background thread hands each one to its parser as it arrives, and sets the returned event once all of them have.
+    A variant that fails is left to be parsed when it is first used.
+    """
+    ready = threading.Event()
+    names = sorted({name for name in names if name not in parsers or parsers[name].compiled is None})
+    if not names:
+        ready.set()
+        return ready
+
+    start = time.time()
+    executor = ProcessPoolExecutor(max_workers=min(len(names), max_workers or os.cpu_count() or 1))
+    # everything is submitted here, so the worker processes are started before the caller has any other threads
+    futures = {executor.submit(_compile_variant, name): name for name in names}
+
+    def collect():
+        try:
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    compiled, signature = future.result()
+                except Exception as ex:
+                    logger.warning(f"Couldn't warm up variant {name}, it will be parsed when first used", exc_info=ex)
+                    continue
+                parser = get_parser(name)
+                if parser.compiled is None:
+                    parser.set_compiled(compiled, signature)
+            logger.info(f"Warmed up {len(names)} variants in {time.time() - start}s")
+        finally:
+            executor.shutdown()
+            ready.set()
+
+    threading.Thread(target=collect, name="variant-warm-up", daemon=True).start()
+    return ready
 
 
 # oneTrueParser = Parser()
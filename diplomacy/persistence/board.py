@@ -1,15 +1,83 @@
 import re
 import logging
 import time
+from bisect import bisect_left
 
 from bot.sanitize import sanitize_name
 from diplomacy.persistence.phase import Phase
 from diplomacy.persistence.player import Player
-from diplomacy.persistence.province import Province, ProvinceType, Coast, Location, get_adjacent_provinces
+from diplomacy.persistence.province import Province, Coast, Location
+from diplomacy.persistence.snapshot import BoardSnapshot, StateIndex
 from diplomacy.persistence.unit import Unit, UnitType
 
 logger = logging.getLogger(__name__)
 
+# People input apostrophes that don't match what the province names are
+_APOSTROPHES = str.maketrans(dict.fromkeys("‘’`´′‛", "'"))
+_NOTHING: frozenset[Province] = frozenset()
+
+# a province a unit or center sees, and the ones around it that it sees too
+_View = tuple[Province, frozenset[Province] | set[Province]]
+
+
+def _unit_view(unit: Unit) -> _View:
+    # a unit sees its own province and those next to it, only the land ones for an army and by its coast for a fleet
+    if unit.unit_type == UnitType.ARMY:
+        return unit.province, unit.province.army_visible
+    if unit.coast:
+        return unit.province, unit.coast.fleet_visible
+    return unit.province, unit.province.adjacent
+
+
+def _center_view(province: Province, player: Player) -> _View:
+    # an owned center is seen, and what is next to it as well if it's a core
+    return province, province.adjacent if province.core == player else _NOTHING
+
+
+class _PlayerVisibility:
+    """
+    How many of a player's units and centers see each province. update() compares the units and centers with the
+    ones counted last time, and only counts the views of those that changed, so it doesn't matter whether units were
+    moved and centers changed hands by the Board's methods, the adjudicator or a DB load.
+    """
+
+    def __init__(self):
+        self.counts: dict[Province, int] = {}
+        self.units: dict[Unit, _View] = {}
+        self.centers: dict[Province, _View] = {}
+
+    def _add(self, view: _View):
+        counts = self.counts
+        province, visible = view
+        counts[province] = counts.get(province, 0) + 1
+        for province in visible:
+            counts[province] = counts.get(province, 0) + 1
+
+    def _remove(self, view: _View):
+        counts = self.counts
+        province, visible = view
+        for province in (province, *visible):
+            if counts[province] == 1:
+                del counts[province]
+            else:
+                counts[province] -= 1
+
+    def _sync(self, counted: dict, current: dict):
+        # forget what is gone or has changed, then count what is new
+        for source in [source for source in counted if source not in current]:
+            self._remove(counted.pop(source))
+        for source, view in current.items():
+            old = counted.get(source)
+            if old is None or old[0] is not view[0] or old[1] is not view[1]:
+                if old is not None:
+                    self._remove(old)
+                self._add(view)
+                counted[source] = view
+
+    def update(self, player: Player):
+        self._sync(self.units, {unit: _unit_view(unit) for unit in player.units})
+        self._sync(self.centers, {province: _center_view(province, player) for province in player.centers})
+
 
 class Board:
     def __init__(
@@ -43,6 +111,12 @@ class Board:
             self.name_to_province[location.name.lower()] = location
             for coast in location.coasts:
                 self.name_to_coast[coast.name.lower()] = coast
+        # built by _get_location_index the first time a name isn't matched exactly
+        self._location_index: tuple[list[str], list[tuple[int, Location]]] | None = None
+        # what each player can see under fog of war, kept up to date by get_visible_provinces
+        self._visibility: dict[Player, _PlayerVisibility] = {}
+        # how provinces and players are numbered in snapshots, built the first time one is taken or restored
+        self._state_index: StateIndex | None = None
 
     def get_player(self, name: str) -> Player:
         if name.lower() == "none":
@@ -76,8 +150,7 @@ class Board:
         # TODO: (BETA) we build this everywhere, let's just have one live on the Board on init
         # we ignore capitalization because this is primarily used for user input
         # People input apostrophes that don't match what the province names are
-        name = re.sub(r"[‘’`´′‛]", "'", name)
-        name = name.lower()
+        name = name.translate(_APOSTROPHES).lower()
         if "abbreviations" in self.data and name in self.data["abbreviations"]:
             name = self.data["abbreviations"][name].lower()
         coast = self.name_to_coast.get(name)
@@ -106,39 +179,62 @@ class Board:
                 raise Exception(f"Unknown issue occurred when attempting to find the location {name}.")
 
     def get_visible_provinces(self, player: Player) -> set[Province]:
-        visible: set[Province] = set()
-        for province in self.provinces:
-            for unit in player.units:
-                if unit.unit_type == UnitType.ARMY:
-                    if province in get_adjacent_provinces(unit.province) and province.type != ProvinceType.SEA:
-                        visible.add(province)
-                if unit.unit_type == UnitType.FLEET:
-                    if (unit.coast and province in get_adjacent_provinces(unit.coast)) or (not unit.coast and province in get_adjacent_provinces(unit.province)):
-                        visible.add(province)
-
-        for unit in player.units:
-            visible.add(unit.province)
-
-        for province in player.centers:
-            if province.core == player:
-                visible.update(province.adjacent)
-            visible.add(province)
-
-        return visible
-
-    def get_possible_locations(self, name: str) -> list[Province]:
-        pattern = r"^{}.*$".format(re.escape(name.strip()).replace("\\ ", r"\S*\s*"))
+        visibility = self._visibility.get(player)
+        if visibility is None:
+            visibility = self._visibility[player] = _PlayerVisibility()
+        visibility.update(player)
+        return set(visibility.counts)
+
+    def _get_location_index(self) -> tuple[list[str], list[tuple[int, Location]]]:
+        """
+        The lower case names of every province and coast in sorted order, so that the ones starting with the same
+        prefix are next to each other, and alongside each the location and its position in the order
+        get_possible_locations lists matches in.
+        """
+        if self._location_index is None:
+            locations = []
+            for province in self.provinces:
+                locations.append(province)
+                locations.extend(province.coasts)
+            index = sorted((location.name.lower(), rank, location) for rank, location in enumerate(locations))
+            self._location_index = ([name for name, _, _ in index], [(rank, location) for _, rank, location in index])
+        return self._location_index
+
+    def _get_state_index(self) -> StateIndex:
+        if self._state_index is None:
+            self._state_index = StateIndex(self)
+        return self._state_index
+
+    def snapshot(self) -> BoardSnapshot:
+        """The phase, year, province owners and cores, units and orders of the board, as they are now."""
+        return BoardSnapshot(self)
+
+    def restore(self, snapshot: BoardSnapshot) -> None:
+        """Puts the board back the way it was when snapshot was taken, of it or another board of its variant."""
+        snapshot.restore(self)
+
+    def get_possible_locations(self, name: str) -> list[Location]:
+        name = name.strip()
+        pattern = re.compile(r"^{}.*$".format(re.escape(name).replace("\\ ", r"\S*\s*")))
+        # the pattern only matches names that start with its first word, so only those need to be tried
+        prefix = name.split(" ")[0]
+        names, locations = self._get_location_index()
         matches = []
-        for province in self.provinces:
-            if re.search(pattern, province.name.lower()):
-                matches.append(province)
-            else:
-                matches += [coast for coast in province.coasts if re.search(pattern, coast.name.lower())]
-        return matches
+        for index in range(bisect_left(names, prefix), len(names)):
+            if not names[index].startswith(prefix):
+                break
+            if pattern.search(names[index]):
+                matches.append(locations[index])
+        matches.sort(key=lambda match: match[0])
+        matched = {location for _, location in matches}
+        # a coast only counts if its province doesn't
+        return [
+            location
+            for _, location in matches
+            if not (isinstance(location, Coast) and location.province in matched)
+        ]
 
     def get_location(self, name: str) -> Location:
-        # People input apostrophes that don't match what the province names are
-        name = re.sub(r"[‘’`´′‛]", "'", name)
         province, coast = self.get_province_and_coast(name)
 
         if coast:
@@ -243,13 +339,17 @@ class Board:
         self.units = set()
 
     def get_year_str(self) -> str:
-        # No 0 AD / BC
-        year = self.year_offset + self.year
-
-        if year <= 0:
-            return f"{str(1-year)} BC"
-        else:
-            return str(year)
+        return get_year_str(self.year, self.year_offset)
         
     def is_chaos(self) -> bool:
         return self.data["players"] == "chaos"
+
+
+def get_year_str(year: int, year_offset: int) -> str:
+    # No 0 AD / BC
+    year = year_offset + year
+
+    if year <= 0:
+        return f"{str(1-year)} BC"
+    else:
+        return str(year)
@@ -1,7 +1,12 @@
 import logging
+import os
 from os import supports_dir_fd
 import sqlite3
-from collections.abc import Iterable
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 
 # TODO: Find a better way to do this
 # maybe use a copy from manager?
@@ -28,67 +33,333 @@ from diplomacy.persistence.order import (
     RelationshipOrder,
 )
 from diplomacy.persistence.player import Player
+from diplomacy.persistence.province import Province, Coast, Location
 from diplomacy.persistence.spec_request import SpecRequest
 from diplomacy.persistence.unit import UnitType, Unit
 
 logger = logging.getLogger(__name__)
 
 SQL_FILE_PATH = "bot_db.sqlite"
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+# the tables holding a game's history, which are moved wholesale into the archive
+ARCHIVED_TABLES = ("boards", "current_board", "players", "provinces", "retreat_options", "units", "builds", "vassal_orders")
 
 
 class _DatabaseConnection:
     def __init__(self, db_file: str = SQL_FILE_PATH):
         try:
             self._connection = sqlite3.connect(db_file)
+            self._db_file = db_file
             logger.info("Connection to SQLite DB successful")
         except IOError as ex:
             logger.error("Could not open SQLite DB", exc_info=ex)
             self._connection = sqlite3.connect(
                 ":memory:"
             )  # Special wildcard; in-memory db
+            self._db_file = ":memory:"
 
+        # FULL fsyncs on every commit; in WAL mode NORMAL only fsyncs at checkpoints, which can lose the last
+        # commits on power loss but never corrupts the DB
+        self._synchronous = os.getenv("db_synchronous", "NORMAL").upper()
+        if self._synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"db_synchronous must be one of {', '.join(SYNCHRONOUS_LEVELS)}, not {self._synchronous}")
+        self._configure(self._connection)
+        # writes made inside transaction() are only committed when the outermost one finishes
+        self._transaction_depth = 0
+
+        # order changes are queued, coalesced per unit/player and committed in batches by a background thread,
+        # so that players submitting orders don't each wait on a commit. flush() is the barrier that writes them out
+        self._order_write_delay = float(os.getenv("order_write_delay", "0.5"))
+        self._pending_units: dict[tuple, tuple] = {}
+        self._pending_retreats: dict[tuple, list[tuple]] = {}
+        self._pending_builds: dict[tuple, tuple[list[tuple], list[tuple]]] = {}
+        self._pending_lock = threading.Lock()
+        # held while a batch is written, so that a flush can't overtake a batch that's already in flight,
+        # and for the whole of a transaction() so that the writer can't interleave with it
+        self._write_lock = threading.RLock()
+        self._pending_event = threading.Event()
+        self._writer: threading.Thread | None = None
+
+        # boards of phases before a game's current one don't change, so the most recently viewed are kept around.
+        # they are shared between callers, which only read them
+        self._board_cache: OrderedDict[tuple[int, int], Board] = OrderedDict()
+        self._board_cache_size = int(os.getenv("historical_board_cache_size", "20"))
+        self.board_cache_hits = 0
+        self.board_cache_misses = 0
+        # how many times each phase of each board has been written to (counting writes to unknown boards, which
+        # could be any of them), so that copies of a phase kept elsewhere can tell whether they're still up to date
+        self._write_counts: dict[tuple[int, int], int] = {}
+        self._unknown_writes = 0
+
+        # finished games are moved out of the live tables into a separate DB, which is only opened to look at them
+        self._archive_file = os.getenv("archive_db_file", "archive.sqlite")
+        self._archive_connection: sqlite3.Connection | None = None
+        self._archived_board_ids: set[int] = set()
+        if self._db_file != ":memory:" and os.path.isfile(self._archive_file):
+            cursor = self._get_archive_connection().cursor()
+            self._archived_board_ids = {row[0] for row in cursor.execute("SELECT board_id FROM current_board")}
+            cursor.close()
+
+        # every this many phases the provinces of a game are stored in full rather than as changes
+        self._checkpoint_interval = int(os.getenv("board_checkpoint_interval", "10"))
         self._initialize_schema()
 
+    def _configure(self, connection: sqlite3.Connection):
+        if self._db_file != ":memory:":
+            # readers don't block the writer (or the other way round), and a commit is a single append to the log
+            connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self._synchronous}")
+
+    @contextmanager
+    def transaction(self) -> Iterator["_DatabaseConnection"]:
+        """
+        Stages every write made inside the block and commits them together when it ends, so that e.g. an adjudication
+        either lands completely or not at all. If the block raises, nothing it wrote is kept. Transactions nest; only
+        the outermost one commits.
+        """
+        with self._write_lock:
+            if self._transaction_depth == 0:
+                # orders acknowledged before the transaction aren't part of it
+                self.flush()
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self._connection.rollback()
+                    # orders queued, names interned and boards cached during the transaction are gone with it
+                    with self._pending_lock:
+                        self._pending_units, self._pending_retreats, self._pending_builds = {}, {}, {}
+                    self._load_names()
+                    self._invalidate_cached_boards()
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._connection.commit()
+
+    def _commit(self):
+        if self._transaction_depth == 0:
+            self._connection.commit()
+
+    def _get_archive_connection(self) -> sqlite3.Connection:
+        if self._archive_connection is None:
+            self._archive_connection = sqlite3.connect(self._archive_file)
+            self._configure(self._archive_connection)
+            with open("diplomacy/persistence/db/schema.sql", "r") as sql_file:
+                self._archive_connection.executescript(sql_file.read())
+        return self._archive_connection
+
+    def _get_reader(self, board_id: int) -> sqlite3.Connection:
+        # archived games are read straight from the archive; ids still refer to the name tables in the live DB
+        if board_id in self._archived_board_ids:
+            return self._get_archive_connection()
+        return self._connection
+
+    def _check_not_archived(self, board_id: int):
+        if board_id in self._archived_board_ids:
+            raise ValueError(f"The game in server {board_id} is archived and can't be changed")
+
+    def _check_not_cached(self, board: Board):
+        if any(cached is board for cached in self._board_cache.values()):
+            raise ValueError("Boards of past phases are shared by everything that loads them and can't be changed")
+
+    def get_archived_board_ids(self) -> set[int]:
+        return set(self._archived_board_ids)
+
+    def archive_board(self, board_id: int):
+        """
+        Moves every phase of a game out of the live tables and into the archive DB, where it can still be viewed but no
+        longer slows down queries about live games.
+        """
+        if self._db_file == ":memory:":
+            raise ValueError("Games in an in-memory DB can't be archived")
+        if self._transaction_depth:
+            raise ValueError("Games can't be archived inside a transaction")
+        self.flush()
+        if board_id in self._archived_board_ids:
+            return
+        if board_id not in self.get_board_ids():
+            raise ValueError(f"There is no game in server {board_id} to archive")
+
+        # make sure the archive has its tables before attaching it
+        self._get_archive_connection().commit()
+        with self._write_lock:
+            cursor = self._connection.cursor()
+            cursor.execute("ATTACH DATABASE ? AS archive", (self._archive_file,))
+            try:
+                for table in ARCHIVED_TABLES:
+                    columns = ", ".join(row[1] for row in cursor.execute(f"PRAGMA main.table_info({table})"))
+                    cursor.execute(
+                        f"INSERT OR REPLACE INTO archive.{table} ({columns}) SELECT {columns} FROM main.{table} "
+                        "WHERE board_id=?",
+                        (board_id,),
+                    )
+                # the archive has to hold the game before it's removed here, as WAL mode doesn't make a transaction
+                # across both files atomic
+                self._connection.commit()
+                for table in ARCHIVED_TABLES:
+                    cursor.execute(f"DELETE FROM main.{table} WHERE board_id=?", (board_id,))
+                self._connection.commit()
+            except sqlite3.Error:
+                self._connection.rollback()
+                raise
+            finally:
+                cursor.execute("DETACH DATABASE archive")
+                cursor.close()
+        self._invalidate_cached_boards(board_id)
+        self._archived_board_ids.add(board_id)
+        logger.info(f"Archived board {board_id}")
+
     def _initialize_schema(self):
         # FIXME: move the sql file somewhere more accessible (maybe it shouldn't be inside the package? /resources ?)
         with open("diplomacy/persistence/db/schema.sql", "r") as sql_file:
             cursor = self._connection.cursor()
             cursor.executescript(sql_file.read())
             cursor.close()
+        self._load_names()
+        self._backfill_current_boards()
 
-    def get_boards(self) -> dict[int, Board]:
+    def _load_names(self):
+        # the name dictionaries only ever grow, so they're kept in memory as arrays indexed by id
         cursor = self._connection.cursor()
+        self._location_names: list[str | None] = []
+        self._location_ids: dict[str, int] = {}
+        for location_id, name in cursor.execute("SELECT location_id, name FROM location_names").fetchall():
+            self._location_names.extend([None] * (location_id + 1 - len(self._location_names)))
+            self._location_names[location_id] = name
+            self._location_ids[name] = location_id
+        self._player_names: list[str | None] = []
+        self._player_ids: dict[str, int] = {}
+        for player_id, name in cursor.execute("SELECT player_id, name FROM player_names").fetchall():
+            self._player_names.extend([None] * (player_id + 1 - len(self._player_names)))
+            self._player_names[player_id] = name
+            self._player_ids[name] = player_id
+        cursor.close()
 
-        board_data = cursor.execute("SELECT * FROM boards").fetchall()
-        board_keys = [(row[0], row[1]) for row in board_data]
-        logger.info(f"Loading {len(board_data)} boards from DB")
-        boards = dict()
-        for board_row in board_data:
-            board_id, phase_string, data_file, fish, name = board_row
-
-            split_index = phase_string.index(" ")
-            year = int(phase_string[:split_index])
-            phase_name = phase_string[split_index:].strip()
-            current_phase = phase.get(phase_name)
-            next_phase = current_phase.next
-            next_phase_year = year
-            if next_phase.name == "Spring Moves":
-                next_phase_year += 1
-            if (board_id, f"{next_phase_year} {next_phase.name}") in board_keys:
-                continue
+    def _intern(self, table: str, name: str, ids: dict[str, int], names: list[str | None]) -> int:
+        name_id = ids.get(name)
+        if name_id is None:
+            with self._write_lock:
+                # part of the write or transaction in progress if there is one, otherwise committed straight away, so
+                # that an id looked up on its own doesn't leave the connection holding the DB's write lock
+                part_of_write = self._transaction_depth or self._connection.in_transaction
+                cursor = self._connection.cursor()
+                cursor.execute(f"INSERT INTO {table} (name) VALUES (?)", (name,))
+                name_id = cursor.lastrowid
+                cursor.close()
+                if not part_of_write:
+                    self._connection.commit()
+            names.extend([None] * (name_id + 1 - len(names)))
+            names[name_id] = name
+            ids[name] = name_id
+        return name_id
 
-            if fish is None:
-                fish = 0
+    def get_location_id(self, name: str | None) -> int | None:
+        if name is None:
+            return None
+        return self._intern("location_names", name, self._location_ids, self._location_names)
 
-            board = self._get_board(
-                board_id, current_phase, year, fish, name, data_file, cursor
-            )
+    def get_player_id(self, name: str | None) -> int | None:
+        if name is None:
+            return None
+        return self._intern("player_names", name, self._player_ids, self._player_names)
+
+    def _get_location_array(self, board: Board) -> list[Location | None]:
+        locations: list[Location | None] = [None] * len(self._location_names)
+        for province in board.provinces:
+            for location in (province, *province.coasts):
+                location_id = self._location_ids.get(location.name)
+                if location_id is not None:
+                    locations[location_id] = location
+        return locations
 
-            boards[board_id] = board
+    def _get_player_array(self, board: Board) -> list[Player | None]:
+        players: list[Player | None] = [None] * len(self._player_names)
+        for player in board.players:
+            player_id = self._player_ids.get(player.name)
+            if player_id is not None:
+                players[player_id] = player
+        return players
+
+    def _backfill_current_boards(self):
+        # DBs from before current_board existed (or games it somehow lost track of) need their latest phase found once
+        cursor = self._connection.cursor()
+        cursor.execute(
+            "INSERT INTO current_board (board_id, phase) SELECT board_id, MAX(phase) FROM boards "
+            "WHERE board_id NOT IN (SELECT board_id FROM current_board) GROUP BY board_id"
+        )
+        if cursor.rowcount:
+            logger.info(f"Indexed the current phase of {cursor.rowcount} boards")
+        cursor.close()
+        self._commit()
+
+    def get_board_ids(self) -> set[int]:
+        cursor = self._connection.cursor()
+        board_ids = {row[0] for row in cursor.execute("SELECT board_id FROM current_board").fetchall()}
+        cursor.close()
+        return board_ids
+
+    def get_data_files(self) -> set[str]:
+        """The variants that games which aren't archived are played on."""
+        cursor = self._connection.cursor()
+        data_files = {
+            row[0]
+            for row in cursor.execute(
+                "SELECT DISTINCT data_file FROM current_board JOIN boards USING (board_id, phase)"
+            ).fetchall()
+        }
+        cursor.close()
+        return data_files
+
+    def get_current_board(self, board_id: int) -> Board | None:
+        self.flush()
+        cursor = self._get_reader(board_id).cursor()
+
+        board_data = cursor.execute(
+            "SELECT phase, data_file, fish, name FROM current_board JOIN boards USING (board_id, phase) "
+            "WHERE board_id=?",
+            (board_id,),
+        ).fetchone()
+        if not board_data:
+            cursor.close()
+            return None
+
+        phase_id, data_file, fish, name = board_data
+        current_phase, year = from_phase_id(phase_id)
+        if fish is None:
+            fish = 0
+
+        board = self._get_board(board_id, current_phase, year, fish, name, data_file, cursor)
+        cursor.close()
+        return board
 
+    def get_current_phase(self, board_id: int) -> tuple[phase.Phase, int, str] | None:
+        """The phase, year and variant of a game's current board, without loading the board."""
+        cursor = self._get_reader(board_id).cursor()
+        board_data = cursor.execute(
+            "SELECT phase, data_file FROM current_board JOIN boards USING (board_id, phase) WHERE board_id=?",
+            (board_id,),
+        ).fetchone()
         cursor.close()
-        logger.info("Successfully loaded")
-        return boards
+        if not board_data:
+            return None
+        phase_id, data_file = board_data
+        current_phase, year = from_phase_id(phase_id)
+        return current_phase, year, data_file
+
+    def get_fish(self) -> dict[int, int]:
+        connections = [self._connection]
+        if self._archived_board_ids:
+            connections.insert(0, self._get_archive_connection())
+        board_data = []
+        for connection in connections:
+            cursor = connection.cursor()
+            board_data += cursor.execute(
+                "SELECT board_id, fish FROM current_board JOIN boards USING (board_id, phase)"
+            ).fetchall()
+            cursor.close()
+        return {board_id: fish or 0 for board_id, fish in board_data}
 
     def get_board(
         self,
@@ -100,11 +371,31 @@ class _DatabaseConnection:
         data_file: str,
         clear_status: bool = False,
     ) -> Board | None:
-        cursor = self._connection.cursor()
+        """
+        Loads a phase of a game. Boards of past phases are cached and the same one is handed to everything that loads
+        that phase, so they must only be read; the save methods refuse them. A board loaded with clear_status is
+        neither taken from nor put in the cache, and can be changed. Clearing the status writes to the phase, so it is
+        refused for archived games, which can't be changed.
+        """
+        if clear_status:
+            self._check_not_archived(board_id)
+        self.flush()
+        phase_id = to_phase_id(board_phase, year)
+        if not clear_status:
+            board = self._board_cache.get((board_id, phase_id))
+            if board is not None:
+                self._board_cache.move_to_end((board_id, phase_id))
+                self.board_cache_hits += 1
+                # these are kept for the game rather than per phase, so the cached board takes whatever they are now
+                board.fish = fish
+                board.name = name
+                return board
+        cursor = self._get_reader(board_id).cursor()
 
         board_data = cursor.execute(
-            "SELECT * FROM boards WHERE board_id=? and phase=?",
-            (board_id, f"{year} {board_phase.name}"),
+            "SELECT boards.phase < current_board.phase FROM boards LEFT JOIN current_board USING (board_id) "
+            "WHERE board_id=? and boards.phase=?",
+            (board_id, phase_id),
         ).fetchone()
         if not board_data:
             cursor.close()
@@ -112,8 +403,34 @@ class _DatabaseConnection:
 
         board = self._get_board(board_id, board_phase, year, fish, name, data_file, cursor, clear_status)
         cursor.close()
+        is_historical = board_data[0]
+        if is_historical and not clear_status:
+            self.board_cache_misses += 1
+            self._board_cache[(board_id, phase_id)] = board
+            while len(self._board_cache) > self._board_cache_size:
+                self._board_cache.popitem(last=False)
         return board
 
+    def get_board_cache_stats(self) -> dict[str, int]:
+        return {"hits": self.board_cache_hits, "misses": self.board_cache_misses, "size": len(self._board_cache)}
+
+    def _invalidate_cached_boards(self, board_id: int | None = None):
+        if board_id is None:
+            self._board_cache.clear()
+            return
+        for key in [key for key in self._board_cache if key[0] == board_id]:
+            del self._board_cache[key]
+
+    def _count_write(self, board_id: int | None = None, phase_id: int | None = None):
+        if board_id is None:
+            self._unknown_writes += 1
+        else:
+            self._write_counts[(board_id, phase_id)] = self._write_counts.get((board_id, phase_id), 0) + 1
+
+    def get_write_count(self, board_id: int, board_phase: phase.Phase, year: int) -> int:
+        """Goes up every time the phase of the board is written to; only ever compare it to an earlier count."""
+        return self._write_counts.get((board_id, to_phase_id(board_phase, year)), 0) + self._unknown_writes
+
     def _get_board(
         self,
         board_id: int,
@@ -126,8 +443,7 @@ class _DatabaseConnection:
         clear_status: bool = False,
     ) -> Board:
         logger.info(f"Loading board with ID {board_id}")
-        # TODO - we should eventually store things like coords, adjacencies, etc
-        #  so we don't have to reparse the whole board each time
+        # the parser builds this from the compiled variant, so the SVG isn't reparsed here
         board = get_parser(data_file).parse()
         board.phase = board_phase
         board.year = year
@@ -162,40 +478,41 @@ class _DatabaseConnection:
             player.units = set()
             player.centers = set()
             # TODO - player build orders
+        locations = self._get_location_array(board)
+        players = self._get_player_array(board)
+        phase_id = get_phase_id(board)
+
+        def get_player_by_id(player_id: int) -> Player | None:
+            player = players[player_id] if player_id < len(players) else None
+            if player is None:
+                logger.warning(f"Unknown player: {self._player_names[player_id]}")
+            return player
+
         if phase.is_builds(board_phase):
             builds_data = cursor.execute(
                 "SELECT player, location, is_build, is_army FROM builds WHERE board_id=? and phase=?",
-                (board_id, board.get_phase_and_year_string()),
+                (board_id, phase_id),
             ).fetchall()
 
-            def get_player_by_name(player_name) -> Player | None:
-                player_by_name = {player.name: player for player in board.players}
-
-                if player_name not in player_by_name:
-                    logger.warning(f"Unknown player: {player_name}")
-                    return None
-
-                return player_by_name[player_name]
-
-            for player_name, location, is_build, is_army in builds_data:
-                player = get_player_by_name(player_name)
+            for player_id, location, is_build, is_army in builds_data:
+                player = get_player_by_id(player_id)
 
                 if player is None:
                     continue
 
                 if is_build:
                     player_order = Build(
-                        board.get_location(location),
+                        locations[location],
                         UnitType.ARMY if is_army else UnitType.FLEET,
                     )
                 else:
-                    player_order = Disband(board.get_location(location))
+                    player_order = Disband(locations[location])
 
                 player.build_orders.add(player_order)
 
             vassals_data = cursor.execute(
                 "SELECT player, target_player, order_type FROM vassal_orders WHERE board_id=? and phase=?",
-                (board_id, board.get_phase_and_year_string()),
+                (board_id, phase_id),
             ).fetchall()
 
             order_classes = [
@@ -207,9 +524,9 @@ class _DatabaseConnection:
                 RebellionMarker,
             ]
 
-            for player_name, target_player_name, order_type in vassals_data:
-                player = get_player_by_name(player_name)
-                target_player = get_player_by_name(target_player_name)
+            for player_id, target_player_id, order_type in vassals_data:
+                player = get_player_by_id(player_id)
+                target_player = get_player_by_id(target_player_id)
                 order_class = next(
                     order_class
                     for order_class in order_classes
@@ -220,35 +537,39 @@ class _DatabaseConnection:
 
                 player.vassal_orders[target_player] = order
 
-        province_data = cursor.execute(
-            "SELECT province_name, owner, core, half_core FROM provinces WHERE board_id=? and phase=?",
-            (board_id, board.get_phase_and_year_string()),
-        ).fetchall()
-        province_info_by_name = {
-            province_name: (owner, core, half_core)
-            for province_name, owner, core, half_core in province_data
-        }
-        
+        province_info_by_id = self._get_province_rows(cursor, board_id, phase_id)
+
         if clear_status:
             cursor.execute("UPDATE units SET failed_order=False WHERE board_id=? and phase=?",
-                (board_id, board.get_phase_and_year_string()))
-        
+                (board_id, phase_id))
+
         unit_data = cursor.execute(
             "SELECT location, is_dislodged, owner, is_army, order_type, order_destination, order_source, failed_order FROM units WHERE board_id=? and phase=?",
-            (board_id, board.get_phase_and_year_string()),
+            (board_id, phase_id),
         ).fetchall()
+        retreat_options_by_origin: dict[int, set[Location]] = {}
+        if any(unit_info[1] for unit_info in unit_data):
+            for origin, retreat_loc in cursor.execute(
+                "SELECT origin, retreat_loc FROM retreat_options WHERE board_id=? and phase=?",
+                (board_id, phase_id),
+            ):
+                retreat_options_by_origin.setdefault(origin, set()).add(locations[retreat_loc])
         for province in board.provinces:
-            if province.name not in province_info_by_name:
-                logger.warning(f"Couldn't find province {province.name} in DB")
+            province.unit = None
+            province.dislodged_unit = None
+        loaded_provinces = set()
+        for province_id, (owner, core, half_core) in province_info_by_id.items():
+            province = locations[province_id] if province_id < len(locations) else None
+            if not isinstance(province, Province):
+                logger.warning(f"Province {self._location_names[province_id]} from DB isn't on the board")
                 continue
-
-            owner, core, half_core = province_info_by_name[province.name]
+            loaded_provinces.add(province)
 
             if owner is not None:
-                owner_player = board.get_player(owner)
+                owner_player = players[owner] if owner < len(players) else None
                 if owner_player is None:
                     logger.warning(
-                        f"Couldn't find corresponding player for {owner} in DB"
+                        f"Couldn't find corresponding player for {self._player_names[owner]} in DB"
                     )
                 else:
                     province.owner = owner_player
@@ -258,17 +579,11 @@ class _DatabaseConnection:
             else:
                 province.owner = None
 
-            core_player = None
-            if core is not None:
-                core_player = board.get_player(core)
-            province.core = core_player
+            province.core = None if core is None else players[core]
+            province.half_core = None if half_core is None else players[half_core]
+        for province in board.provinces - loaded_provinces:
+            logger.warning(f"Couldn't find province {province.name} in DB")
 
-            half_core_player = None
-            if half_core is not None:
-                half_core_player = board.get_player(half_core)
-            province.half_core = half_core_player
-            province.unit = None
-            province.dislodged_unit = None
         board.units.clear()
         for unit_info in unit_data:
             (
@@ -281,16 +596,10 @@ class _DatabaseConnection:
                 order_source,
                 hasFailed,
             ) = unit_info
-            province, coast = board.get_province_and_coast(location)
-            owner_player = board.get_player(owner)
+            province, coast = _split_location(locations[location])
+            owner_player = players[owner]
             if is_dislodged:
-                retreat_ops = cursor.execute(
-                    "SELECT retreat_loc FROM retreat_options WHERE board_id=? and phase=? and origin=?",
-                    (board_id, board.get_phase_and_year_string(), location),
-                )
-                retreat_options = set(
-                    map(board.get_location, set().union(*retreat_ops))
-                )
+                retreat_options = retreat_options_by_origin.get(location, set())
             else:
                 retreat_options = None
             unit = Unit(
@@ -336,19 +645,12 @@ class _DatabaseConnection:
                         for _class in order_classes
                         if _class.__name__ == order_type
                     )
+                    # a coast if the order was to a coast, otherwise the province
                     destination_province = None
                     if order_destination is not None:
-                        destination_province, destination_coast = (
-                            board.get_province_and_coast(order_destination)
-                        )
-                        if destination_coast is not None:
-                            destination_province = destination_coast
+                        destination_province = locations[order_destination]
                     if order_source is not None:
-                        source_province, source_coast = board.get_province_and_coast(
-                            order_source
-                        )
-                        if source_coast is not None:
-                            source_province = source_coast
+                        source_province = locations[order_source]
                     if order_class in [Hold, Core, RetreatDisband]:
                         order = order_class()
                     elif order_class in [Move, ConvoyMove, RetreatMove]:
@@ -362,7 +664,7 @@ class _DatabaseConnection:
                     
                     order.hasFailed = hasFailed
 
-                    province, coast = board.get_province_and_coast(location)
+                    province, coast = _split_location(locations[location])
                     if is_dislodged:
                         province.dislodged_unit.order = order
                     else:
@@ -372,12 +674,77 @@ class _DatabaseConnection:
                 continue
         return board
 
+    def _get_province_rows(self, cursor, board_id: int, phase_id: int) -> dict[int, tuple[int | None, ...]]:
+        """Rebuilds the (owner, core, half_core) of every province in a phase from its checkpoint and later changes."""
+        # walks base_phase back to the checkpoint, then reads the rows of every phase on the way oldest first,
+        # so that later changes overwrite earlier ones
+        province_data = cursor.execute(
+            "WITH RECURSIVE chain (phase, depth) AS ("
+            "    SELECT ?, 0"
+            "    UNION ALL"
+            "    SELECT boards.base_phase, chain.depth + 1 FROM boards JOIN chain USING (phase)"
+            "    WHERE boards.board_id=? and boards.base_phase IS NOT NULL"
+            ") "
+            "SELECT province_id, owner, core, half_core FROM provinces JOIN chain USING (phase) "
+            "WHERE board_id=? ORDER BY depth DESC",
+            (phase_id, board_id, board_id),
+        ).fetchall()
+        return {
+            province_id: (owner, core, half_core)
+            for province_id, owner, core, half_core in province_data
+        }
+
     def save_board(self, board_id: int, board: Board):
         # TODO: Check if board already exists
+        self._check_not_archived(board_id)
+        self._check_not_cached(board)
+        self.flush()
+        # players' colors, lieges and points are kept for the game, so boards of past phases loaded before are stale
+        self._invalidate_cached_boards(board_id)
         cursor = self._connection.cursor()
+        phase_id = get_phase_id(board)
+        self._count_write(board_id, phase_id)
+        province_rows = {
+            self.get_location_id(province.name): (
+                self.get_player_id(province.owner.name) if province.owner else None,
+                self.get_player_id(province.core.name) if province.core else None,
+                self.get_player_id(province.half_core.name) if province.half_core else None,
+            )
+            for province in board.provinces
+        }
+        previous = cursor.execute(
+            "SELECT phase, delta_depth FROM current_board JOIN boards USING (board_id, phase) WHERE board_id=?",
+            (board_id,),
+        ).fetchone()
+        if (
+            previous is None
+            or previous[0] == phase_id
+            or (previous[1] or 0) + 1 >= self._checkpoint_interval
+        ):
+            base_phase, delta_depth = None, 0
+        else:
+            base_phase, delta_depth = previous[0], (previous[1] or 0) + 1
+            base_rows = self._get_province_rows(cursor, board_id, base_phase)
+            province_rows = {
+                province_id: row for province_id, row in province_rows.items() if base_rows.get(province_id) != row
+            }
+
         cursor.execute(
-            "INSERT INTO boards (board_id, phase, data_file, fish, name) VALUES (?, ?, ?, ?, ?)",
-            (board_id, board.get_phase_and_year_string(), board.datafile, board.fish, board.name),
+            "INSERT INTO boards (board_id, phase, data_file, fish, name, base_phase, delta_depth) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                board_id,
+                phase_id,
+                board.datafile,
+                board.fish,
+                board.name,
+                base_phase,
+                delta_depth,
+            ),
+        )
+        cursor.execute(
+            "INSERT OR REPLACE INTO current_board (board_id, phase) VALUES (?, ?)",
+            (board_id, phase_id),
         )
         cursor.executemany(
             "INSERT INTO players (board_id, player_name, color, liege, points) VALUES (?, ?, ?, ?, ?) ON CONFLICT "
@@ -421,17 +788,10 @@ class _DatabaseConnection:
             cache.append(p.name)
 
         cursor.executemany(
-            "INSERT INTO provinces (board_id, phase, province_name, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
+            "INSERT INTO provinces (board_id, phase, province_id, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
             [
-                (
-                    board_id,
-                    board.get_phase_and_year_string(),
-                    province.name,
-                    province.owner.name if province.owner else None,
-                    province.core.name if province.core else None,
-                    province.half_core.name if province.half_core else None,
-                )
-                for province in board.provinces
+                (board_id, phase_id, province_id, owner, core, half_core)
+                for province_id, (owner, core, half_core) in province_rows.items()
             ],
         )
         cursor.executemany(
@@ -439,9 +799,9 @@ class _DatabaseConnection:
             [
                 (
                     board_id,
-                    board.get_phase_and_year_string(),
-                    player.name,
-                    build_order.location.name,
+                    phase_id,
+                    self.get_player_id(player.name),
+                    self.get_location_id(build_order.location.name),
                     isinstance(build_order, Build),
                     getattr(build_order, "unit_type", None) == UnitType.ARMY,
                 )
@@ -455,24 +815,26 @@ class _DatabaseConnection:
             [
                 (
                     board_id,
-                    board.get_phase_and_year_string(),
-                    unit.location().name,
+                    phase_id,
+                    self.get_location_id(unit.location().name),
                     unit == unit.province.dislodged_unit,
-                    unit.player.name,
+                    self.get_player_id(unit.player.name),
                     unit.unit_type == UnitType.ARMY,
                     unit.order.__class__.__name__ if unit.order is not None else None,
                     (
-                        getattr(getattr(unit.order, "destination", None), "name", None)
+                        self.get_location_id(getattr(getattr(unit.order, "destination", None), "name", None))
                         if unit.order is not None
                         else None
                     ),
                     (
-                        getattr(
+                        self.get_location_id(
                             getattr(
-                                getattr(unit.order, "source", None), "province", None
-                            ),
-                            "name",
-                            None,
+                                getattr(
+                                    getattr(unit.order, "source", None), "province", None
+                                ),
+                                "name",
+                                None,
+                            )
                         )
                         if unit.order is not None
                         else None
@@ -487,9 +849,9 @@ class _DatabaseConnection:
             [
                 (
                     board_id,
-                    board.get_phase_and_year_string(),
-                    unit.location().name,
-                    retreat_option.name,
+                    phase_id,
+                    self.get_location_id(unit.location().name),
+                    self.get_location_id(retreat_option.name),
                 )
                 for unit in board.units
                 if unit.retreat_options is not None
@@ -497,104 +859,194 @@ class _DatabaseConnection:
             ],
         )
         cursor.close()
-        self._connection.commit()
+        self._commit()
 
-    def save_order_for_units(self, board: Board, units: Iterable[Unit]):
+    def save_province(self, board: Board, province: Province):
+        self._check_not_archived(board.board_id)
+        self._check_not_cached(board)
+        self.flush()
+        owner = self.get_player_id(province.owner.name) if province.owner else None
+        core = self.get_player_id(province.core.name) if province.core else None
+        half_core = self.get_player_id(province.half_core.name) if province.half_core else None
+        self._count_write(board.board_id, get_phase_id(board))
         cursor = self._connection.cursor()
-        cursor.executemany(
-            "UPDATE units SET order_type=?, order_destination=?, order_source=?, failed_order=? "
-            "WHERE board_id=? and phase=? and location=? and is_dislodged=?",
-            [
-                (
-                    unit.order.__class__.__name__ if unit.order is not None else None,
-                    (
-                        getattr(getattr(unit.order, "destination", None), "name", None)
-                        if unit.order is not None
-                        else None
-                    ),
-                    (
-                        getattr(getattr(unit.order, "source", None), "name", None)
-                        if unit.order is not None
-                        else None
-                    ),
-                    unit.order.hasFailed if unit.order is not None else False,
-                    board.board_id,
-                    board.get_phase_and_year_string(),
-                    unit.location().name,
-                    unit.province.dislodged_unit == unit,
-                )
-                for unit in units
-            ],
-        )
-        cursor.executemany(
-            "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
-            [
-                (
-                    board.board_id,
-                    board.get_phase_and_year_string(),
-                    unit.location().name,
-                )
-                for unit in units
-                if unit.retreat_options is not None
-            ],
+        cursor.execute(
+            "INSERT INTO provinces (board_id, phase, province_id, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (board_id, phase, province_id) DO UPDATE SET owner=?, core=?, half_core=?",
+            (
+                board.board_id,
+                get_phase_id(board),
+                self.get_location_id(province.name),
+                owner,
+                core,
+                half_core,
+                owner,
+                core,
+                half_core,
+            ),
         )
-        cursor.executemany(
-            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
-            [
-                (
-                    board.board_id,
-                    board.get_phase_and_year_string(),
-                    unit.location().name,
-                    retreat_option.name,
-                )
-                for unit in units
-                if unit.retreat_options is not None
-                for retreat_option in unit.retreat_options
-            ],
+        cursor.close()
+        self._commit()
+
+    def save_fish(self, board: Board):
+        cursor = self._connection.cursor()
+        cursor.execute(
+            "UPDATE boards SET fish=? WHERE board_id=? AND phase=?",
+            (board.fish, board.board_id, get_phase_id(board)),
         )
         cursor.close()
-        self._connection.commit()
+        self._commit()
+
+    def save_order_for_units(self, board: Board, units: Iterable[Unit]):
+        self._check_not_archived(board.board_id)
+        self._check_not_cached(board)
+        phase_id = get_phase_id(board)
+        self._count_write(board.board_id, phase_id)
+        unit_rows = {}
+        retreat_rows = {}
+        for unit in units:
+            location_id = self.get_location_id(unit.location().name)
+            unit_rows[(board.board_id, phase_id, location_id, unit.province.dislodged_unit == unit)] = (
+                unit.order.__class__.__name__ if unit.order is not None else None,
+                (
+                    self.get_location_id(getattr(getattr(unit.order, "destination", None), "name", None))
+                    if unit.order is not None
+                    else None
+                ),
+                (
+                    self.get_location_id(getattr(getattr(unit.order, "source", None), "name", None))
+                    if unit.order is not None
+                    else None
+                ),
+                unit.order.hasFailed if unit.order is not None else False,
+            )
+            if unit.retreat_options is not None:
+                retreat_rows[(board.board_id, phase_id, location_id)] = [
+                    self.get_location_id(retreat_option.name) for retreat_option in unit.retreat_options
+                ]
+        self._queue_orders(unit_rows, retreat_rows, {})
 
     def save_build_orders_for_players(self, board: Board, player: Player | None):
+        self._check_not_archived(board.board_id)
+        self._check_not_cached(board)
         if player is None:
             players = board.players
         else:
             players = {player}
-        cursor = self._connection.cursor()
-        cursor.executemany(
-            "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?) "
-            "ON CONFLICT (board_id, phase, player, location) DO UPDATE SET is_build=?, is_army=?",
-            [
-                (
-                    board.board_id,
-                    board.get_phase_and_year_string(),
-                    player.name,
-                    build_order.location.name,
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
+        phase_id = get_phase_id(board)
+        self._count_write(board.board_id, phase_id)
+        build_rows = {}
+        for player in players:
+            build_rows[(board.board_id, phase_id, self.get_player_id(player.name))] = (
+                [
+                    (
+                        self.get_location_id(build_order.location.name),
+                        isinstance(build_order, Build),
+                        getattr(build_order, "unit_type", None) == UnitType.ARMY,
+                    )
+                    for build_order in player.build_orders
+                ],
+                [
+                    (self.get_player_id(build_order.player.name), build_order.__class__.__name__)
+                    for build_order in player.vassal_orders.values()
+                ],
+            )
+        self._queue_orders({}, {}, build_rows)
+
+    def _queue_orders(self, unit_rows: dict, retreat_rows: dict, build_rows: dict):
+        with self._pending_lock:
+            # a later change to the same unit or player replaces the queued one
+            self._pending_units.update(unit_rows)
+            self._pending_retreats.update(retreat_rows)
+            self._pending_builds.update(build_rows)
+
+        if self._db_file == ":memory:" or self._order_write_delay <= 0 or self._transaction_depth:
+            # inside a transaction the orders are written as part of it
+            # an in-memory DB can't be shared with another thread's connection
+            self.flush()
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_orders_in_background, name="order-writer", daemon=True)
+            self._writer.start()
+        self._pending_event.set()
+
+    def _write_orders_in_background(self):
+        connection = sqlite3.connect(self._db_file)
+        self._configure(connection)
+        while True:
+            self._pending_event.wait()
+            # let the orders sent around the same time (e.g. right before a deadline) pile up into one commit
+            time.sleep(self._order_write_delay)
+            self._pending_event.clear()
+            self._write_pending_orders(connection)
+
+    def flush(self):
+        """Writes every queued order change before returning. Anything that reads or replaces orders calls this first."""
+        self._write_pending_orders(self._connection)
+
+    def _write_pending_orders(self, connection: sqlite3.Connection):
+        with self._write_lock:
+            with self._pending_lock:
+                unit_rows, self._pending_units = self._pending_units, {}
+                retreat_rows, self._pending_retreats = self._pending_retreats, {}
+                build_rows, self._pending_builds = self._pending_builds, {}
+            if not unit_rows and not retreat_rows and not build_rows:
+                return
+
+            try:
+                cursor = connection.cursor()
+                cursor.executemany(
+                    "UPDATE units SET order_type=?, order_destination=?, order_source=?, failed_order=? "
+                    "WHERE board_id=? and phase=? and location=? and is_dislodged=?",
+                    [(*order, *key) for key, order in unit_rows.items()],
                 )
-                for player in players
-                for build_order in player.build_orders
-            ],
-        )
-        cursor.executemany(
-            "INSERT INTO vassal_orders (board_id, phase, player, target_player, order_type) VALUES (?, ?, ?, ?, ?) ",
-            [
-                (
-                    board.board_id,
-                    board.get_phase_and_year_string(),
-                    player.name,
-                    build_order.player.name,
-                    build_order.__class__.__name__,
+                cursor.executemany(
+                    "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
+                    list(retreat_rows),
                 )
-                for player in players
-                for build_order in player.vassal_orders.values()
-            ],
-        )
-        cursor.close()
-        self._connection.commit()
+                cursor.executemany(
+                    "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
+                    [(*key, retreat_loc) for key, retreat_locs in retreat_rows.items() for retreat_loc in retreat_locs],
+                )
+                cursor.executemany(
+                    "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (board_id, phase, player, location) DO UPDATE SET is_build=?, is_army=?",
+                    [
+                        (*key, location, is_build, is_army, is_build, is_army)
+                        for key, (builds, _) in build_rows.items()
+                        for location, is_build, is_army in builds
+                    ],
+                )
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO vassal_orders (board_id, phase, player, target_player, order_type) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (*key, target_player, order_type)
+                        for key, (_, vassal_orders) in build_rows.items()
+                        for target_player, order_type in vassal_orders
+                    ],
+                )
+                cursor.close()
+                if connection is self._connection:
+                    self._commit()
+                else:
+                    connection.commit()
+            except sqlite3.Error as ex:
+                if connection is not self._connection or not self._transaction_depth:
+                    connection.rollback()
+                logger.error("Could not write queued orders, retrying", exc_info=ex)
+                with self._pending_lock:
+                    # anything queued since is newer and wins
+                    for pending, rows in (
+                        (self._pending_units, unit_rows),
+                        (self._pending_retreats, retreat_rows),
+                        (self._pending_builds, build_rows),
+                    ):
+                        for key, row in rows.items():
+                            pending.setdefault(key, row)
+                self._pending_event.set()
+                if connection is self._connection:
+                    raise
 
     def get_spec_requests(self) -> dict[int, list[SpecRequest]]:
         requests = {}
@@ -623,39 +1075,85 @@ class _DatabaseConnection:
         )
 
         cursor.close()
-        self._connection.commit()
+        self._commit()
 
     def delete_board(self, board: Board):
+        self._check_not_archived(board.board_id)
+        self.flush()
+        self._invalidate_cached_boards(board.board_id)
+        self._count_write(board.board_id, get_phase_id(board))
         cursor = self._connection.cursor()
+        # phases stored as changes from this one are made checkpoints first, so they don't lose the rows they relied on
+        for (dependent,) in cursor.execute(
+            "SELECT phase FROM boards WHERE board_id=? AND base_phase=?",
+            (board.board_id, get_phase_id(board)),
+        ).fetchall():
+            province_rows = self._get_province_rows(cursor, board.board_id, dependent)
+            cursor.execute(
+                "DELETE FROM provinces WHERE board_id=? AND phase=?",
+                (board.board_id, dependent),
+            )
+            cursor.executemany(
+                "INSERT INTO provinces (board_id, phase, province_id, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
+                [(board.board_id, dependent, province_id, *row) for province_id, row in province_rows.items()],
+            )
+            cursor.execute(
+                "UPDATE boards SET base_phase=NULL, delta_depth=0 WHERE board_id=? AND phase=?",
+                (board.board_id, dependent),
+            )
         cursor.execute(
             "DELETE FROM boards WHERE board_id=? AND phase=?",
-            (board.board_id, board.get_phase_and_year_string()),
+            (board.board_id, get_phase_id(board)),
         )
         cursor.execute(
             "DELETE FROM provinces WHERE board_id=? AND phase=?",
-            (board.board_id, board.get_phase_and_year_string()),
+            (board.board_id, get_phase_id(board)),
         )
         cursor.execute(
             "DELETE FROM units WHERE board_id=? AND phase=?",
-            (board.board_id, board.get_phase_and_year_string()),
+            (board.board_id, get_phase_id(board)),
         )
         cursor.execute(
             "DELETE FROM builds WHERE board_id=? AND phase=?",
-            (board.board_id, board.get_phase_and_year_string()),
+            (board.board_id, get_phase_id(board)),
         )
         cursor.execute(
             "DELETE FROM retreat_options WHERE board_id=? AND phase=?",
-            (board.board_id, board.get_phase_and_year_string()),
+            (board.board_id, get_phase_id(board)),
         )
         cursor.execute(
             "DELETE FROM vassal_orders WHERE board_id=? AND phase=?",
-            (board.board_id, board.get_phase_and_year_string()),
+            (board.board_id, get_phase_id(board)),
         )
+        cursor.execute(
+            "DELETE FROM current_board WHERE board_id=? AND phase=?",
+            (board.board_id, get_phase_id(board)),
+        )
+        if cursor.rowcount:
+            # this was the current phase, so the one before it becomes current again
+            cursor.execute(
+                "INSERT INTO current_board (board_id, phase) SELECT board_id, MAX(phase) FROM boards WHERE board_id=? GROUP BY board_id",
+                (board.board_id,),
+            )
         cursor.close()
-        self._connection.commit()
+        self._commit()
+
+    def clear_failed_orders(self, board_id: int, board_phase: phase.Phase, year: int):
+        self._check_not_archived(board_id)
+        self.flush()
+        phase_id = to_phase_id(board_phase, year)
+        self._count_write(board_id, phase_id)
+        self._invalidate_cached_boards(board_id)
+        cursor = self._connection.cursor()
+        cursor.execute("UPDATE units SET failed_order=False WHERE board_id=? and phase=?", (board_id, phase_id))
+        cursor.close()
+        self._commit()
 
     def total_delete(self, board: Board):
+        self.flush()
+        self._invalidate_cached_boards(board.board_id)
         cursor = self._connection.cursor()
+        cursor.execute("DELETE FROM current_board WHERE board_id=?", (board.board_id,))
         cursor.execute("DELETE FROM boards WHERE board_id=?", (board.board_id,))
         cursor.execute("DELETE FROM provinces WHERE board_id=?", (board.board_id,))
         cursor.execute("DELETE FROM units WHERE board_id=?", (board.board_id,))
@@ -666,24 +1164,63 @@ class _DatabaseConnection:
         cursor.execute("DELETE FROM players WHERE board_id=?", (board.board_id,))
         cursor.execute("DELETE FROM spec_requests WHERE server_id=?", (board.board_id,))
         cursor.close()
-        self._connection.commit()
+        self._commit()
+        if board.board_id in self._archived_board_ids:
+            archive = self._get_archive_connection()
+            for table in ARCHIVED_TABLES:
+                archive.execute(f"DELETE FROM {table} WHERE board_id=?", (board.board_id,))
+            archive.commit()
+            self._archived_board_ids.discard(board.board_id)
 
     def execute_arbitrary_sql(self, sql: str, args: tuple):
         # TODO - everywhere using this should just be made into a method probably? idk
+        self.flush()
+        # there's no telling which boards the statement touches
+        self._invalidate_cached_boards()
+        self._count_write()
         cursor = self._connection.cursor()
         cursor.execute(sql, args)
         cursor.close()
-        self._connection.commit()
+        self._commit()
 
     def executemany_arbitrary_sql(self, sql: str, args: list[tuple]):
+        self.flush()
+        self._invalidate_cached_boards()
+        self._count_write()
         cursor = self._connection.cursor()
         cursor.executemany(sql, args)
         cursor.close()
+        self._commit()
+
+    def close(self):
+        self.flush()
         self._connection.commit()
 
     def __del__(self):
+        self.flush()
         self._connection.commit()
         self._connection.close()
+        if self._archive_connection is not None:
+            self._archive_connection.close()
+
+
+def _split_location(location: Location) -> tuple[Province, Coast | None]:
+    if isinstance(location, Coast):
+        return location.province, location
+    return location, None
+
+
+def to_phase_id(board_phase: phase.Phase, year: int) -> int:
+    return year * len(phase.all_phases()) + board_phase.index
+
+
+def from_phase_id(phase_id: int) -> tuple[phase.Phase, int]:
+    year, index = divmod(phase_id, len(phase.all_phases()))
+    return phase.all_phases()[index], year
+
+
+def get_phase_id(board: Board) -> int:
+    return to_phase_id(board.phase, board.year)
 
 
 _db_class: _DatabaseConnection | None = None
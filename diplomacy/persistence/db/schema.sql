@@ -1,10 +1,27 @@
+-- phases are stored as year * 5 + the index of the phase within the year, so they sort chronologically.
+-- province, coast and player names are interned into location_names and player_names, and stored by id everywhere else
+CREATE TABLE IF NOT EXISTS location_names (
+    location_id INTEGER PRIMARY KEY,
+    name text UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS player_names (
+    player_id INTEGER PRIMARY KEY,
+    name text UNIQUE NOT NULL);
 CREATE TABLE IF NOT EXISTS boards (
     board_id int,
-    phase text,
+    phase int,
     data_file text,
     fish int,
 	name text,
+    -- provinces rows of a phase with a base_phase only hold the provinces that changed since base_phase;
+    -- phases without one are checkpoints that hold every province. delta_depth counts the phases since the last checkpoint
+    base_phase int,
+    delta_depth int DEFAULT 0,
     PRIMARY KEY (board_id, phase));
+-- the latest phase of every game, so that finding a game's current board doesn't need to scan its whole history
+CREATE TABLE IF NOT EXISTS current_board (
+    board_id int PRIMARY KEY,
+    phase int,
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase));
 CREATE TABLE IF NOT EXISTS players (
     board_id int,
     player_name text,
@@ -17,63 +34,65 @@ CREATE TABLE IF NOT EXISTS players (
     FOREIGN KEY (board_id) REFERENCES boards (board_id));
 CREATE TABLE IF NOT EXISTS provinces (
     board_id int,
-    phase text,
-    province_name text,
-    owner text,
-    core text,
-    half_core text,
-    PRIMARY KEY (board_id, phase, province_name),
+    phase int,
+    province_id int,
+    owner int,
+    core int,
+    half_core int,
+    PRIMARY KEY (board_id, phase, province_id),
     FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, owner) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, core) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, half_core) REFERENCES players (board_id, player_name));
+    FOREIGN KEY (province_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (owner) REFERENCES player_names (player_id),
+    FOREIGN KEY (core) REFERENCES player_names (player_id),
+    FOREIGN KEY (half_core) REFERENCES player_names (player_id));
 CREATE TABLE IF NOT EXISTS retreat_options (
     board_id int,
-    phase text,
-    origin text,
-    retreat_loc text,
+    phase int,
+    origin int,
+    retreat_loc int,
     PRIMARY KEY (board_id, phase, origin, retreat_loc),
     FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, phase, origin) REFERENCES provinces (board_id, phase, province_name),
-    FOREIGN KEY (board_id, phase, retreat_loc) REFERENCES provinces (board_id, phase, province_name));
+    FOREIGN KEY (origin) REFERENCES location_names (location_id),
+    FOREIGN KEY (retreat_loc) REFERENCES location_names (location_id));
 CREATE TABLE IF NOT EXISTS units (
     board_id int,
-    phase text,
-    location text,
+    phase int,
+    location int,
     is_dislodged boolean,
-    owner text,
+    owner int,
     is_army boolean,
     order_type text,
-    order_destination text,
-    order_source text,
+    order_destination int,
+    order_source int,
     failed_order boolean,
     PRIMARY KEY (board_id, phase, location, is_dislodged),
     FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name),
-    FOREIGN KEY (board_id, owner) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, phase, location) REFERENCES retreat_options (board_id, phase, origin));
+    FOREIGN KEY (location) REFERENCES location_names (location_id),
+    FOREIGN KEY (owner) REFERENCES player_names (player_id),
+    FOREIGN KEY (order_destination) REFERENCES location_names (location_id),
+    FOREIGN KEY (order_source) REFERENCES location_names (location_id));
 CREATE TABLE IF NOT EXISTS builds(
     board_id int,
-    phase text,
-    player text,
-    location text,
+    phase int,
+    player int,
+    location int,
     is_build boolean,
     is_army boolean,
     PRIMARY KEY (board_id, phase, player, location),
     FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name)
+    FOREIGN KEY (player) REFERENCES player_names (player_id),
+    FOREIGN KEY (location) REFERENCES location_names (location_id)
 );
 
 CREATE TABLE IF NOT EXISTS vassal_orders (
     board_id int,
-    phase text,
-    player text,
-    target_player text,
+    phase int,
+    player int,
+    target_player int,
     order_type text,
     PRIMARY KEY (board_id, phase, player, target_player),
-    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player),
-    FOREIGN KEY (board_id, target_player) REFERENCES players (board_id, player)
+    FOREIGN KEY (player) REFERENCES player_names (player_id),
+    FOREIGN KEY (target_player) REFERENCES player_names (player_id)
 );
 CREATE TABLE IF NOT EXISTS spec_requests (
 	request_id INTEGER PRIMARY KEY AUTOINCREMENT,
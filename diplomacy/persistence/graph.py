@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from collections import deque
+from enum import IntFlag
+from itertools import chain
+from typing import Callable
+
+import numpy as np
+
+
+class EdgeType(IntFlag):
+    # to a province that isn't a sea, where an army can go
+    LAND = 1
+    # to a sea
+    SEA = 2
+    # from a coast to the seas and coasts a fleet on it can move to
+    COAST = 4
+    # every province next to a province, what Province.adjacent holds
+    PROVINCE = LAND | SEA
+
+
+class MapGraph:
+    """
+    The adjacencies of a map by integer: every province (impassible ones aside) and coast is a node, provinces first,
+    and the edges of each EdgeType are kept in compressed sparse row form, so the neighbours of node n are
+    indices[indptr[n]:indptr[n + 1]]. A compiled variant has one that all of its boards share; each board maps nodes
+    back to its own locations with Location.at().
+    """
+
+    __slots__ = ("names", "nodes", "sea", "province_of", "edges", "stale", "_adjacency")
+
+    def __init__(
+        self,
+        names: list[str],
+        sea: list[bool],
+        province_of: list[int],
+        adjacency: dict[EdgeType, list[list[int]]],
+    ):
+        self.names: tuple[str, ...] = tuple(names)
+        self.nodes: dict[str, int] = {name: node for node, name in enumerate(self.names)}
+        self.sea: tuple[bool, ...] = tuple(sea)
+        # the province a coast is of, and every province itself
+        self.province_of: tuple[int, ...] = tuple(province_of)
+        self.edges: dict[EdgeType, tuple[np.ndarray, np.ndarray]] = {}
+        for edge_type in (EdgeType.LAND, EdgeType.SEA, EdgeType.COAST):
+            neighbours = adjacency.get(edge_type) or [[] for _ in self.names]
+            indptr = np.zeros(len(self.names) + 1, dtype=np.int32)
+            np.cumsum([len(node_neighbours) for node_neighbours in neighbours], out=indptr[1:])
+            indices = np.fromiter(chain.from_iterable(neighbours), dtype=np.int32, count=indptr[-1])
+            self.edges[edge_type] = (indptr, indices)
+        # only set on a graph of locations that were built directly, once one of their adjacencies is replaced
+        self.stale: bool = False
+        # the neighbours of every node by the edge types asked for, unpacked from the arrays the first time, since
+        # searches that call back into Python for every node walk tuples of ints faster than they do arrays
+        self._adjacency: dict[EdgeType, list[tuple[int, ...]]] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def adjacency(self, edge_types: EdgeType = EdgeType.PROVINCE) -> list[tuple[int, ...]]:
+        adjacency = self._adjacency.get(edge_types)
+        if adjacency is None:
+            adjacency = [() for _ in self.names]
+            for edge_type in (EdgeType.LAND, EdgeType.SEA, EdgeType.COAST):
+                if edge_type & edge_types:
+                    indptr, indices = self.edges[edge_type]
+                    indptr, indices = indptr.tolist(), indices.tolist()
+                    for node in range(len(adjacency)):
+                        adjacency[node] += tuple(indices[indptr[node] : indptr[node + 1]])
+            self._adjacency[edge_types] = adjacency
+        return adjacency
+
+    def neighbours(self, node: int, edge_types: EdgeType = EdgeType.PROVINCE) -> tuple[int, ...]:
+        return self.adjacency(edge_types)[node]
+
+    def bfs(
+        self,
+        start: int,
+        edge_types: EdgeType = EdgeType.PROVINCE,
+        passable: Callable[[int], bool] | None = None,
+        max_depth: int | None = None,
+    ) -> dict[int, int]:
+        """
+        How many steps every node reachable from start is from it. Only start and the nodes passable() is True for
+        are gone through; the others are reached but not gone past.
+        """
+        adjacency = self.adjacency(edge_types)
+        depths = {start: 0}
+        to_visit = deque([start])
+        while to_visit:
+            current = to_visit.popleft()
+            depth = depths[current] + 1
+            if max_depth is not None and depth > max_depth:
+                break
+            for neighbour in adjacency[current]:
+                if neighbour in depths:
+                    continue
+                depths[neighbour] = depth
+                if passable is None or passable(neighbour):
+                    to_visit.append(neighbour)
+        return depths
+
+    def reachable(
+        self,
+        start: int,
+        end: int,
+        edge_types: EdgeType = EdgeType.PROVINCE,
+        passable: Callable[[int], bool] | None = None,
+        min_steps: int = 1,
+    ) -> bool:
+        """
+        Whether end can be reached from start going only through nodes passable() is True for, in at least min_steps
+        steps. Each node is checked for whether it is next to end before passable() is called for its neighbours, and
+        passable() is called once per node at most.
+        """
+        adjacency = self.adjacency(edge_types)
+        depths = {start: 0}
+        to_visit = deque([start])
+        while to_visit:
+            current = to_visit.popleft()
+            depth = depths[current] + 1
+            neighbours = adjacency[current]
+            if depth >= min_steps and end in neighbours:
+                return True
+            for neighbour in neighbours:
+                if neighbour in depths or neighbour == end:
+                    continue
+                depths[neighbour] = depth
+                if passable is None or passable(neighbour):
+                    to_visit.append(neighbour)
+        return False
+
+    def k_hop(self, start: int, k: int, edge_types: EdgeType = EdgeType.PROVINCE) -> set[int]:
+        """Every node at most k steps from start, start included."""
+        return set(self.bfs(start, edge_types, max_depth=k))
@@ -1,14 +1,17 @@
 import logging
+import threading
 import time
 import os
+from collections import OrderedDict, deque
 
 from diplomacy.adjudicator.adjudicator import make_adjudicator
 from diplomacy.adjudicator.mapper import Mapper
-from diplomacy.map_parser.vector.vector import get_parser
+from diplomacy.map_parser.vector.vector import get_parser, warm_up
 from diplomacy.persistence import phase
-from diplomacy.persistence.board import Board
+from diplomacy.persistence.board import Board, get_year_str
 from diplomacy.persistence.db import database
 from diplomacy.persistence.player import Player
+from diplomacy.persistence.snapshot import BoardSnapshot
 from diplomacy.persistence.spec_request import SpecRequest
 
 logger = logging.getLogger(__name__)
@@ -19,28 +22,70 @@ class Manager:
 
     def __init__(self):
         self._database = database.get_connection()
-        self._boards: dict[int, Board] = self._database.get_boards()
+        # boards are loaded from the DB the first time they're needed and unloaded again once they fall out of use,
+        # ordered from least to most recently used
+        self._boards: OrderedDict[int, Board] = OrderedDict()
+        self._last_used: dict[int, float] = {}
+        self._server_ids: set[int] = self._database.get_board_ids()
+        # archived games can still be looked at, but not changed
+        self._archived_server_ids: set[int] = self._database.get_archived_board_ids()
+        self._max_loaded_boards = int(os.getenv("max_loaded_boards", "50"))
+        self._board_idle_timeout = float(os.getenv("board_idle_timeout", "3600"))
+        # snapshots of the last few phases of each loaded game, oldest first, alongside the DB's write count for the
+        # phase when they were taken, so that rollbacks and reloads can skip the DB while it hasn't changed since
+        self._snapshots: dict[int, deque[tuple[BoardSnapshot, int]]] = {}
+        self._kept_snapshots = int(os.getenv("board_snapshots", "8"))
         self._spec_requests: dict[int, list[SpecRequest]] = (
             self._database.get_spec_requests()
         )
+        # set once the variants of active games are parsed, see warm_up_variants
+        self.variants_ready = threading.Event()
+        self.variants_ready.set()
         # TODO: have multiple for each variant?
         # do it like this so that the parser can cache data between board initilizations
 
+    def shutdown(self) -> None:
+        logger.info("Writing queued changes before shutting down")
+        for board in self._boards.values():
+            self._database.save_fish(board)
+        self._database.close()
+
+    def warm_up_variants(self) -> None:
+        """
+        Starts parsing the variant of every active game in worker processes, so the first command in a server doesn't
+        have to. variants_ready is cleared until they are all done.
+        """
+        workers = os.getenv("variant_warm_up_workers")
+        if workers == "0":
+            return
+        self.variants_ready = warm_up(self._database.get_data_files(), int(workers) if workers else None)
+
     def list_servers(self) -> set[int]:
-        return set(self._boards.keys())
+        return set(self._server_ids)
+
+    def get_fish(self) -> dict[int, int]:
+        fish = self._database.get_fish()
+        # loaded boards may have caught fish that haven't been written yet
+        fish.update({server_id: board.fish for server_id, board in self._boards.items()})
+        return fish
 
     def create_game(self, server_id: int, gametype: str = "impdip") -> str:
-        if self._boards.get(server_id):
+        if server_id in self._server_ids:
             return "A game already exists in this server."
+        if server_id in self._archived_server_ids:
+            return "An archived game already exists in this server."
         if not os.path.isfile(f"config/{gametype}.json"):
             return f"Game {gametype} does not exist."
 
         logger.info(f"Creating new game in server {server_id}")
-        self._boards[server_id] = get_parser(gametype + ".json").parse()
-        self._boards[server_id].board_id = server_id
-        self._database.save_board(server_id, self._boards[server_id])
+        board = get_parser(gametype + ".json").parse()
+        board.board_id = server_id
+        self._database.save_board(server_id, board)
+        self._server_ids.add(server_id)
+        self._set_board(server_id, board)
+        self._keep_snapshot(server_id, board.snapshot())
 
-        return f"{self._boards[server_id].data['name']} game created"
+        return f"{board.data['name']} game created"
 
     def get_spec_request(self, server_id: int, user_id: int) -> SpecRequest | None:
         if server_id not in self._spec_requests:
@@ -71,13 +116,100 @@ class Manager:
 
     def get_board(self, server_id: int) -> Board:
         board = self._boards.get(server_id)
-        if not board:
-            raise RuntimeError("There is no existing game this this server.")
+        if board is None:
+            if server_id in self._server_ids or server_id in self._archived_server_ids:
+                board = self._database.get_current_board(server_id)
+            if board is None:
+                raise RuntimeError("There is no existing game this this server.")
+            logger.info(f"Loaded board for server {server_id}")
+            self._keep_snapshot(server_id, board.snapshot())
+        self._set_board(server_id, board)
         return board
 
+    def get_phase_str(self, server_id: int) -> str:
+        """The phase and year a game is in, read from the DB if its board isn't loaded, rather than loading it."""
+        board = self._boards.get(server_id)
+        if board is not None:
+            return f"{board.phase.name} {board.get_year_str()}"
+        current_phase = None
+        if server_id in self._server_ids or server_id in self._archived_server_ids:
+            current_phase = self._database.get_current_phase(server_id)
+        if current_phase is None:
+            raise RuntimeError("There is no existing game this this server.")
+        board_phase, year, data_file = current_phase
+        return f"{board_phase.name} {get_year_str(year, get_parser(data_file).year_offset)}"
+
+    def _keep_snapshot(self, server_id: int, snapshot: BoardSnapshot, write_count: int | None = None) -> None:
+        """
+        Keeps a snapshot of a phase as it is in the DB, which write_count is the DB's write count for (by default,
+        what it is now).
+        """
+        if self._kept_snapshots <= 0:
+            return
+        if write_count is None:
+            write_count = self._database.get_write_count(server_id, snapshot.phase, snapshot.year)
+        snapshots = self._snapshots.setdefault(server_id, deque(maxlen=self._kept_snapshots))
+        for kept in [kept for kept in snapshots if kept[0].phase == snapshot.phase and kept[0].year == snapshot.year]:
+            snapshots.remove(kept)
+        snapshots.append((snapshot, write_count))
+
+    def _get_snapshot(self, server_id: int, board_phase: phase.Phase, year: int) -> BoardSnapshot | None:
+        """A kept snapshot of the phase, if nothing has been written to the phase in the DB since it was taken."""
+        for snapshot, write_count in self._snapshots.get(server_id, ()):
+            if snapshot.phase == board_phase and snapshot.year == year:
+                if write_count == self._database.get_write_count(server_id, board_phase, year):
+                    return snapshot
+                return None
+        return None
+
+    def _set_board(self, server_id: int, board: Board) -> None:
+        self._boards[server_id] = board
+        self._boards.move_to_end(server_id)
+        self._last_used[server_id] = time.monotonic()
+        self._evict_boards(server_id)
+
+    def _evict_boards(self, keep: int) -> None:
+        now = time.monotonic()
+        for server_id, board in list(self._boards.items()):
+            over_budget = len(self._boards) > self._max_loaded_boards
+            idle = now - self._last_used[server_id] > self._board_idle_timeout
+            if not over_budget and not idle:
+                # boards are in order of use, so everything after this one is more recent
+                break
+            if server_id == keep or not board.orders_enabled:
+                # orders_enabled is only kept in memory, so unloading would silently turn orders back on
+                continue
+            self._unload_board(server_id)
+
+    def _unload_board(self, server_id: int) -> None:
+        board = self._boards.pop(server_id)
+        del self._last_used[server_id]
+        self._snapshots.pop(server_id, None)
+        # fish are only written to the DB occasionally, so write them out before forgetting the board
+        self._database.save_fish(board)
+        logger.info(f"Unloaded board for server {server_id}")
+
     def total_delete(self, server_id: int):
-        self._database.total_delete(self._boards[server_id])
+        self._database.total_delete(self.get_board(server_id))
         del self._boards[server_id]
+        del self._last_used[server_id]
+        self._snapshots.pop(server_id, None)
+        self._server_ids.discard(server_id)
+        self._archived_server_ids.discard(server_id)
+
+    def archive(self, server_id: int) -> str:
+        if server_id in self._archived_server_ids:
+            return "The game in this server is already archived."
+        if server_id not in self._server_ids:
+            return "There is no game in this server to archive."
+
+        logger.info(f"Archiving game in server {server_id}")
+        if server_id in self._boards:
+            self._unload_board(server_id)
+        self._database.archive_board(server_id)
+        self._server_ids.discard(server_id)
+        self._archived_server_ids.add(server_id)
+        return "Archived game"
 
     def draw_moves_map(
         self,
@@ -88,7 +220,7 @@ class Manager:
     ) -> tuple[str, str]:
         start = time.time()
 
-        cur_board = self._boards[server_id]
+        cur_board = self.get_board(server_id)
         if turn is None:
             board = cur_board
             season = board.phase
@@ -117,15 +249,29 @@ class Manager:
 
         # mapper = Mapper(self._boards[server_id])
         # mapper.draw_moves_map(None)
-        adjudicator = make_adjudicator(self._boards[server_id])
-        # TODO - use adjudicator.orders() (tells you which ones succeeded and failed) to draw a better moves map
-        new_board = adjudicator.run()
-        new_board.phase = new_board.phase.next
-        if new_board.phase.name == "Spring Moves":
-            new_board.year += 1
-        logger.info("Adjudicator ran successfully")
-        self._boards[server_id] = new_board
-        self._database.save_board(server_id, new_board)
+        board = self.get_board(server_id)
+        # the adjudicator changes the board itself, so if it fails this puts the board back the way the DB still has it
+        before = board.snapshot()
+        # the results of the old phase and the new phase are committed together
+        try:
+            with self._database.transaction():
+                adjudicator = make_adjudicator(board)
+                # the orders as the adjudicator saves them, with invalid ones replaced, which is what a rollback needs
+                old_phase = board.snapshot()
+                # TODO - use adjudicator.orders() (tells you which ones succeeded and failed) to draw a better moves map
+                new_board = adjudicator.run()
+                old_phase_write_count = self._database.get_write_count(server_id, old_phase.phase, old_phase.year)
+                new_board.phase = new_board.phase.next
+                if new_board.phase.name == "Spring Moves":
+                    new_board.year += 1
+                logger.info("Adjudicator ran successfully")
+                self._database.save_board(server_id, new_board)
+        except BaseException:
+            board.restore(before)
+            raise
+        self._set_board(server_id, new_board)
+        self._keep_snapshot(server_id, old_phase, old_phase_write_count)
+        self._keep_snapshot(server_id, new_board.snapshot())
 
         elapsed = time.time() - start
         logger.info(f"manager.adjudicate.{server_id}.{elapsed}s")
@@ -139,7 +285,7 @@ class Manager:
         start = time.time()
 
         svg, file_name = Mapper(
-            self._boards[server_id], player_restriction, color_mode
+            self.get_board(server_id), player_restriction, color_mode
         ).draw_current_map()
 
         elapsed = time.time() - start
@@ -154,7 +300,7 @@ class Manager:
     ) -> tuple[str, str]:
         start = time.time()
         
-        cur_board = self._boards[server_id]
+        cur_board = self.get_board(server_id)
         if turn is None:
             board = cur_board
             season = board.phase
@@ -183,13 +329,14 @@ class Manager:
     ) -> tuple[str, str]:
         start = time.time()
 
+        board = self.get_board(server_id)
         if player_restriction:
             svg, file_name = Mapper(
-                self._boards[server_id], player_restriction, color_mode=color_mode
-            ).draw_moves_map(self._boards[server_id].phase, player_restriction)
+                board, player_restriction, color_mode=color_mode
+            ).draw_moves_map(board.phase, player_restriction)
         else:
-            svg, file_name = Mapper(self._boards[server_id], None).draw_moves_map(
-                self._boards[server_id].phase, None
+            svg, file_name = Mapper(board, None).draw_moves_map(
+                board.phase, None
             )
 
         elapsed = time.time() - start
@@ -201,9 +348,10 @@ class Manager:
     ) -> tuple[str, str]:
         start = time.time()
 
+        board = self.get_board(server_id)
         svg, file_name = Mapper(
-            self._boards[server_id], player_restriction
-        ).draw_moves_map(self._boards[server_id].phase, None)
+            board, player_restriction
+        ).draw_moves_map(board.phase, None)
 
         elapsed = time.time() - start
         logger.info(f"manager.draw_fow_moves_map.{server_id}.{elapsed}s")
@@ -217,9 +365,10 @@ class Manager:
     ) -> tuple[str, str]:
         start = time.time()
 
+        board = self.get_board(server_id)
         svg, file_name = Mapper(
-            self._boards[server_id], player_restriction, color_mode=color_mode
-        ).draw_gui_map(self._boards[server_id].phase, None)
+            board, player_restriction, color_mode=color_mode
+        ).draw_gui_map(board.phase, None)
 
         elapsed = time.time() - start
         logger.info(f"manager.draw_fow_moves_map.{server_id}.{elapsed}s")
@@ -233,9 +382,10 @@ class Manager:
     ) -> tuple[str, str]:
         start = time.time()
 
+        board = self.get_board(server_id)
         svg, file_name = Mapper(
-            self._boards[server_id], color_mode=color_mode
-        ).draw_gui_map(self._boards[server_id].phase, player_restriction)
+            board, color_mode=color_mode
+        ).draw_gui_map(board.phase, player_restriction)
 
         elapsed = time.time() - start
         logger.info(f"manager.draw_moves_map.{server_id}.{elapsed}s")
@@ -243,23 +393,36 @@ class Manager:
 
     def rollback(self, server_id: int) -> dict[str, ...]:
         logger.info(f"Rolling back in server {server_id}")
-        board = self._boards[server_id]
+        board = self.get_board(server_id)
         # TODO: what happens if we're on the first phase?
         last_phase = board.phase.previous
         last_phase_year = board.year
         if board.phase.name == "Spring Moves":
             last_phase_year -= 1
 
-        old_board = self._database.get_board(
-            board.board_id, last_phase, last_phase_year, board.fish, board.name, board.datafile, clear_status=True
-        )
-        if old_board is None:
-            raise ValueError(
-                f"There is no {last_phase_year} {last_phase.name} board for this server"
-            )
-
-        self._database.delete_board(board)
-        self._boards[server_id] = old_board
+        snapshot = self._get_snapshot(server_id, last_phase, last_phase_year)
+        with self._database.transaction():
+            if snapshot is not None:
+                self._database.clear_failed_orders(board.board_id, last_phase, last_phase_year)
+                self._database.delete_board(board)
+                # the board goes back in place, which is the same as loading the phase with clear_status
+                old_board = board
+                old_board.restore(snapshot)
+                for unit in old_board.units:
+                    if unit.order is not None:
+                        unit.order.hasFailed = False
+            else:
+                old_board = self._database.get_board(
+                    board.board_id, last_phase, last_phase_year, board.fish, board.name, board.datafile, clear_status=True
+                )
+                if old_board is None:
+                    raise ValueError(
+                        f"There is no {last_phase_year} {last_phase.name} board for this server"
+                    )
+
+                self._database.delete_board(board)
+        self._set_board(server_id, old_board)
+        self._keep_snapshot(server_id, old_board.snapshot())
         mapper = Mapper(old_board)
 
         message = f"Rolled back to {old_board.get_phase_and_year_string()}"
@@ -267,7 +430,7 @@ class Manager:
         return {"message": message, "file": file, "file_name": file_name}
 
     def get_previous_board(self, server_id: int) -> Board | None:
-        board = self._boards[server_id]
+        board = self.get_board(server_id)
         # TODO: what happens if we're on the first phase?
         last_phase = board.phase.previous
         last_phase_year = board.year
@@ -280,17 +443,25 @@ class Manager:
 
     def reload(self, server_id: int) -> dict[str, ...]:
         logger.info(f"Reloading server {server_id}")
-        board = self._boards[server_id]
-
-        loaded_board = self._database.get_board(
-            server_id, board.phase, board.year, board.fish, board.name, board.datafile
-        )
-        if loaded_board is None:
-            raise ValueError(
-                f"There is no {board.year} {board.phase.name} board for this server"
+        self._database.flush()
+        board = self.get_board(server_id)
+
+        snapshot = self._get_snapshot(server_id, board.phase, board.year)
+        if snapshot is not None:
+            # the snapshot is what the DB would load
+            loaded_board = board
+            loaded_board.restore(snapshot)
+        else:
+            loaded_board = self._database.get_board(
+                server_id, board.phase, board.year, board.fish, board.name, board.datafile
             )
+            if loaded_board is None:
+                raise ValueError(
+                    f"There is no {board.year} {board.phase.name} board for this server"
+                )
+            self._keep_snapshot(server_id, loaded_board.snapshot())
 
-        self._boards[server_id] = loaded_board
+        self._set_board(server_id, loaded_board)
         mapper = Mapper(loaded_board)
 
         message = f"Reloaded board for phase {loaded_board.get_phase_and_year_string()}"
@@ -11,6 +11,9 @@ if TYPE_CHECKING:
 class Order:
     """Order is a player's game state API."""
 
+    # every unit has an order, so none of them have a __dict__
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -20,6 +23,8 @@ class UnitOrder(Order):
     """Unit orders are orders that units execute themselves."""
     display_priority: int = 0
     
+    __slots__ = ("hasFailed",)
+
     def __init__(self):
         super().__init__()
         self.hasFailed = False
@@ -28,6 +33,8 @@ class UnitOrder(Order):
 class ComplexOrder(UnitOrder):
     """Complex orders are orders that operate on other orders (supports and convoys)."""
 
+    __slots__ = ("source",)
+
     def __init__(self, source: Location):
         super().__init__()
         self.source: Location = source
@@ -36,6 +43,8 @@ class ComplexOrder(UnitOrder):
 class Hold(UnitOrder):
     display_priority: int = 20
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -46,6 +55,8 @@ class Hold(UnitOrder):
 class Core(UnitOrder):
     display_priority: int = 20
     
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -56,6 +67,8 @@ class Core(UnitOrder):
 class Move(UnitOrder):
     display_priority: int = 30
     
+    __slots__ = ("destination",)
+
     def __init__(self, destination: Location):
         super().__init__()
         self.destination: Location = destination
@@ -66,6 +79,8 @@ class Move(UnitOrder):
 class ConvoyMove(UnitOrder):
     display_priority: int = 30
     
+    __slots__ = ("destination",)
+
     def __init__(self, destination: Location):
         super().__init__()
         self.destination: Location = destination
@@ -75,6 +90,8 @@ class ConvoyMove(UnitOrder):
 
 
 class ConvoyTransport(ComplexOrder):
+    __slots__ = ("destination",)
+
     def __init__(self, source: Location, destination: Location):
         super().__init__(source)
         self.destination: Location = destination
@@ -86,6 +103,8 @@ class ConvoyTransport(ComplexOrder):
 class Support(ComplexOrder):
     display_priority: int = 10
     
+    __slots__ = ("destination",)
+
     def __init__(self, source: Location, destination: Location):
         super().__init__(source)
         self.destination: Location = destination
@@ -103,6 +122,8 @@ class Support(ComplexOrder):
 
 
 class RetreatMove(UnitOrder):
+    __slots__ = ("destination",)
+
     def __init__(self, destination: Location):
         super().__init__()
         self.destination: Location = destination
@@ -112,6 +133,8 @@ class RetreatMove(UnitOrder):
 
 
 class RetreatDisband(UnitOrder):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -122,6 +145,8 @@ class RetreatDisband(UnitOrder):
 class PlayerOrder(Order):
     """Player orders are orders that belong to a player rather than a unit e.g. builds."""
 
+    __slots__ = ("location",)
+
     def __init__(self, location: Location):
         super().__init__()
         self.location: Location = location
@@ -136,6 +161,8 @@ class PlayerOrder(Order):
 class Build(PlayerOrder):
     """Builds are player orders because the unit does not yet exist."""
 
+    __slots__ = ("unit_type",)
+
     def __init__(self, location: Location, unit_type: UnitType):
         super().__init__(location)
         self.unit_type: UnitType = unit_type
@@ -147,6 +174,8 @@ class Build(PlayerOrder):
 class Disband(PlayerOrder):
     """Disbands are player order because builds are."""
 
+    __slots__ = ()
+
     def __init__(self, location: Location):
         super().__init__(location)
 
@@ -154,6 +183,8 @@ class Disband(PlayerOrder):
         return f"Disband {self.location}"
 
 class Waive(Order):
+    __slots__ = ("quantity",)
+
     def __init__(self, quantity: int):
         super().__init__()
         self.quantity: int = quantity
@@ -166,6 +197,8 @@ class RelationshipOrder(Order):
 
     nameId: str = None
 
+    __slots__ = ("player",)
+
     def __init__(self, player: Player):
         super().__init__()
         self.player = player
@@ -179,35 +212,47 @@ class RelationshipOrder(Order):
 class Vassal(RelationshipOrder):
     """Specifies player to vassalize."""
 
+    __slots__ = ()
+
     def __str__(self):
         return f"Vassalize {self.player}"
 
 class Liege(RelationshipOrder):
     """Specifies player to swear allegiance to."""
 
+    __slots__ = ()
+
     def __str__(self):
         return f"Liege {self.player}"
 
 class DualMonarchy(RelationshipOrder):
     """Specifies player to swear allegiance to."""
 
+    __slots__ = ()
+
     def __str__(self):
         return f"Dual Monarchy with {self.player}"
 
 class Disown(RelationshipOrder):
     """Specifies player to drop as a vassal."""
 
+    __slots__ = ()
+
     def __str__(self):
         return f"Disown {self.player}"
 
 class Defect(RelationshipOrder):
     """Defect. Player is always your liege"""
 
+    __slots__ = ()
+
     def __str__(self):
         return "Defect"
 
 class RebellionMarker(RelationshipOrder):
     """Psudorder to mark rebellion from player due to class"""
 
+    __slots__ = ()
+
     def __str__(self):
         return f"(Rebelling from {self.player})"
\ No newline at end of file
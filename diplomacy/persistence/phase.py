@@ -38,6 +38,11 @@ def get(name: str) -> Phase:
     return _name_to_phase[name]
 
 
+def all_phases() -> list[Phase]:
+    # in order of their index within a year
+    return [_spring_moves, _spring_retreats, _fall_moves, _fall_retreats, _winter_builds]
+
+
 def initial() -> Phase:
     return _spring_moves
 
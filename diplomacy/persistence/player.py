@@ -25,6 +25,28 @@ class PlayerClass(Enum):
 
 
 class Player:
+    __slots__ = (
+        "name",
+        "color_dict",
+        "default_color",
+        "render_color",
+        "win_type",
+        "vscc",
+        "iscc",
+        "centers",
+        "units",
+        "build_orders",
+        "waived_orders",
+        "vassal_orders",
+        "points",
+        "liege",
+        "discord_id",
+        "vassals",
+        # only set by the adjudicator while it works out vassal orders
+        "new_vassals",
+        "new_liege",
+    )
+
     def __init__(
         self,
         name: str,
@@ -7,6 +7,8 @@ import logging
 
 from shapely import Polygon, MultiPolygon
 
+from diplomacy.persistence.graph import EdgeType, MapGraph
+
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
@@ -14,22 +16,216 @@ if TYPE_CHECKING:
     from diplomacy.persistence import unit
 
 
-class Location:
+class ProvinceType(Enum):
+    LAND = 1
+    ISLAND = 2
+    SEA = 3
+    IMPASSIBLE = 4
+
+
+class LocationTopology:
+    """
+    The parts of a location that are the same in every game of a variant. Boards built from a compiled variant share
+    one of these per location, so once the variant is built nothing may modify them.
+    Neighbours are kept by name, since every board has its own Province and Coast objects.
+    """
+
+    __slots__ = ("name", "primary_unit_coordinate", "retreat_unit_coordinate", "all_locs", "all_rets", "graph", "node")
+
     def __init__(
         self,
         name: str,
         primary_unit_coordinate: tuple[float, float],
         retreat_unit_coordinate: tuple[float, float],
     ):
-        self.all_locs = set()
-        self.all_rets = set()
         self.name: str = name
         self.primary_unit_coordinate: tuple[float, float] = primary_unit_coordinate
         self.retreat_unit_coordinate: tuple[float, float] = retreat_unit_coordinate
+        # sets while the parser collects them, tuples once a compiled variant is loaded
+        self.all_locs: set[tuple[float, float]] | tuple[tuple[float, float], ...] = set()
+        self.all_rets: set[tuple[float, float]] | tuple[tuple[float, float], ...] = set()
         if primary_unit_coordinate:
-            self.all_locs: set[tuple[float, float]] = {primary_unit_coordinate}
+            self.all_locs = {primary_unit_coordinate}
         if retreat_unit_coordinate:
-            self.all_rets: set[float[float, float]] = {retreat_unit_coordinate}
+            self.all_rets = {retreat_unit_coordinate}
+        # the map graph this is a node of, which a location built directly only gets once it is first needed
+        self.graph: MapGraph | None = None
+        self.node: int | None = None
+
+
+class ProvinceTopology(LocationTopology):
+    __slots__ = (
+        "geometry",
+        "type",
+        "has_supply_center",
+        "nonadjacent_coasts",
+        "adjacent",
+        "impassible_adjacent",
+        "coasts",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        geometry: Polygon | MultiPolygon,
+        primary_unit_coordinate: tuple[float, float],
+        retreat_unit_coordinate: tuple[float, float],
+        province_type: ProvinceType,
+        has_supply_center: bool,
+    ):
+        super().__init__(name, primary_unit_coordinate, retreat_unit_coordinate)
+        self.geometry: Polygon | MultiPolygon = geometry
+        self.type: ProvinceType = province_type
+        self.has_supply_center: bool = has_supply_center
+        self.nonadjacent_coasts: set[str] | frozenset[str] = set()
+        self.adjacent: tuple[str, ...] = ()
+        self.impassible_adjacent: tuple[str, ...] = ()
+        self.coasts: tuple[CoastTopology, ...] = ()
+
+
+class CoastTopology(LocationTopology):
+    __slots__ = ("adjacent_seas", "adjacent_coasts")
+
+    def __init__(
+        self,
+        name: str,
+        primary_unit_coordinate: tuple[float, float],
+        retreat_unit_coordinate: tuple[float, float],
+    ):
+        super().__init__(name, primary_unit_coordinate, retreat_unit_coordinate)
+        self.adjacent_seas: tuple[str, ...] = ()
+        self.adjacent_coasts: tuple[str, ...] = ()
+
+
+def _shared(attribute: str) -> property:
+    # only the parser and tests set these, on locations they built themselves, never on a shared topology
+    return property(
+        lambda self: getattr(self.topology, attribute),
+        lambda self, value: setattr(self.topology, attribute, value),
+    )
+
+
+def _neighbours(attribute: str) -> property:
+    # a location built from a shared topology looks its neighbours up on its board the first time they are used
+    private = f"_{attribute}"
+
+    def get(self):
+        neighbours = getattr(self, private)
+        if neighbours is None:
+            neighbours = {self._locations[name] for name in getattr(self.topology, attribute)}
+            setattr(self, private, neighbours)
+        return neighbours
+
+    def set(self, value):
+        setattr(self, private, value)
+        # the graph of a location built directly, and what it sees, are worked out from its neighbours again
+        if self.topology.graph is not None:
+            self.topology.graph.stale = True
+        for derived in self._derived:
+            setattr(self, derived, None)
+
+    return property(get, set)
+
+
+def _visible(attribute: str, derive) -> property:
+    # what a unit here sees, worked out from the map graph by derive(location) the first time it is needed
+    private = f"_{attribute}"
+
+    def get(self):
+        visible = getattr(self, private, None)
+        if visible is None:
+            visible = frozenset(derive(self))
+            setattr(self, private, visible)
+        return visible
+
+    return property(get)
+
+
+def _build_graph(location: Location) -> MapGraph:
+    # the graph of the locations connected to one that was built directly rather than from a compiled variant
+    provinces: list[Province] = []
+    seen: set[Province] = set()
+    to_visit = [location.as_province()]
+    while to_visit:
+        province = to_visit.pop()
+        if province in seen:
+            continue
+        seen.add(province)
+        provinces.append(province)
+        to_visit.extend(province.adjacent)
+        for coast in province.coasts:
+            to_visit.extend(coast.adjacent_seas)
+            to_visit.extend(other.province for other in coast.adjacent_coasts)
+
+    coasts = [coast for province in provinces for coast in province.coasts]
+    locations: list[Location] = [*provinces, *coasts]
+    nodes = {location: node for node, location in enumerate(locations)}
+    no_edges = [[] for _ in coasts]
+    graph = MapGraph(
+        [location.name for location in locations],
+        [province.type == ProvinceType.SEA for province in provinces] + [False] * len(coasts),
+        [nodes[location.as_province()] for location in locations],
+        {
+            EdgeType.LAND: [
+                [nodes[adjacent] for adjacent in province.adjacent if adjacent.type != ProvinceType.SEA]
+                for province in provinces
+            ]
+            + no_edges,
+            EdgeType.SEA: [
+                [nodes[adjacent] for adjacent in province.adjacent if adjacent.type == ProvinceType.SEA]
+                for province in provinces
+            ]
+            + no_edges,
+            EdgeType.COAST: [[] for _ in provinces]
+            + [
+                [nodes[sea] for sea in coast.adjacent_seas] + [nodes[other] for other in coast.adjacent_coasts]
+                for coast in coasts
+            ],
+        },
+    )
+    by_name = {location.name: location for location in locations}
+    for node, location in enumerate(locations):
+        location.topology.graph = graph
+        location.topology.node = node
+        location._locations = by_name
+    return graph
+
+
+class Location:
+    primary_unit_coordinate: tuple[float, float] = _shared("primary_unit_coordinate")
+    retreat_unit_coordinate: tuple[float, float] = _shared("retreat_unit_coordinate")
+    all_locs: set[tuple[float, float]] = _shared("all_locs")
+    all_rets: set[tuple[float, float]] = _shared("all_rets")
+
+    # boards hold hundreds of these, so they have no __dict__; the private slots hold the resolved neighbours
+    __slots__ = ("topology", "name", "_locations")
+
+    # the private slots derived from the neighbours, which have to be worked out again when those are replaced
+    _derived: tuple[str, ...] = ()
+
+    def __init__(self, topology: LocationTopology):
+        self.topology = topology
+        self.name: str = topology.name
+
+    @property
+    def graph(self) -> MapGraph:
+        graph = self.topology.graph
+        if graph is None or graph.stale:
+            graph = _build_graph(self)
+        return graph
+
+    @property
+    def node(self) -> int:
+        # numbered when the graph is built
+        self.graph
+        return self.topology.node
+
+    def at(self, node: int) -> Location:
+        """The location of this one's board that is node of the graph its graph property gives."""
+        return self._locations[self.topology.graph.names[node]]
+
+    def neighbours(self, edge_types: EdgeType = EdgeType.PROVINCE) -> list[Location]:
+        return [self.at(node) for node in self.graph.neighbours(self.node, edge_types)]
 
     @abstractmethod
     def get_owner(self) -> player.Player | None:
@@ -50,14 +246,29 @@ class Location:
         return f"Location {self.name}"
 
 
-class ProvinceType(Enum):
-    LAND = 1
-    ISLAND = 2
-    SEA = 3
-    IMPASSIBLE = 4
-
-
 class Province(Location):
+    geometry: Polygon | MultiPolygon = _shared("geometry")
+    type: ProvinceType = _shared("type")
+    has_supply_center: bool = _shared("has_supply_center")
+    nonadjacent_coasts: set[str] = _shared("nonadjacent_coasts")
+    adjacent: set[Province] = _neighbours("adjacent")
+    impassible_adjacent: set[Province] = _neighbours("impassible_adjacent")
+    army_visible: frozenset[Province] = _visible("army_visible", lambda province: province.neighbours(EdgeType.LAND))
+    _derived = ("_army_visible",)
+
+    __slots__ = (
+        "_adjacent",
+        "_impassible_adjacent",
+        "_army_visible",
+        "coasts",
+        "corer",
+        "core",
+        "half_core",
+        "owner",
+        "unit",
+        "dislodged_unit",
+    )
+
     def __init__(
         self,
         name: str,
@@ -72,20 +283,40 @@ class Province(Location):
         owner: player.Player | None,
         local_unit: unit.Unit | None,  # TODO: probably doesn't make sense to init with a unit
     ):
-        super().__init__(name, primary_unit_coordinate, retreat_unit_coordinate)
-        self.geometry: Polygon = coordinates
-        self.type: ProvinceType = province_type
-        self.has_supply_center: bool = has_supply_center
-        self.adjacent: set[Province] = adjacent
-        self.impassible_adjacent: set[Province] = set()
+        super().__init__(
+            ProvinceTopology(
+                name, coordinates, primary_unit_coordinate, retreat_unit_coordinate, province_type, has_supply_center
+            )
+        )
+        self._locations: dict[str, Location] = {}
+        self.adjacent = adjacent
+        self.impassible_adjacent = set()
         self.coasts: set[Coast] = coasts
+        self._init_state(core, owner, local_unit)
+
+    @classmethod
+    def from_topology(cls, topology: ProvinceTopology, locations: dict[str, Location]) -> Province:
+        """
+        A province of a new board that shares topology with every other board of the variant. locations maps the
+        names of all of the board's provinces and coasts to them; neighbours are looked up there when first needed.
+        """
+        province = cls.__new__(cls)
+        Location.__init__(province, topology)
+        province._locations = locations
+        province._adjacent = None
+        province._impassible_adjacent = None
+        province.coasts = {Coast.from_topology(coast, province, locations) for coast in topology.coasts}
+        province._init_state(None, None, None)
+        return province
+
+    def _init_state(self, core: player.Player | None, owner: player.Player | None, local_unit: unit.Unit | None):
+        # the part that changes as the game goes on
         self.corer: player.Player | None = None
         self.core: player.Player | None = core
         self.half_core: player.Player | None = None
         self.owner: player.Player | None = owner
         self.unit: unit.Unit | None = local_unit
         self.dislodged_unit: unit.Unit | None = None
-        self.nonadjacent_coasts: set[str] = set()
 
     def __str__(self):
         return self.name
@@ -161,6 +392,15 @@ class Province(Location):
             self.coasts.add(Coast(name, None, None, coast_set, self))
 
 class Coast(Location):
+    adjacent_seas: set[Province] = _neighbours("adjacent_seas")
+    adjacent_coasts: set[Coast] = _neighbours("adjacent_coasts")
+    fleet_visible: frozenset[Province] = _visible(
+        "fleet_visible", lambda coast: (location.as_province() for location in coast.neighbours(EdgeType.COAST))
+    )
+    _derived = ("_fleet_visible",)
+
+    __slots__ = ("_adjacent_seas", "_adjacent_coasts", "_fleet_visible", "province")
+
     def __init__(
         self,
         name: str,
@@ -169,10 +409,21 @@ class Coast(Location):
         adjacent_seas: set[Province],
         province: Province,
     ):
-        super().__init__(name, primary_unit_coordinate, retreat_unit_coordinate)
-        self.adjacent_seas: set[Province] = adjacent_seas
+        super().__init__(CoastTopology(name, primary_unit_coordinate, retreat_unit_coordinate))
+        self._locations: dict[str, Location] = {}
+        self.adjacent_seas = adjacent_seas
         self.province: Province = province
-        self.adjacent_coasts: set[Coast] = set()
+        self.adjacent_coasts = set()
+
+    @classmethod
+    def from_topology(cls, topology: CoastTopology, province: Province, locations: dict[str, Location]) -> Coast:
+        coast = cls.__new__(cls)
+        Location.__init__(coast, topology)
+        coast._locations = locations
+        coast._adjacent_seas = None
+        coast._adjacent_coasts = None
+        coast.province = province
+        return coast
 
     def __str__(self):
         return self.name
@@ -189,6 +440,48 @@ class Coast(Location):
     def as_province(self) -> Province:
         return self.province
 
+    @staticmethod
+    def count_surrounding_rings(c1: Coast, c2: Coast, possible_tripoint: Province) -> int:
+        """
+        Groups everything around the two coasts' provinces and the sea between them into connected sets, and counts
+        the sets that touch all three. One set means it rings them, so the coasts meet at the sea; two means there's a
+        ring inside and one outside, so they don't.
+        """
+        # the algorithm is as follows
+        # connect all adjacent to the three provinces as possible
+        # if they all connect, they form a ring around forcing connection
+        # if not, they must form rings inside and outside, meaning there is no connection
+        centre = (c1.province, c2.province, possible_tripoint)
+        # union-find over the surrounding provinces, each starting in a set of its own
+        parent: dict[Province, Province] = {}
+        for adjacent in c1.province.adjacent | c1.province.impassible_adjacent | \
+                        c2.province.adjacent | c2.province.impassible_adjacent | \
+                        possible_tripoint.adjacent | possible_tripoint.impassible_adjacent:
+            if adjacent not in centre:
+                parent[adjacent] = adjacent
+
+        def find(province: Province) -> Province:
+            while parent[province] is not province:
+                parent[province] = parent[parent[province]]
+                province = parent[province]
+            return province
+
+        for to_process in parent:
+            for neighbor in to_process.adjacent:
+                # going further into or out of rings won't help us
+                if neighbor in parent:
+                    root, other = find(to_process), find(neighbor)
+                    if root is not other:
+                        parent[other] = root
+
+        connected_sets: dict[Province, set[Province]] = {}
+        for province in parent:
+            connected_sets.setdefault(find(province), set()).update(province.adjacent)
+
+        # find connected sets which are adjacent to tripoint and two provinces (so portugal is eliminated from contention if MAO, Gascony, and Spain nc are the locations being tested)
+        # FIXME: this leads to false positives
+        return sum(1 for neighbors in connected_sets.values() if neighbors.issuperset(centre))
+
     @staticmethod
     def detect_costal_connection(c1: Coast, c2: Coast):
         # multiple possible tripoints could happen if there was a scenario
@@ -201,54 +494,7 @@ class Coast(Location):
             if len(possible_tripoint.adjacent) == 2 or len(c1.province.adjacent) == 2 or len(c2.province.adjacent) == 2:
                 return True
 
-            # the algorithm is as follows
-            # connect all adjacent to the three provinces as possible
-            # if they all connect, they form a ring around forcing connection
-            # if not, they must form rings inside and outside, meaning there is no connection
-            
-            # initialise the process queue and the connection sets
-            procqueue: list[Province] = []
-            connected_sets: set[frozenset[Province]] = set()
-
-            for adjacent in c1.province.adjacent | c1.province.impassible_adjacent | \
-                            c2.province.adjacent | c2.province.impassible_adjacent | \
-                            possible_tripoint.adjacent | possible_tripoint.impassible_adjacent:
-                if adjacent not in (c1.province, c2.province, possible_tripoint):
-                    procqueue.append(adjacent)
-                    connected_sets.add(frozenset({adjacent}))
-            
-            def find_set_with_element(element):
-                for subgraph in connected_sets:
-                    if element in subgraph:
-                        return subgraph
-                raise Exception("Error in costal_connection algorithm")
-
-            # we will retain the invariant that no two elements of connected_sets contain the same element
-            for to_process in procqueue:
-                for neighbor in to_process.adjacent:
-                    # going further into or out of rings won't help us
-                    if neighbor not in procqueue:
-                        continue
-                    
-                    # Now that we have found two connected subgraphs,
-                    # we remove them and merge them
-                    this = find_set_with_element(to_process)
-                    other = find_set_with_element(neighbor)
-                    connected_sets = connected_sets - {this, other}
-                    connected_sets.add(this | other)            
-
-            l = 0
-
-            # find connected sets which are adjacent to tripoint and two provinces (so portugal is eliminated from contention if MAO, Gascony, and Spain nc are the locations being tested)
-            # FIXME: this leads to false positives
-            for candidate in connected_sets:
-                needed_neighbors = set([c1.province, c2.province, possible_tripoint])
-
-                for province in candidate:
-                    needed_neighbors.difference_update(province.adjacent)
-
-                if len(needed_neighbors) == 0:
-                    l += 1
+            l = Coast.count_surrounding_rings(c1, c2, possible_tripoint)
 
             # If there is 1, that means there was 1 ring (yes)
             # 2, there was two (no)
@@ -257,8 +503,7 @@ class Coast(Location):
                 return True
             elif l != 2:
                 logger.error(f"WARNING: len(connected_sets) should've been 1 or 2, but got {l}.\n"
-                            f"hint: between coasts {c1} and {c2}, when looking at mutual sea {possible_tripoint}\n"
-                            f"Final state: {connected_sets}")
+                            f"hint: between coasts {c1} and {c2}, when looking at mutual sea {possible_tripoint}")
 
         # no connection worked
         return False
@@ -289,7 +534,7 @@ class Coast(Location):
 
 def get_adjacent_provinces(location: Location) -> set[Province] | set[Coast]:
     if isinstance(location, Coast):
-        return location.adjacent_seas | {coast.province for coast in location.adjacent_coasts}
+        return location.fleet_visible
     if isinstance(location, Province):
         return location.adjacent
     raise ValueError(f"Location {location} should be Coast or Province")
\ No newline at end of file
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from diplomacy.persistence.order import (
+    Hold,
+    Core,
+    Move,
+    ConvoyMove,
+    ConvoyTransport,
+    Support,
+    RetreatMove,
+    RetreatDisband,
+    Build,
+    Disband,
+    Vassal,
+    Liege,
+    DualMonarchy,
+    Disown,
+    Defect,
+    RebellionMarker,
+)
+from diplomacy.persistence.phase import Phase
+from diplomacy.persistence.player import Player
+from diplomacy.persistence.province import Province, Coast, Location
+from diplomacy.persistence.unit import Unit, UnitType
+
+if TYPE_CHECKING:
+    from diplomacy.persistence.board import Board
+
+# what the order and unit type codes stand for, -1 being none
+UNIT_ORDERS = (Hold, Core, Move, ConvoyMove, ConvoyTransport, Support, RetreatMove, RetreatDisband)
+RELATIONSHIP_ORDERS = (Vassal, Liege, DualMonarchy, Disown, Defect, RebellionMarker)
+UNIT_TYPES = (UnitType.ARMY, UnitType.FLEET)
+_UNIT_ORDER_CODES = {order_class: code for code, order_class in enumerate(UNIT_ORDERS)}
+_RELATIONSHIP_ORDER_CODES = {order_class: code for code, order_class in enumerate(RELATIONSHIP_ORDERS)}
+_UNIT_TYPE_CODES = {unit_type: code for code, unit_type in enumerate(UNIT_TYPES)}
+
+# index 0 of the unit arrays is the unit in a province, 1 the one dislodged from it
+_UNIT, _DISLODGED = 0, 1
+
+
+class StateIndex:
+    """
+    The numbers a board's provinces, coasts and players go by in its snapshots: provinces first, sorted by name, then
+    their coasts, and players sorted by name. Boards of the same variant number everything the same way, so a snapshot
+    of one can be restored onto another.
+    """
+
+    __slots__ = ("provinces", "locations", "players", "location_ids", "player_ids")
+
+    def __init__(self, board: Board):
+        self.provinces: list[Province] = sorted(board.provinces, key=lambda province: province.name)
+        self.locations: list[Location] = [
+            *self.provinces,
+            *(coast for province in self.provinces for coast in sorted(province.coasts, key=lambda coast: coast.name)),
+        ]
+        self.players: list[Player] = sorted(board.players, key=lambda player: player.name)
+        self.location_ids: dict[Location, int] = {location: i for i, location in enumerate(self.locations)}
+        self.player_ids: dict[Player | None, int] = {player: i for i, player in enumerate(self.players)}
+        self.player_ids[None] = -1
+
+
+class BoardSnapshot:
+    """
+    The state of a board that changes from phase to phase, as arrays indexed by province (or location, for coasts
+    and order targets) and player number, which take a few kilobytes and don't refer to the board they came from.
+    The unit arrays have a row for the units in provinces and one for those dislodged from them, and the retreat
+    options of a dislodged unit are retreat_options[retreat_starts[p]:retreat_starts[p + 1]].
+    """
+
+    __slots__ = (
+        "phase",
+        "year",
+        "owner",
+        "core",
+        "half_core",
+        "unit_type",
+        "unit_owner",
+        "unit_coast",
+        "order_type",
+        "order_destination",
+        "order_source",
+        "order_failed",
+        "retreat_starts",
+        "retreat_options",
+        "builds",
+        "vassal_orders",
+    )
+
+    def __init__(self, board: Board):
+        index = board._get_state_index()
+        location_ids, player_ids = index.location_ids, index.player_ids
+        count = len(index.provinces)
+        self.phase: Phase = board.phase
+        self.year: int = board.year
+
+        owner, core, half_core = [], [], []
+        unit_type, unit_owner, unit_coast = [-1] * count * 2, [-1] * count * 2, [-1] * count * 2
+        order_type, order_destination, order_source = [-1] * count * 2, [-1] * count * 2, [-1] * count * 2
+        order_failed = [False] * count * 2
+        retreat_lengths, retreat_options = [0] * count, []
+        for province_id, province in enumerate(index.provinces):
+            owner.append(player_ids[province.owner])
+            core.append(player_ids[province.core])
+            half_core.append(player_ids[province.half_core])
+            for row, unit in ((_UNIT, province.unit), (_DISLODGED, province.dislodged_unit)):
+                if unit is None:
+                    continue
+                i = row * count + province_id
+                unit_type[i] = _UNIT_TYPE_CODES[unit.unit_type]
+                unit_owner[i] = player_ids[unit.player]
+                if unit.coast is not None:
+                    unit_coast[i] = location_ids[unit.coast]
+                if row == _DISLODGED and unit.retreat_options:
+                    retreat_lengths[province_id] = len(unit.retreat_options)
+                    retreat_options += sorted(location_ids[option] for option in unit.retreat_options)
+                order = unit.order
+                if order is None:
+                    continue
+                order_type[i] = _UNIT_ORDER_CODES[type(order)]
+                order_failed[i] = order.hasFailed
+                destination = getattr(order, "destination", None)
+                if destination is not None:
+                    order_destination[i] = location_ids[destination]
+                source = getattr(order, "source", None)
+                if source is not None:
+                    order_source[i] = location_ids[source]
+
+        builds, vassal_orders = [], []
+        for player_id, player in enumerate(index.players):
+            for build_order in player.build_orders:
+                if isinstance(build_order, (Build, Disband)):
+                    is_build = isinstance(build_order, Build)
+                    is_army = is_build and build_order.unit_type == UnitType.ARMY
+                    builds.append((player_id, location_ids[build_order.location], is_build, is_army))
+            for target, relationship_order in player.vassal_orders.items():
+                vassal_orders.append(
+                    (player_id, player_ids[target], _RELATIONSHIP_ORDER_CODES[type(relationship_order)])
+                )
+
+        self.owner: np.ndarray = _frozen(owner, np.int16)
+        self.core: np.ndarray = _frozen(core, np.int16)
+        self.half_core: np.ndarray = _frozen(half_core, np.int16)
+        self.unit_type: np.ndarray = _frozen(unit_type, np.int8).reshape(2, count)
+        self.unit_owner: np.ndarray = _frozen(unit_owner, np.int16).reshape(2, count)
+        self.unit_coast: np.ndarray = _frozen(unit_coast, np.int16).reshape(2, count)
+        self.order_type: np.ndarray = _frozen(order_type, np.int8).reshape(2, count)
+        self.order_destination: np.ndarray = _frozen(order_destination, np.int16).reshape(2, count)
+        self.order_source: np.ndarray = _frozen(order_source, np.int16).reshape(2, count)
+        self.order_failed: np.ndarray = _frozen(order_failed, np.bool_).reshape(2, count)
+        starts = np.zeros(count + 1, dtype=np.int32)
+        np.cumsum(retreat_lengths, out=starts[1:])
+        starts.flags.writeable = False
+        self.retreat_starts: np.ndarray = starts
+        self.retreat_options: np.ndarray = _frozen(retreat_options, np.int16)
+        # (player, location, is build, is army) and (player, target player, relationship order) rows
+        self.builds: np.ndarray = _frozen(builds, np.int16).reshape(-1, 4)
+        self.vassal_orders: np.ndarray = _frozen(vassal_orders, np.int16).reshape(-1, 3)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__ if isinstance(getattr(self, name), np.ndarray))
+
+    def restore(self, board: Board) -> None:
+        """
+        Puts the board back into the state this was taken from, with new units and orders. Player points, lieges and
+        colors aren't kept per phase, by the DB either, so they are left as they are.
+        """
+        index = board._get_state_index()
+        provinces, locations, players = index.provinces, index.locations, index.players
+        if len(provinces) != len(self.owner):
+            raise ValueError("This snapshot was taken of a board of a different variant")
+        board.phase = self.phase
+        board.year = self.year
+
+        for player in players:
+            player.units = set()
+            player.centers = set()
+            player.build_orders = set()
+            player.waived_orders = 0
+            player.vassal_orders = {}
+        board.units.clear()
+
+        def player_at(player_id: int) -> Player | None:
+            return None if player_id < 0 else players[player_id]
+
+        for province, owner, core, half_core in zip(
+            provinces, self.owner.tolist(), self.core.tolist(), self.half_core.tolist()
+        ):
+            province.owner = player_at(owner)
+            province.core = player_at(core)
+            province.half_core = player_at(half_core)
+            province.corer = None
+            province.unit = None
+            province.dislodged_unit = None
+            if province.owner is not None and province.has_supply_center:
+                province.owner.centers.add(province)
+
+        unit_type, unit_owner, unit_coast = self.unit_type.tolist(), self.unit_owner.tolist(), self.unit_coast.tolist()
+        order_type, order_failed = self.order_type.tolist(), self.order_failed.tolist()
+        order_destination, order_source = self.order_destination.tolist(), self.order_source.tolist()
+        retreat_starts, retreat_options = self.retreat_starts.tolist(), self.retreat_options.tolist()
+        for row in (_UNIT, _DISLODGED):
+            for province_id in np.flatnonzero(self.unit_type[row] >= 0).tolist():
+                province = provinces[province_id]
+                coast_id = unit_coast[row][province_id]
+                coast: Coast | None = None if coast_id < 0 else locations[coast_id]
+                retreats = None
+                if row == _DISLODGED:
+                    retreats = {
+                        locations[option]
+                        for option in retreat_options[retreat_starts[province_id] : retreat_starts[province_id + 1]]
+                    }
+                player = players[unit_owner[row][province_id]]
+                unit = Unit(UNIT_TYPES[unit_type[row][province_id]], player, province, coast, retreats)
+                if row == _DISLODGED:
+                    province.dislodged_unit = unit
+                else:
+                    province.unit = unit
+                player.units.add(unit)
+                board.units.add(unit)
+
+                # orders refer to locations rather than units, so they can be made along with their units
+                code = order_type[row][province_id]
+                if code < 0:
+                    continue
+                order_class = UNIT_ORDERS[code]
+                destination, source = order_destination[row][province_id], order_source[row][province_id]
+                if order_class in (Hold, Core, RetreatDisband):
+                    unit.order = order_class()
+                elif order_class in (Move, ConvoyMove, RetreatMove):
+                    unit.order = order_class(locations[destination])
+                else:
+                    unit.order = order_class(locations[source], locations[destination])
+                unit.order.hasFailed = order_failed[row][province_id]
+
+        for player_id, location, is_build, is_army in self.builds.tolist():
+            if is_build:
+                build_order = Build(locations[location], UnitType.ARMY if is_army else UnitType.FLEET)
+            else:
+                build_order = Disband(locations[location])
+            players[player_id].build_orders.add(build_order)
+        for player_id, target_id, code in self.vassal_orders.tolist():
+            target = players[target_id]
+            players[player_id].vassal_orders[target] = RELATIONSHIP_ORDERS[code](target)
+
+
+def _frozen(values: list, dtype) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
@@ -16,6 +16,8 @@ class UnitType(Enum):
 
 
 class Unit:
+    __slots__ = ("unit_type", "player", "province", "coast", "retreat_options", "order")
+
     def __init__(
         self,
         unit_type: UnitType,
@@ -0,0 +1,78 @@
+import unittest
+
+from benchmarks.coasts import legacy_detect_costal_connection, make_provinces
+from diplomacy.persistence.province import Coast, Province, ProvinceType
+
+
+def make_map(
+    edges: list[str], seas: set[str] = frozenset(), impassible: set[str] = frozenset()
+) -> dict[str, Province]:
+    """Provinces joined by edges like "A-B", without geometry, which the ring count doesn't use."""
+    provinces = {}
+
+    def get(name: str) -> Province:
+        if name not in provinces:
+            province_type = (
+                ProvinceType.SEA if name in seas else ProvinceType.IMPASSIBLE if name in impassible else ProvinceType.LAND
+            )
+            provinces[name] = Province(name, None, None, None, province_type, False, set(), set(), None, None, None)
+        return provinces[name]
+
+    for edge in edges:
+        first, second = map(get, edge.split("-"))
+        first.set_adjacent(second)
+        second.set_adjacent(first)
+    return provinces
+
+
+def coast(province: Province, sea: Province) -> Coast:
+    return Coast(f"{province.name} coast", None, None, {sea}, province)
+
+
+class TestSurroundingRings(unittest.TestCase):
+    """
+    Two coasts that share a sea meet at it when what's around the two provinces and the sea forms a single ring; if
+    there's one ring inside and one outside, the provinces' shared border cuts the sea off between them.
+    """
+
+    # A and B share a border and both touch the sea S; P, Q and R go round the three of them
+    AROUND = ["A-B", "A-S", "B-S", "P-A", "P-S", "Q-B", "Q-S", "R-A", "R-B", "P-Q", "Q-R", "R-P"]
+
+    def check(self, provinces: dict[str, Province], rings: int):
+        a, b, sea = provinces["A"], provinces["B"], provinces["S"]
+        c1, c2 = coast(a, sea), coast(b, sea)
+        self.assertEqual(Coast.count_surrounding_rings(c1, c2, sea), rings)
+        self.assertEqual(Coast.detect_costal_connection(c1, c2), rings == 1)
+        self.assertEqual(legacy_detect_costal_connection(c1, c2), rings == 1)
+
+    def test_one_ring(self):
+        self.check(make_map(self.AROUND, seas={"S", "P", "Q"}), 1)
+
+    def test_two_rings(self):
+        """Something inside, touching all three, as well as the ring outside them."""
+        self.check(make_map(self.AROUND + ["I-A", "I-B", "I-S"], seas={"S", "P", "Q"}), 2)
+
+    def test_impassible_neighbour(self):
+        """An impassible province still closes a ring around the others."""
+        edges = [edge.replace("Q", "X") for edge in self.AROUND]
+        self.check(make_map(edges, seas={"S", "P"}, impassible={"X"}), 1)
+        self.check(make_map(edges + ["I-A", "I-B", "I-S"], seas={"S", "P"}, impassible={"X"}), 2)
+
+    def test_against_old_algorithm(self):
+        """On a synthetic map of Voronoi cells, union-find agrees with merging sets by scanning for every coast pair."""
+        provinces = make_provinces(300, 0.3)
+        pairs = [
+            (coast1, coast2)
+            for province in provinces
+            if province.type != ProvinceType.ISLAND
+            for coast1 in province.coasts
+            for province2 in province.adjacent
+            for coast2 in province2.coasts
+        ]
+        self.assertGreater(len(pairs), 100)
+        for coast1, coast2 in pairs:
+            self.assertEqual(
+                Coast.detect_costal_connection(coast1, coast2),
+                legacy_detect_costal_connection(coast1, coast2),
+                f"{coast1} - {coast2}",
+            )
@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from diplomacy.map_parser.vector import compiled
+from diplomacy.map_parser.vector.compiled import get_compiled_path, get_variant_hash
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.unit import UnitType
+
+# a variant of four provinces: Alpha (red), Beta (blue) and Gamma (unowned) are land, and Ocean is the sea south
+# east of them; Alpha and Beta have centers and start with an army and a fleet
+SVG = """<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd">
+  <g id="land">
+    <path inkscape:label="Alpha" style="fill:#ff0000" d="M 0,0 H 10 V 10 H 0 Z"/>
+    <path inkscape:label="Beta" style="fill:#0000ff" d="M 10,0 H 20 V 10 H 10 Z"/>
+    <path inkscape:label="Gamma" style="fill:{gamma}" d="M 0,10 H 10 V 20 H 0 Z"/>
+  </g>
+  <g id="sea" transform="translate(10 10)">
+    <path inkscape:label="Ocean" d="m 0,0 h 10 v 10 h -10 z"/>
+  </g>
+  <g id="islands"/>
+  <g id="island_fill"/>
+  <g id="names"/>
+  <g id="banners"/>
+  <g id="centers">
+    <g inkscape:label="Alpha"><circle cx="5" cy="5" r="1"/></g>
+    <g inkscape:label="Beta"><circle cx="15" cy="5" r="1"/></g>
+  </g>
+  <g id="units">
+    <g inkscape:label="Alpha"><path sodipodi:sides="6" d="M 5,5 h 1"/></g>
+    <g inkscape:label="Beta"><path sodipodi:sides="3" d="M 15,5 h 1"/></g>
+  </g>
+  <g id="army">
+    <g inkscape:label="Alpha"><path sodipodi:cx="4" sodipodi:cy="6" d="M 4,6 h 1"/></g>
+    <g inkscape:label="Gamma"><path sodipodi:cx="5" sodipodi:cy="15" d="M 5,15 h 1"/></g>
+  </g>
+  <g id="retreat_army"/>
+  <g id="fleet">
+    <g inkscape:label="Ocean" transform="translate(1 1)"><path sodipodi:cx="14" sodipodi:cy="14" d="M 14,14 h 1"/></g>
+  </g>
+  <g id="retreat_fleet"/>
+</svg>
+"""
+
+CONFIG = {
+    "name": "Tiny",
+    "file": "assets/tiny.svg",
+    "svg config": {
+        "land_layer": "land",
+        "island_borders": "islands",
+        "island_fill_layer": "island_fill",
+        "sea_borders": "sea",
+        "province_names": "names",
+        "supply_center_icons": "centers",
+        "power_banners": "banners",
+        "starting_units": "units",
+        "army": "army",
+        "retreat_army": "retreat_army",
+        "fleet": "fleet",
+        "retreat_fleet": "retreat_fleet",
+        "detect_starting_units": True,
+        "unit_type_labeled": False,
+        "unit_labels": True,
+        "province_labels": True,
+        "center_labels": True,
+        "border_margin_hint": 1,
+        "neutral": "c6b7ab",
+        "neutral_sc": "ffffff",
+    },
+    "victory_conditions": "vscc",
+    "overrides": {},
+    "players": {
+        "Red": {"color": "ff0000", "vscc": 2, "iscc": 1},
+        "Blue": {"color": "0000ff", "vscc": 2, "iscc": 1},
+    },
+}
+
+
+def state(board: Board) -> dict:
+    """Everything about a new board that the compiled artifact should reproduce, by name."""
+
+    def coordinates(location) -> tuple:
+        return (
+            location.primary_unit_coordinate,
+            location.retreat_unit_coordinate,
+            sorted(location.all_locs),
+            sorted(location.all_rets),
+        )
+
+    return {
+        "phase": (board.phase.name, board.year, board.year_offset, board.fow, board.datafile),
+        "provinces": {
+            province.name: (
+                province.type,
+                province.has_supply_center,
+                province.geometry.normalize().wkt,
+                sorted(adjacent.name for adjacent in province.adjacent),
+                str(province.owner),
+                str(province.core),
+                str(province.half_core),
+                coordinates(province),
+                sorted(
+                    (
+                        coast.name,
+                        sorted(sea.name for sea in coast.adjacent_seas),
+                        sorted(other.name for other in coast.adjacent_coasts),
+                        coordinates(coast),
+                    )
+                    for coast in province.coasts
+                ),
+            )
+            for province in board.provinces
+        },
+        "players": {
+            player.name: (
+                player.default_color,
+                player.vscc,
+                player.iscc,
+                sorted(center.name for center in player.centers),
+                sorted((unit.unit_type, unit.province.name, str(unit.coast)) for unit in player.units),
+            )
+            for player in board.players
+        },
+    }
+
+
+class TestCompiledVariant(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # the parser reads config/ and the SVG relative to the working directory
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs("config")
+        os.makedirs("assets")
+        self.write_variant()
+        cache = mock.patch.object(compiled, "COMPILED_DIR", os.path.join(directory.name, "cache"))
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def write_variant(self, config: dict = CONFIG, gamma: str = "#c6b7ab"):
+        with open("config/tiny.json", "w") as f:
+            json.dump(config, f)
+        with open("assets/tiny.svg", "w") as f:
+            f.write(SVG.replace("{gamma}", gamma))
+
+    def artifact(self) -> str:
+        return get_compiled_path("tiny.json", get_variant_hash("config/tiny.json", "assets/tiny.svg"))
+
+    def test_same_as_parsed_svg(self):
+        """A board built from the compiled variant is the same as one parsed straight from the SVG."""
+        board = Parser("tiny.json").parse()
+        self.assertTrue(os.path.isfile(self.artifact()))
+        expected = state(Parser("tiny.json")._parse_svg())
+        self.assertEqual(state(board), expected)
+        # and so is one built from the artifact by another parser, which doesn't read the SVG
+        with mock.patch.object(Parser, "_parse_svg") as parse_svg:
+            self.assertEqual(state(Parser("tiny.json").parse()), expected)
+        parse_svg.assert_not_called()
+
+        # the fixture has every part of a board in it
+        self.assertEqual(set(expected["provinces"]), {"Alpha", "Beta", "Gamma", "Ocean"})
+        self.assertEqual(expected["players"]["Red"][3:], (["Alpha"], [(UnitType.ARMY, "Alpha", "None")]))
+        self.assertEqual(expected["players"]["Blue"][3:], (["Beta"], [(UnitType.FLEET, "Beta", "Beta coast")]))
+        self.assertEqual(expected["provinces"]["Ocean"][7][0], (15, 15))
+
+    def test_boards_are_independent(self):
+        parser = Parser("tiny.json")
+        board, other = parser.parse(), parser.parse()
+        next(iter(board.units)).province.owner = None
+        self.assertEqual(state(other), state(parser.parse()))
+
+    def assertRecompiled(self, parser: Parser, old_artifact: str) -> Board:
+        with mock.patch.object(Parser, "_parse_svg", autospec=True, side_effect=Parser._parse_svg) as parse_svg:
+            board = parser.parse()
+        parse_svg.assert_called_once()
+        self.assertNotEqual(self.artifact(), old_artifact)
+        self.assertTrue(os.path.isfile(self.artifact()))
+        # the artifact of the old version is never read again
+        self.assertFalse(os.path.exists(old_artifact))
+        return board
+
+    def test_changed_svg(self):
+        parser = Parser("tiny.json")
+        parser.parse()
+        old_artifact = self.artifact()
+        self.write_variant(gamma="#ff0000")
+        board = self.assertRecompiled(parser, old_artifact)
+        self.assertEqual(state(board)["provinces"]["Gamma"][4], "Red")
+        # a parser started afterwards uses the new artifact
+        self.assertEqual(state(Parser("tiny.json").parse()), state(board))
+
+    def test_changed_config(self):
+        parser = Parser("tiny.json")
+        parser.parse()
+        old_artifact = self.artifact()
+        config = json.loads(json.dumps(CONFIG))
+        config["players"]["Blue"]["vscc"] = 3
+        self.write_variant(config)
+        board = self.assertRecompiled(Parser("tiny.json"), old_artifact)
+        self.assertEqual(state(board)["players"]["Blue"][1], 3)
+
+    def test_stale_version(self):
+        Parser("tiny.json").parse()
+        old_artifact = self.artifact()
+        with mock.patch.object(compiled, "COMPILED_VERSION", compiled.COMPILED_VERSION + 1):
+            self.assertRecompiled(Parser("tiny.json"), old_artifact)
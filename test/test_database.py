@@ -0,0 +1,218 @@
+import sqlite3
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.order import Move
+from diplomacy.persistence.unit import UnitType
+from test.utils import DatabaseTestCase, TEST_VARIANT
+
+# the provinces and players the tests change the owners and cores of
+PROVINCES = ["Holland", "Belgium", "Kiel", "Munich", "Ruhr"]
+PLAYERS = [None, "France", "Germany", "England"]
+
+
+def provinces(board: Board) -> dict[str, tuple[str | None, ...]]:
+    return {
+        province.name: tuple(
+            player and player.name for player in (province.owner, province.core, province.half_core)
+        )
+        for province in board.provinces
+    }
+
+
+class TestProvinceHistory(DatabaseTestCase):
+    """Province history is stored as changes from the phase before, with a full checkpoint every few phases."""
+
+    def save_phases(self, count: int) -> list[tuple[phase.Phase, int, dict]]:
+        saved = []
+        board_phase, year = phase.initial(), 0
+        for index in range(count):
+            board = self.new_board()
+            board.phase, board.year = board_phase, year
+            # a different few provinces change hands every phase, and the others stay as they were
+            for offset, name in enumerate(PROVINCES):
+                province = self.get_province(board, name)
+                owner, core, half_core = (
+                    PLAYERS[(index // (offset + 1) + shift) % len(PLAYERS)] for shift in range(3)
+                )
+                province.owner = owner and self.get_player(board, owner)
+                province.core = core and self.get_player(board, core)
+                province.half_core = half_core and self.get_player(board, half_core)
+            self.database.save_board(1, board)
+            saved.append((board_phase, year, provinces(board)))
+            board_phase = board_phase.next
+            if board_phase == phase.initial():
+                year += 1
+        return saved
+
+    def load(self, board_phase: phase.Phase, year: int) -> Board | None:
+        return self.database.get_board(1, board_phase, year, 0, None, TEST_VARIANT)
+
+    def test_every_phase_reloads(self):
+        saved = self.save_phases(8)
+        # the checkpoint interval is 3 in tests, so there's a checkpoint every third phase
+        self.assertEqual(
+            [
+                row[0]
+                for row in self.database._connection.execute(
+                    "SELECT base_phase IS NULL FROM boards WHERE board_id=1 ORDER BY phase"
+                )
+            ],
+            [1, 0, 0, 1, 0, 0, 1, 0],
+        )
+        # only the provinces that changed are stored for phases after a checkpoint
+        self.assertLess(
+            self.database._connection.execute("SELECT COUNT(*) FROM provinces WHERE phase=7").fetchone()[0],
+            len(provinces(self.new_board())),
+        )
+        for board_phase, year, expected in saved:
+            self.assertEqual(provinces(self.load(board_phase, year)), expected, f"{board_phase.name} {year}")
+        self.assertEqual(provinces(self.database.get_current_board(1)), saved[-1][2])
+
+    def test_delete_middle_phase(self):
+        """Deleting a phase that later ones were stored as changes from leaves the later ones as they were."""
+        saved = self.save_phases(8)
+        deleted = set()
+        # a phase after a checkpoint, then a checkpoint
+        for index in (4, 3):
+            board = self.new_board()
+            board.phase, board.year = saved[index][0], saved[index][1]
+            self.database.delete_board(board)
+            deleted.add(index)
+            self.assertIsNone(self.load(board.phase, board.year))
+            for other, (board_phase, year, expected) in enumerate(saved):
+                if other not in deleted:
+                    self.assertEqual(provinces(self.load(board_phase, year)), expected, f"{board_phase.name} {year}")
+
+    def test_rollback_and_save_again(self):
+        saved = self.save_phases(5)
+        board = self.new_board()
+        board.phase, board.year = saved[-1][0], saved[-1][1]
+        self.database.delete_board(board)
+        self.assertEqual(provinces(self.database.get_current_board(1)), saved[-2][2])
+
+        # the phase is adjudicated again, differently, and the phases before it are unaffected
+        self.get_province(board, "Holland").owner = self.get_player(board, "Germany")
+        self.database.save_board(1, board)
+        self.assertEqual(provinces(self.database.get_current_board(1)), provinces(board))
+        for board_phase, year, expected in saved[:-1]:
+            self.assertEqual(provinces(self.load(board_phase, year)), expected, f"{board_phase.name} {year}")
+
+
+class TestNames(DatabaseTestCase):
+    """Location and player names are stored once each and referred to by id."""
+
+    def test_new_name_is_committed(self):
+        """Looking up the id of a new name doesn't leave a write open, which would keep the order writer waiting."""
+        location_id = self.database.get_location_id("Atlantis")
+        self.assertFalse(self.database._connection.in_transaction)
+        other = sqlite3.connect(self.database._db_file)
+        self.assertEqual(
+            other.execute("SELECT name FROM location_names WHERE location_id=?", (location_id,)).fetchone(), ("Atlantis",)
+        )
+        other.close()
+        self.assertEqual(self.database.get_location_id("Atlantis"), location_id)
+
+    def test_new_name_in_rolled_back_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with self.database.transaction():
+                self.database.get_player_id("Atlantis")
+                raise RuntimeError()
+        self.assertFalse(self.database._connection.in_transaction)
+        self.assertNotIn("Atlantis", self.database._player_ids)
+
+
+class TestBoardCache(DatabaseTestCase):
+    """Boards of past phases are cached, and the cache never hands out a board that differs from what the DB has."""
+
+    def setUp(self):
+        super().setUp()
+        self.database._board_cache_size = 2
+        board = self.new_board()
+        for _ in range(4):
+            self.database.save_board(1, board)
+            board.phase = board.phase.next
+        self.database.save_board(1, board)
+        self.phases = [phase.all_phases()[index] for index in range(5)]
+
+    def load(self, index: int, fish: int = 0, name: str | None = None) -> Board:
+        return self.database.get_board(1, self.phases[index], 0, fish, name, TEST_VARIANT)
+
+    def test_hit(self):
+        board = self.load(0)
+        self.assertEqual(self.database.get_board_cache_stats(), {"hits": 0, "misses": 1, "size": 1})
+        self.assertIs(self.load(0, fish=3, name="Renamed"), board)
+        self.assertEqual(self.database.get_board_cache_stats(), {"hits": 1, "misses": 1, "size": 1})
+        # the game's fish and name are the ones asked for, not the ones the board was first loaded with
+        self.assertEqual((board.fish, board.name), (3, "Renamed"))
+
+    def test_current_phase_not_cached(self):
+        self.assertIsNot(self.load(4), self.load(4))
+        self.assertEqual(self.database.get_board_cache_stats()["size"], 0)
+
+    def test_eviction(self):
+        """The least recently used board is dropped once there are more than the cache holds."""
+        first, second = self.load(0), self.load(1)
+        self.assertIs(self.load(0), first)
+        third = self.load(2)
+        self.assertEqual(self.database.get_board_cache_stats()["size"], 2)
+        self.assertIs(self.load(0), first)
+        self.assertIs(self.load(2), third)
+        self.assertIsNot(self.load(1), second)
+        self.assertEqual(self.database.get_board_cache_stats(), {"hits": 3, "misses": 4, "size": 2})
+
+    def test_cached_board_cant_be_saved(self):
+        board = self.load(0)
+        unit = board.create_unit(
+            UnitType.ARMY, self.get_player(board, "Germany"), self.get_province(board, "Munich"), None, None
+        )
+        with self.assertRaises(ValueError):
+            self.database.save_order_for_units(board, {unit})
+        with self.assertRaises(ValueError):
+            self.database.save_build_orders_for_players(board, None)
+        with self.assertRaises(ValueError):
+            self.database.save_province(board, self.get_province(board, "Munich"))
+        with self.assertRaises(ValueError):
+            self.database.save_board(1, board)
+
+    def test_clear_status_not_cached(self):
+        board = self.load(0)
+        cleared = self.database.get_board(1, self.phases[0], 0, 0, None, TEST_VARIANT, clear_status=True)
+        self.assertIsNot(cleared, board)
+        self.assertIsNot(self.load(0), cleared)
+
+    def test_saving_the_game_drops_its_boards(self):
+        board = self.load(0)
+        current = self.database.get_current_board(1)
+        current.phase, current.year = phase.initial(), 1
+        self.database.save_board(1, current)
+        self.assertIsNot(self.load(0), board)
+
+
+class TestArchive(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        board = self.new_board()
+        unit = board.create_unit(
+            UnitType.ARMY, self.get_player(board, "Germany"), self.get_province(board, "Munich"), None, None
+        )
+        self.database.save_board(1, board)
+        unit.order = Move(self.get_province(board, "Ruhr"))
+        unit.order.hasFailed = True
+        self.database.save_order_for_units(board, {unit})
+        board.phase = board.phase.next
+        self.database.save_board(1, board)
+        self.database.archive_board(1)
+
+    def failed(self, board: Board) -> bool:
+        return self.get_province(board, "Munich").unit.order.hasFailed
+
+    def test_load_archived(self):
+        self.assertEqual(self.database.get_current_board(1).phase, phase.initial().next)
+        self.assertTrue(self.failed(self.database.get_board(1, phase.initial(), 0, 0, None, TEST_VARIANT)))
+
+    def test_clear_status_refused(self):
+        """Loading a phase of an archived game with clear_status would write to the archive, so it's refused."""
+        with self.assertRaises(ValueError):
+            self.database.get_board(1, phase.initial(), 0, 0, None, TEST_VARIANT, clear_status=True)
+        self.assertTrue(self.failed(self.database.get_board(1, phase.initial(), 0, 0, None, TEST_VARIANT)))
@@ -0,0 +1,92 @@
+import unittest
+
+from diplomacy.persistence.graph import EdgeType, MapGraph
+from test.utils import BoardBuilder
+
+# A, B and C are land in a row, S and T seas along them; B has a north coast on S and a south one on T
+A, B, C, S, T, B_NC, B_SC = range(7)
+
+
+def make_graph() -> MapGraph:
+    return MapGraph(
+        ["A", "B", "C", "S", "T", "B (nc)", "B (sc)"],
+        [False, False, False, True, True, False, False],
+        [A, B, C, S, T, B, B],
+        {
+            EdgeType.LAND: [[B], [A, C], [B], [A, B], [B, C], [], []],
+            EdgeType.SEA: [[S], [S, T], [T], [T], [S], [], []],
+            EdgeType.COAST: [[], [], [], [], [], [S, B_SC], [T, B_NC]],
+        },
+    )
+
+
+class TestMapGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = make_graph()
+
+    def test_neighbours_by_edge_type(self):
+        self.assertEqual(self.graph.neighbours(B, EdgeType.LAND), (A, C))
+        self.assertEqual(self.graph.neighbours(B, EdgeType.SEA), (S, T))
+        self.assertEqual(set(self.graph.neighbours(B)), {A, C, S, T})
+        # provinces have no coast edges, and coasts only have those
+        self.assertEqual(self.graph.neighbours(B, EdgeType.COAST), ())
+        self.assertEqual(self.graph.neighbours(B_NC), ())
+        self.assertEqual(self.graph.neighbours(B_NC, EdgeType.COAST), (S, B_SC))
+        self.assertEqual(set(self.graph.neighbours(S, EdgeType.SEA | EdgeType.COAST)), {T})
+
+    def test_bfs(self):
+        self.assertEqual(self.graph.bfs(A, EdgeType.LAND), {A: 0, B: 1, C: 2})
+        self.assertEqual(self.graph.bfs(A), {A: 0, B: 1, S: 1, C: 2, T: 2})
+        self.assertEqual(self.graph.bfs(A, max_depth=1), {A: 0, B: 1, S: 1})
+        # B is reached but not gone through
+        self.assertEqual(self.graph.bfs(A, EdgeType.LAND, passable=lambda node: node != B), {A: 0, B: 1})
+
+    def test_k_hop(self):
+        self.assertEqual(self.graph.k_hop(A, 0), {A})
+        self.assertEqual(self.graph.k_hop(A, 1), {A, B, S})
+        self.assertEqual(self.graph.k_hop(A, 1, EdgeType.LAND), {A, B})
+        self.assertEqual(self.graph.k_hop(A, 2), {A, B, C, S, T})
+
+    def test_reachable(self):
+        self.assertTrue(self.graph.reachable(A, C, EdgeType.LAND))
+        self.assertFalse(self.graph.reachable(A, C, EdgeType.SEA))
+        self.assertFalse(self.graph.reachable(A, C, EdgeType.LAND, passable=lambda node: node != B))
+        # by sea, going through S and T
+        self.assertTrue(self.graph.reachable(S, T, EdgeType.SEA, passable=lambda node: self.graph.sea[node]))
+
+    def test_reachable_min_steps(self):
+        """With min_steps, a neighbour of start only counts if it can also be reached the long way round."""
+        self.assertTrue(self.graph.reachable(A, B))
+        self.assertTrue(self.graph.reachable(A, B, min_steps=2))
+        self.assertFalse(self.graph.reachable(A, B, EdgeType.LAND, min_steps=2))
+        self.assertTrue(self.graph.reachable(A, C, EdgeType.LAND, min_steps=2))
+        self.assertFalse(self.graph.reachable(A, C, EdgeType.LAND, min_steps=3))
+        # nothing is gone through, so only start's own neighbours are checked
+        self.assertFalse(self.graph.reachable(A, B, min_steps=2, passable=lambda node: False))
+
+    def test_coasts_map_to_their_province(self):
+        self.assertEqual([self.graph.province_of[node] for node in (B_NC, B_SC, B, S)], [B, B, B, S])
+        self.assertEqual(self.graph.nodes["B (sc)"], B_SC)
+
+
+class TestLocationGraph(unittest.TestCase):
+    """Locations built directly, rather than from a compiled variant, get a graph built from their adjacencies."""
+
+    def setUp(self):
+        self.b = BoardBuilder()
+
+    def test_coasts_map_to_their_province(self):
+        for coast in (self.b.spain_nc, self.b.spain_sc, self.b.st_petersburg_nc):
+            graph = coast.graph
+            self.assertIs(coast.at(coast.node), coast)
+            self.assertIs(coast.at(graph.province_of[coast.node]), coast.province)
+            self.assertEqual(graph.province_of[coast.province.node], coast.province.node)
+
+    def test_neighbours(self):
+        spain = self.b.spain
+        self.assertEqual(set(spain.neighbours()), spain.adjacent)
+        self.assertEqual(
+            set(spain.neighbours(EdgeType.LAND)), {self.b.gascony, self.b.marseilles, self.b.portugal}
+        )
+        coast = self.b.spain_nc
+        self.assertEqual(set(coast.neighbours(EdgeType.COAST)), coast.adjacent_seas | coast.adjacent_coasts)
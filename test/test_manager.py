@@ -0,0 +1,33 @@
+from unittest import mock
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.manager import Manager
+from test.utils import DatabaseTestCase
+
+
+class TestPhaseStr(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        board = self.new_board()
+        board.phase, board.year = phase.get("Fall Retreats"), 2
+        self.database.save_board(1, board)
+        self.manager = Manager()
+
+    def test_not_loaded(self):
+        """Listing the phase of a game whose board isn't loaded doesn't load it."""
+        with mock.patch.object(self.database, "get_current_board") as get_current_board:
+            self.assertEqual(self.manager.get_phase_str(1), "Fall Retreats 1644")
+        get_current_board.assert_not_called()
+        self.assertNotIn(1, self.manager._boards)
+
+    def test_loaded(self):
+        board = self.manager.get_board(1)
+        self.assertEqual(self.manager.get_phase_str(1), f"{board.phase.name} {board.get_year_str()}")
+
+    def test_archived(self):
+        self.manager.archive(1)
+        self.assertEqual(self.manager.get_phase_str(1), "Fall Retreats 1644")
+
+    def test_no_game(self):
+        with self.assertRaises(RuntimeError):
+            self.manager.get_phase_str(2)
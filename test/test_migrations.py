@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# the tables of a DB from before the province history was delta encoded and names were interned, as schema.sql
+# created them then (there was no current_board yet)
+OLD_SCHEMA = """
+CREATE TABLE boards (board_id int, phase text, data_file text, fish int, name text, PRIMARY KEY (board_id, phase));
+CREATE TABLE players (
+    board_id int, player_name text, color varchar(6), liege text, points int, discord_id text,
+    PRIMARY KEY (board_id, player_name));
+CREATE TABLE provinces (
+    board_id int, phase text, province_name text, owner text, core text, half_core text,
+    PRIMARY KEY (board_id, phase, province_name));
+CREATE TABLE retreat_options (
+    board_id int, phase text, origin text, retreat_loc text, PRIMARY KEY (board_id, phase, origin, retreat_loc));
+CREATE TABLE units (
+    board_id int, phase text, location text, is_dislodged boolean, owner text, is_army boolean, order_type text,
+    order_destination text, order_source text, failed_order boolean,
+    PRIMARY KEY (board_id, phase, location, is_dislodged));
+CREATE TABLE builds (
+    board_id int, phase text, player text, location text, is_build boolean, is_army boolean,
+    PRIMARY KEY (board_id, phase, player, location));
+CREATE TABLE vassal_orders (
+    board_id int, phase text, player text, target_player text, order_type text,
+    PRIMARY KEY (board_id, phase, player, target_player));
+CREATE TABLE spec_requests (
+    request_id INTEGER PRIMARY KEY AUTOINCREMENT, server_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL, UNIQUE (server_id, user_id));
+"""
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.directory.name, "bot_db.sqlite")
+        connection = sqlite3.connect(self.db_file)
+        connection.executescript(OLD_SCHEMA)
+        # "Fall" sorts before "Spring", so the latest phase can't be found by comparing the text
+        phases = ["0 Spring Moves", "0 Spring Retreats", "0 Fall Moves", "0 Fall Retreats", "0 Winter Builds", "1 Spring Moves"]
+        connection.executemany(
+            "INSERT INTO boards (board_id, phase, data_file, fish, name) VALUES (?, ?, 'impdip.json', 0, NULL)",
+            [(board_id, phase) for board_id in (1, 2) for phase in (phases if board_id == 1 else phases[:3])],
+        )
+        connection.executemany(
+            "INSERT INTO provinces (board_id, phase, province_name, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (1, phase, "Paris", "France" if index < 3 else "Germany", "France", None)
+                for index, phase in enumerate(phases)
+            ]
+            + [(2, phase, "Berlin", "Germany", None, "Germany") for phase in phases[:3]],
+        )
+        connection.execute(
+            "INSERT INTO units VALUES (1, '1 Spring Moves', 'Paris', false, 'Germany', true, 'Move', 'Burgundy', NULL, false)"
+        )
+        connection.execute("INSERT INTO retreat_options VALUES (1, '0 Fall Retreats', 'Paris', 'Gascony')")
+        connection.execute("INSERT INTO builds VALUES (1, '0 Winter Builds', 'France', 'Brest', true, false)")
+        connection.execute("INSERT INTO vassal_orders VALUES (1, '0 Winter Builds', 'France', 'Germany', 'Vassal')")
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def migrate(self, script: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, os.path.join("SQL", script), self.db_file],
+            cwd=REPOSITORY,
+            capture_output=True,
+            text=True,
+        )
+
+    def tables(self) -> set[str]:
+        connection = sqlite3.connect(self.db_file)
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        connection.close()
+        return tables
+
+    def test_migrate_old_db(self):
+        """Both scripts run on a DB from before current_board, which is filled in from the latest phases."""
+        self.assertEqual(self.migrate("11-DeltaEncodeProvinces.py").returncode, 0)
+        result = self.migrate("12-InternIdentifiers.py")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertFalse({table for table in self.tables() if table.endswith("_old")})
+
+        connection = sqlite3.connect(self.db_file)
+        self.assertEqual(
+            connection.execute("SELECT board_id, phase FROM current_board ORDER BY board_id").fetchall(),
+            [(1, 5), (2, 2)],
+        )
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM boards").fetchone()[0], 9)
+        self.assertEqual(
+            connection.execute(
+                "SELECT location_names.name, player_names.name FROM units "
+                "JOIN location_names ON units.location = location_names.location_id "
+                "JOIN player_names ON units.owner = player_names.player_id WHERE phase=5"
+            ).fetchall(),
+            [("Paris", "Germany")],
+        )
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM retreat_options").fetchone()[0], 1)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM builds").fetchone()[0], 1)
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM vassal_orders").fetchone()[0], 1)
+        connection.close()
+
+        # once it has run, it refuses to again
+        self.assertNotEqual(self.migrate("12-InternIdentifiers.py").returncode, 0)
+
+    def test_failed_migration_changes_nothing(self):
+        """A migration that fails part way leaves the DB the way it was, so it can be fixed and run again."""
+        self.assertEqual(self.migrate("11-DeltaEncodeProvinces.py").returncode, 0)
+        connection = sqlite3.connect(self.db_file)
+        connection.execute("INSERT INTO builds VALUES (1, '0 Winter Bilds', 'France', 'Paris', true, true)")
+        connection.commit()
+        connection.close()
+        tables = self.tables()
+
+        self.assertNotEqual(self.migrate("12-InternIdentifiers.py").returncode, 0)
+        self.assertEqual(self.tables(), tables)
+
+        connection = sqlite3.connect(self.db_file)
+        connection.execute("DELETE FROM builds WHERE phase='0 Winter Bilds'")
+        connection.commit()
+        connection.close()
+        result = self.migrate("12-InternIdentifiers.py")
+        self.assertEqual(result.returncode, 0, result.stderr)
@@ -0,0 +1,170 @@
+import unittest
+
+import numpy as np
+
+from diplomacy.map_parser.raster.config import BORDER_COLOR
+from diplomacy.map_parser.raster.raster_input import (
+    RasterParser,
+    expand_labels,
+    get_adjacencies,
+    get_centers,
+    get_geometries,
+    get_map_data,
+    get_province_owners,
+    get_units,
+)
+from diplomacy.persistence import phase
+from diplomacy.persistence.province import ProvinceType
+from diplomacy.persistence.unit import UnitType
+
+GREEN, RED, OCEAN = (0, 255, 33, 255), (255, 0, 0, 255), (0, 38, 255, 255)
+GREEN_UNIT, RED_UNIT = (182, 255, 0, 255), (255, 0, 221, 255)
+
+# province ids go in the order ndimage.label meets them, row by row from the top left:
+# 1 is green land along the top left and 2 sea along the top right, over 3 (red), 4 (red) and 5 (sea)
+TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_MIDDLE, BOTTOM_RIGHT = range(1, 6)
+
+
+def make_images():
+    provinces = np.zeros((9, 14, 4), dtype=np.uint8)
+    provinces[:4, :6] = GREEN
+    provinces[:4, 7:] = OCEAN
+    provinces[5:, :3] = RED
+    provinces[5:, 4:10] = RED
+    provinces[5:, 11:] = OCEAN
+    provinces[4, :] = provinces[:4, 6] = provinces[5:, 3] = provinces[5:, 10] = BORDER_COLOR
+
+    centers = np.zeros_like(provinces)
+    centers[1, 1] = centers[6, 1] = centers[6, 6] = (255, 255, 255, 255)
+
+    armies = np.zeros_like(provinces)
+    armies[1:3, 1:3] = GREEN_UNIT
+    # mostly in the bottom left, but over the border and into the bottom middle too
+    armies[6:8, 1:5] = RED_UNIT
+    fleets = np.zeros_like(provinces)
+    fleets[6:8, 6:8] = RED_UNIT
+    return provinces, centers, armies, fleets
+
+
+class TestRasterMapData(unittest.TestCase):
+    def setUp(self):
+        self.provinces, self.centers, self.armies, self.fleets = make_images()
+        self.map_data = get_map_data(self.provinces, self.centers, self.armies, self.fleets)
+        self.province_id_map = self.map_data["province_id_map"]
+
+    def test_labels(self):
+        self.assertEqual(self.map_data["num_provinces"], 5)
+        self.assertEqual(
+            [self.province_id_map[row, column] for row, column in ((0, 0), (0, 13), (8, 0), (8, 5), (8, 13), (4, 4))],
+            [TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_MIDDLE, BOTTOM_RIGHT, 0],
+        )
+
+    def test_adjacencies(self):
+        adjacencies = get_adjacencies(expand_labels(self.province_id_map, 6), 5)
+        self.assertEqual(
+            {province_id: adjacent.tolist() for province_id, adjacent in adjacencies.items()},
+            {
+                TOP_LEFT: [TOP_RIGHT, BOTTOM_LEFT, BOTTOM_MIDDLE],
+                TOP_RIGHT: [TOP_LEFT, BOTTOM_MIDDLE, BOTTOM_RIGHT],
+                BOTTOM_LEFT: [TOP_LEFT, BOTTOM_MIDDLE],
+                BOTTOM_MIDDLE: [TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT],
+                BOTTOM_RIGHT: [TOP_RIGHT, BOTTOM_MIDDLE],
+            },
+        )
+
+    def test_owners(self):
+        self.assertEqual(
+            get_province_owners(self.provinces, self.province_id_map, 5),
+            {TOP_LEFT: "green", TOP_RIGHT: "ocean", BOTTOM_LEFT: "red", BOTTOM_MIDDLE: "red", BOTTOM_RIGHT: "ocean"},
+        )
+
+    def test_owner_is_most_common_color(self):
+        self.provinces[0, 0] = RED
+        self.assertEqual(get_province_owners(self.provinces, self.province_id_map, 5)[TOP_LEFT], "green")
+
+    def test_centers(self):
+        self.assertEqual(get_centers(self.province_id_map, self.centers), {TOP_LEFT, BOTTOM_LEFT, BOTTOM_MIDDLE})
+
+    def test_units(self):
+        """A unit is placed in the province most of it is over."""
+        armies = get_units(self.province_id_map, self.armies)
+        self.assertEqual(
+            {province_id: unit["player"] for province_id, unit in armies.items()},
+            {TOP_LEFT: "green", BOTTOM_LEFT: "red"},
+        )
+        fleets = get_units(self.province_id_map, self.fleets)
+        self.assertEqual(
+            {province_id: unit["player"] for province_id, unit in fleets.items()}, {BOTTOM_MIDDLE: "red"}
+        )
+
+    def test_geometries(self):
+        geometries = get_geometries(self.province_id_map, 5)
+        self.assertEqual([geometry.area for geometry in geometries], [24, 28, 12, 24, 12])
+        self.assertEqual(geometries[TOP_LEFT - 1].bounds, (0, 0, 6, 4))
+        self.assertEqual(geometries[BOTTOM_MIDDLE - 1].bounds, (4, 5, 10, 9))
+
+
+class TestRasterParser(unittest.TestCase):
+    def setUp(self):
+        self.board = RasterParser(get_map_data(*make_images())).parse()
+        self.provinces = {province.name: province for province in self.board.provinces}
+        self.players = {player.name: player for player in self.board.players}
+
+    def test_provinces(self):
+        self.assertEqual(
+            {name: province.type for name, province in self.provinces.items()},
+            {
+                "1": ProvinceType.LAND,
+                "2": ProvinceType.SEA,
+                "3": ProvinceType.LAND,
+                "4": ProvinceType.LAND,
+                "5": ProvinceType.SEA,
+            },
+        )
+        self.assertEqual(
+            {name for name, province in self.provinces.items() if province.has_supply_center}, {"1", "3", "4"}
+        )
+        self.assertEqual({province.name for province in self.provinces["4"].adjacent}, {"1", "2", "3", "5"})
+        self.assertEqual(self.board.phase, phase.initial())
+
+    def test_coasts(self):
+        """Land next to the sea has a coast on every sea it touches, and the rest has none."""
+        self.assertEqual(
+            {
+                name: [(coast.name, {sea.name for sea in coast.adjacent_seas}) for coast in province.coasts]
+                for name, province in self.provinces.items()
+            },
+            {"1": [("1 coast", {"2"})], "2": [], "3": [], "4": [("4 coast", {"2", "5"})], "5": []},
+        )
+
+    def test_owners_and_centers(self):
+        self.assertEqual(set(self.players), {"green", "red"})
+        self.assertEqual(
+            {name: province.owner and province.owner.name for name, province in self.provinces.items()},
+            {"1": "green", "2": None, "3": "red", "4": "red", "5": None},
+        )
+        self.assertEqual({province.name for province in self.players["green"].centers}, {"1"})
+        self.assertEqual({province.name for province in self.players["red"].centers}, {"3", "4"})
+        self.assertIs(self.provinces["3"].core, self.players["red"])
+
+    def test_units(self):
+        self.assertEqual(
+            {
+                (unit.province.name, unit.unit_type, unit.player.name, unit.coast and unit.coast.name)
+                for unit in self.board.units
+            },
+            {
+                ("1", UnitType.ARMY, "green", None),
+                ("3", UnitType.ARMY, "red", None),
+                ("4", UnitType.FLEET, "red", "4 coast"),
+            },
+        )
+        for unit in self.board.units:
+            self.assertIs(unit.province.unit, unit)
+            self.assertIn(unit, unit.player.units)
+
+    def test_victory_count(self):
+        """More than half of the three centers."""
+        self.assertEqual(
+            {player.name: (player.vscc, player.iscc) for player in self.board.players}, {"green": (2, 1), "red": (2, 2)}
+        )
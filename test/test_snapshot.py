@@ -0,0 +1,232 @@
+import unittest
+from unittest import mock
+
+from diplomacy.persistence import phase
+from diplomacy.persistence.board import Board
+from diplomacy.persistence.manager import Manager
+from diplomacy.persistence.order import (
+    Build,
+    ConvoyTransport,
+    Disband,
+    Hold,
+    Liege,
+    Move,
+    RetreatMove,
+    Support,
+    Vassal,
+)
+from diplomacy.persistence.unit import UnitType
+from test.utils import BoardBuilder, DatabaseTestCase
+
+
+def state(board: Board) -> list:
+    """Everything about a board a snapshot should keep, by name, so that boards can be compared."""
+
+    def order(unit):
+        if unit.order is None:
+            return None
+        return (
+            type(unit.order).__name__,
+            str(getattr(unit.order, "destination", None)),
+            str(getattr(unit.order, "source", None)),
+            unit.order.hasFailed,
+        )
+
+    return [
+        board.phase.name,
+        board.year,
+        sorted((p.name, str(p.owner), str(p.core), str(p.half_core)) for p in board.provinces),
+        sorted(
+            (str(unit), unit.player.name, unit.province.dislodged_unit is unit, order(unit), sorted(map(str, unit.retreat_options or ())))
+            for unit in board.units
+        ),
+        sorted(
+            (
+                player.name,
+                sorted(map(str, player.centers)),
+                sorted(map(str, player.units)),
+                sorted(f"{type(build).__name__} {build.location} {getattr(build, 'unit_type', None)}" for build in player.build_orders),
+                sorted((target.name, type(order).__name__) for target, order in player.vassal_orders.items()),
+            )
+            for player in board.players
+        ),
+    ]
+
+
+def set_up_board(b: BoardBuilder):
+    b.kiel.owner = b.kiel.core = b.germany
+    b.germany.centers.add(b.kiel)
+    b.munich.owner = b.germany
+    b.munich.half_core = b.germany
+    b.germany.centers.add(b.munich)
+    b.holland.owner = b.england
+    b.holland.core = b.france
+    b.holland.half_core = b.germany
+    b.england.centers.add(b.holland)
+
+    b.hold(b.germany, UnitType.ARMY, b.munich)
+    b.core(b.germany, UnitType.ARMY, b.kiel)
+    fleet = b.fleet(b.north_sea, b.england)
+    army = b.move(b.england, UnitType.ARMY, b.yorkshire, b.london)
+    fleet.order = ConvoyTransport(army.location(), b.holland)
+    fleet.order.hasFailed = True
+    b.supportMove(b.france, UnitType.FLEET, b.picardy_c, army, b.london)
+
+    dislodged = b.army(b.holland, b.france)
+    b.holland.unit = None
+    b.holland.dislodged_unit = dislodged
+    dislodged.retreat_options = {b.belgium, b.ruhr}
+    dislodged.order = RetreatMove(b.belgium)
+
+    b.germany.build_orders = {Build(b.berlin, UnitType.ARMY), Build(b.kiel_c, UnitType.FLEET)}
+    b.france.build_orders = {Disband(b.picardy)}
+    b.italy.vassal_orders = {b.austria: Vassal(b.austria)}
+    b.austria.vassal_orders = {b.italy: Liege(b.italy)}
+    b.board.phase = phase.get("Spring Retreats")
+    b.board.year = 3
+
+
+def scramble(b: BoardBuilder):
+    b.board.phase = phase.get("Winter Builds")
+    b.board.year = 7
+    b.kiel.owner = b.kiel.core = b.munich.half_core = b.holland.half_core = None
+    b.berlin.owner = b.turkey
+    for unit in list(b.board.units):
+        b.board.units.remove(unit)
+        unit.player.units.remove(unit)
+        unit.province.unit = unit.province.dislodged_unit = None
+    b.move(b.russia, UnitType.ARMY, b.warsaw, b.silesia)
+    for player in b.board.players:
+        player.build_orders = {Disband(b.warsaw)}
+        player.vassal_orders = {}
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_round_trip(self):
+        """Restoring a snapshot of a board that has changed since puts every part of its state back."""
+        b = BoardBuilder()
+        set_up_board(b)
+        expected = state(b.board)
+        snapshot = b.board.snapshot()
+
+        scramble(b)
+        self.assertNotEqual(state(b.board), expected)
+        b.board.restore(snapshot)
+        self.assertEqual(state(b.board), expected)
+        self.assertEqual(b.board.units, {unit for player in b.board.players for unit in player.units})
+
+    def test_restore_onto_another_board(self):
+        """A snapshot doesn't refer to the board it was taken of, so it can be restored onto another of its variant."""
+        b = BoardBuilder()
+        set_up_board(b)
+        other = BoardBuilder()
+        other.board.restore(b.board.snapshot())
+        self.assertEqual(state(other.board), state(b.board))
+        self.assertFalse(other.board.units & b.board.units)
+
+    def test_snapshot_is_unchanged_by_board(self):
+        """Changing a board after a snapshot of it is taken doesn't change the snapshot."""
+        b = BoardBuilder()
+        set_up_board(b)
+        expected = state(b.board)
+        snapshot = b.board.snapshot()
+        scramble(b)
+        other = BoardBuilder()
+        other.board.restore(snapshot)
+        self.assertEqual(state(other.board), expected)
+        with self.assertRaises(ValueError):
+            snapshot.owner[0] = 1
+
+    def test_restore_onto_other_variant(self):
+        b = BoardBuilder()
+        snapshot = b.board.snapshot()
+        other = BoardBuilder()
+        other.board.provinces.remove(other.munich)
+        with self.assertRaises(ValueError):
+            other.board.restore(snapshot)
+
+
+class TestManagerSnapshots(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # rolling back and reloading draw the map, which needs the variant's SVG
+        mapper = mock.patch("diplomacy.persistence.manager.Mapper")
+        mapper.start().return_value.draw_current_map.return_value = ("", "map.svg")
+        self.addCleanup(mapper.stop)
+
+        board = self.new_board()
+        self.get_province(board, "Holland").owner = self.get_player(board, "France")
+        board.create_unit(UnitType.ARMY, self.get_player(board, "Germany"), self.get_province(board, "Munich"), None, None)
+        self.database.save_board(1, board)
+        self.manager = Manager()
+        self.manager.get_board(1)
+
+    def adjudicate(self):
+        board = self.manager.get_board(1)
+        unit = self.get_province(board, "Munich").unit
+        unit.order = Move(self.get_province(board, "Ruhr"))
+        self.database.save_order_for_units(board, {unit})
+        self.manager.adjudicate(1)
+        return board
+
+    def loaded_state(self) -> list:
+        """The state of the current phase as the DB has it."""
+        self.database.flush()
+        return state(self.database.get_current_board(1))
+
+    def test_rollback_uses_snapshot(self):
+        self.adjudicate()
+        with mock.patch.object(self.database, "get_board", wraps=self.database.get_board) as get_board:
+            self.manager.rollback(1)
+        get_board.assert_not_called()
+        board = self.manager.get_board(1)
+        self.assertEqual(board.phase, phase.get("Spring Moves"))
+        self.assertEqual(state(board), self.loaded_state())
+        unit = next(iter(board.units))
+        self.assertIsInstance(unit.order, Move)
+        self.assertFalse(unit.order.hasFailed)
+
+    def test_rollback_after_write_loads_from_db(self):
+        """A snapshot of a phase that has been written to since isn't used."""
+        board = self.adjudicate()
+        self.database.execute_arbitrary_sql("UPDATE units SET order_type='Hold' WHERE board_id=? AND phase=0", (1,))
+        with mock.patch.object(self.database, "get_board", wraps=self.database.get_board) as get_board:
+            self.manager.rollback(1)
+        get_board.assert_called_once()
+        board = self.manager.get_board(1)
+        self.assertIsInstance(next(iter(board.units)).order, Hold)
+        self.assertEqual(state(board), self.loaded_state())
+
+    def test_reload_uses_snapshot(self):
+        """Reloading a phase nothing has been written to since its snapshot undoes changes only made in memory."""
+        board = self.adjudicate()
+        expected = self.loaded_state()
+        board.delete_all_units()
+        self.get_province(board, "Holland").owner = None
+        with mock.patch.object(self.database, "get_board", wraps=self.database.get_board) as get_board:
+            self.manager.reload(1)
+        get_board.assert_not_called()
+        self.assertEqual(state(self.manager.get_board(1)), expected)
+
+    def test_reload_after_orders_loads_from_db(self):
+        board = self.adjudicate()
+        unit = next(iter(board.units))
+        unit.order = Hold()
+        self.database.save_order_for_units(board, {unit})
+        expected = self.loaded_state()
+        unit.order = None
+        with mock.patch.object(self.database, "get_board", wraps=self.database.get_board) as get_board:
+            self.manager.reload(1)
+        get_board.assert_called_once()
+        self.assertEqual(state(self.manager.get_board(1)), expected)
+
+    def test_failed_adjudication_restores_board(self):
+        board = self.manager.get_board(1)
+        unit = self.get_province(board, "Munich").unit
+        unit.order = Move(self.get_province(board, "Ruhr"))
+        expected = state(board)
+        with mock.patch.object(self.database, "save_board", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                self.manager.adjudicate(1)
+        self.assertIs(self.manager.get_board(1), board)
+        self.assertEqual(state(board), expected)
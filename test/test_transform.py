@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+from lxml import etree
+
+from diplomacy.map_parser.vector.transform import TransGL3
+
+
+class TestTransform(unittest.TestCase):
+    def assertTransforms(self, transform: TransGL3, point: tuple[float, float], expected: tuple[float, float]):
+        np.testing.assert_allclose(transform.transform(point), expected, atol=1e-9)
+        np.testing.assert_allclose(transform.transform_points(np.array([point], dtype=float)), [expected], atol=1e-9)
+
+    def test_list_applies_last_first(self):
+        """In a transform list the rightmost transform is applied to the point first."""
+        self.assertTransforms(TransGL3("translate(10 0) rotate(90)"), (1, 0), (10, 1))
+        self.assertTransforms(TransGL3("rotate(90) translate(10 0)"), (1, 0), (0, 11))
+        self.assertTransforms(TransGL3("scale(2), translate(1,1)"), (0, 0), (2, 2))
+
+    def test_rotate_about_centre(self):
+        self.assertTransforms(TransGL3("rotate(90 5 5)"), (6, 5), (5, 6))
+        self.assertTransforms(TransGL3("rotate(180,5,5)"), (5, 5), (5, 5))
+        self.assertTransforms(TransGL3("rotate(180,5,5)"), (0, 0), (10, 10))
+
+    def test_one_argument(self):
+        self.assertTransforms(TransGL3("translate(3)"), (1, 1), (4, 1))
+        self.assertTransforms(TransGL3("scale(2)"), (1, 3), (2, 6))
+
+    def test_matrix(self):
+        self.assertTransforms(TransGL3("matrix(1 2 3 4 5 6)"), (1, 1), (9, 12))
+
+    def test_invalid(self):
+        for transform_string in ("translate(1 2 3)", "spin(90)", "translate(1) wobble"):
+            with self.subTest(transform_string), self.assertRaises(Exception):
+                TransGL3(transform_string)
+
+
+class TestForElement(unittest.TestCase):
+    def setUp(self):
+        self.root = etree.fromstring(
+            '<svg><g id="layer" transform="scale(2)"><g id="group" transform="rotate(90)">'
+            '<path id="path" transform="translate(1 0)"/><path id="plain"/></g></g></svg>'
+        )
+        self.layer, self.group, self.path, self.plain = (
+            self.root.find(f'.//*[@id="{element_id}"]') for element_id in ("layer", "group", "path", "plain")
+        )
+
+    def assertSame(self, first: TransGL3, second: TransGL3):
+        np.testing.assert_allclose(first.matrix, second.matrix, atol=1e-9)
+
+    def test_against_product(self):
+        """An element's own transform applies first, then its parent's and so on out to the document."""
+        self.assertSame(
+            TransGL3.for_element(self.path), TransGL3(self.path) * TransGL3(self.group) * TransGL3(self.layer)
+        )
+        # (0, 0) is moved to (1, 0), rotated to (0, 1) and scaled to (0, 2)
+        np.testing.assert_allclose(TransGL3.for_element(self.path).transform((0, 0)), (0, 2), atol=1e-9)
+
+    def test_up_to(self):
+        self.assertSame(TransGL3.for_element(self.path, up_to=self.group), TransGL3(self.path) * TransGL3(self.group))
+        self.assertSame(
+            TransGL3.for_element(self.path, up_to=self.layer),
+            TransGL3(self.path) * TransGL3(self.group) * TransGL3(self.layer),
+        )
+        self.assertSame(TransGL3.for_element(self.plain, up_to=self.group), TransGL3(self.group))
+
+    def test_no_transforms(self):
+        element = etree.fromstring("<g><path/></g>")[0]
+        self.assertSame(TransGL3.for_element(element), TransGL3())
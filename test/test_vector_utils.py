@@ -0,0 +1,176 @@
+import random
+import unittest
+
+import shapely
+from lxml import etree
+
+from diplomacy.map_parser.vector.transform import TransGL3
+from diplomacy.map_parser.vector.utils import get_nearby_pairs, initialize_province_resident_data, parse_path
+from diplomacy.map_parser.vector.vector import Parser
+from diplomacy.persistence.province import Province, ProvinceType
+
+
+def points(path_string: str, translation: TransGL3 | None = None) -> list[list[tuple[float, float]]]:
+    return [[tuple(point) for point in subpath.tolist()] for subpath in parse_path(path_string, translation or TransGL3())]
+
+
+class TestParsePath(unittest.TestCase):
+    def test_absolute(self):
+        self.assertEqual(points("M 0,0 L 10,0 L 10,10 Z"), [[(0, 0), (10, 0), (10, 10), (0, 0)]])
+
+    def test_relative(self):
+        self.assertEqual(points("m 1,1 l 10,0 l 0,10 z"), [[(1, 1), (11, 1), (11, 11), (1, 1)]])
+
+    def test_horizontal_and_vertical(self):
+        self.assertEqual(
+            points("M 1 2 H 5 V 7 h -2 v -3 h 1 2"),
+            [[(1, 2), (5, 2), (5, 7), (3, 7), (3, 4), (4, 4), (6, 4)]],
+        )
+
+    def test_numbers_written_together(self):
+        self.assertEqual(points("M1-2L.5.5l1e1-1E1"), [[(1, -2), (0.5, 0.5), (10.5, -9.5)]])
+        self.assertEqual(points("M0,0L-1.5-.5"), [[(0, 0), (-1.5, -0.5)]])
+
+    def test_arc_flags_without_separators(self):
+        # radii 5 5, rotation 0, large arc 1, sweep 0, then the end point, with the flags run into it
+        self.assertEqual(points("M 0 0 a5 5 0 1010 10"), [[(0, 0), (10, 10)]])
+        self.assertEqual(points("M 0 0 A5,5,0,0,1,20,0 5 5 0 1 0 30 0"), [[(0, 0), (20, 0), (30, 0)]])
+
+    def test_curves_keep_end_points(self):
+        self.assertEqual(points("M 0 0 C 1 1 2 2 3 0 c 1 1 2 2 3 0 Q 7 7 8 0"), [[(0, 0), (3, 0), (6, 0), (8, 0)]])
+
+    def test_implicit_repeats(self):
+        # the pairs after a moveto's first are lines, relative if the moveto is
+        self.assertEqual(points("m 1 1 2 0 0 2"), [[(1, 1), (3, 1), (3, 3)]])
+        self.assertEqual(points("M 1 1 L 2 2 3 3 4 4"), [[(1, 1), (2, 2), (3, 3), (4, 4)]])
+
+    def test_relative_move_after_close(self):
+        """After z the current point is the start of the closed subpath, which a relative moveto goes from."""
+        self.assertEqual(
+            points("M 10 10 l 5 0 l 0 5 z m 1 1 l 2 0 l 0 2 z"),
+            [[(10, 10), (15, 10), (15, 15), (10, 10)], [(11, 11), (13, 11), (13, 13), (11, 11)]],
+        )
+
+    def test_drawing_after_close(self):
+        self.assertEqual(
+            points("M 10 10 l 5 0 l 0 5 z l 0 -5 l -5 0"),
+            [[(10, 10), (15, 10), (15, 15), (10, 10)], [(10, 10), (10, 5), (5, 5)]],
+        )
+
+    def test_every_move_starts_a_subpath(self):
+        self.assertEqual(points("M 0 0 L 1 0 M 5 5 L 6 5"), [[(0, 0), (1, 0)], [(5, 5), (6, 5)]])
+
+    def test_single_point(self):
+        """A subpath of one point has no outline, so it's left out."""
+        self.assertEqual(points("M 1 2"), [])
+        self.assertEqual(points("M 1 2 M 0 0 L 1 1"), [[(0, 0), (1, 1)]])
+
+    def test_transformed(self):
+        self.assertEqual(points("M 1 2 L 3 4", TransGL3("translate(10 20)")), [[(11, 22), (13, 24)]])
+
+    def test_invalid(self):
+        for path_string in ("0 0 L 1 1", "M 0 0 L 1", "M 0 0 X 1 1", "z", "M 0 0 L 1 1 z 2"):
+            with self.subTest(path_string), self.assertRaises(Exception):
+                parse_path(path_string, TransGL3())
+
+    def test_province_of_one_point(self):
+        """A province whose path has no outline is named in the error, rather than failing on an empty list."""
+        layer = etree.fromstring(
+            '<g xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape">'
+            '<path inkscape:label="Atlantis" d="M 1 2"/></g>'
+        )
+        parser = Parser.__new__(Parser)
+        with self.assertRaisesRegex(RuntimeError, "Atlantis"):
+            parser._create_provinces_type(layer, ProvinceType.LAND)
+
+
+def brute_force_pairs(geometries: list[shapely.Geometry], margin: float) -> list[tuple[int, int]]:
+    return [
+        (i, j)
+        for i in range(len(geometries))
+        for j in range(i + 1, len(geometries))
+        if geometries[i].distance(geometries[j]) < margin
+    ]
+
+
+class TestNearbyPairs(unittest.TestCase):
+    def test_fixed(self):
+        geometries = [
+            shapely.box(0, 0, 1, 1),
+            # touching the first
+            shapely.box(1, 0, 2, 1),
+            # exactly the margin from the second, so not near it
+            shapely.box(3, 0, 4, 1),
+            # just inside the margin of the third
+            shapely.box(4.999, 0, 6, 1),
+            # overlapping the first
+            shapely.Polygon([(0.5, 0.5), (1.5, 0.5), (0.5, 1.5)]),
+            # exactly the margin below the first, by a corner rather than an edge
+            shapely.Polygon([(-1, -1), (0, -1), (-1, -2)]),
+            # far from everything
+            shapely.box(100, 100, 101, 101),
+        ]
+        expected = [(0, 1), (0, 4), (1, 4), (2, 3)]
+        self.assertEqual(brute_force_pairs(geometries, 1), expected)
+        self.assertEqual(get_nearby_pairs(geometries, 1), expected)
+
+    def test_against_brute_force(self):
+        rng = random.Random(0)
+        geometries = []
+        for _ in range(60):
+            x, y = rng.randrange(40), rng.randrange(40)
+            # whole-number corners, so that many pairs are exactly the margin apart
+            geometries.append(
+                shapely.Polygon([(x, y), (x + rng.randrange(1, 4), y), (x, y + rng.randrange(1, 4))])
+                if rng.random() < 0.5
+                else shapely.box(x, y, x + rng.randrange(1, 4), y + rng.randrange(1, 4))
+            )
+        for margin in (0.5, 1, 2, 3.5):
+            with self.subTest(margin=margin):
+                expected = brute_force_pairs(geometries, margin)
+                self.assertTrue(expected)
+                self.assertEqual(get_nearby_pairs(geometries, margin), expected)
+        # at least some pairs are exactly a margin apart, and are left out by both
+        self.assertTrue(any(a.distance(b) == 2 for a in geometries for b in geometries))
+
+
+def province(name: str, geometry: shapely.Geometry) -> Province:
+    return Province(name, geometry, None, None, ProvinceType.LAND, False, set(), set(), None, None, None)
+
+
+class TestResidentData(unittest.TestCase):
+    """Elements like units and centers are given to the province they're inside."""
+
+    def setUp(self):
+        self.west = province("West", shapely.box(1, 1, 11, 11))
+        self.east = province("East", shapely.box(9, 1, 19, 11))
+
+    def assign(self, provinces: list[Province], points: dict[str, tuple[float, float]]) -> dict[str, str]:
+        elements = [etree.Element("path", id=name) for name in points]
+        assigned = {}
+        initialize_province_resident_data(
+            provinces,
+            elements,
+            lambda element: points[element.get("id")],
+            lambda province, element: assigned.setdefault(element.get("id"), province.name),
+        )
+        return assigned
+
+    def test_inside_one(self):
+        with self.assertNoLogs("diplomacy.map_parser.vector.utils", "WARNING"):
+            self.assertEqual(
+                self.assign([self.west, self.east], {"a": (5, 5), "b": (15, 5)}), {"a": "West", "b": "East"}
+            )
+
+    def test_inside_two(self):
+        """An element where two provinces overlap goes to the first of them, as when they were checked in turn."""
+        for provinces in ([self.west, self.east], [self.east, self.west]):
+            with self.subTest([p.name for p in provinces]):
+                with self.assertLogs("diplomacy.map_parser.vector.utils", "WARNING") as logs:
+                    self.assertEqual(self.assign(provinces, {"a": (10, 5)}), {"a": provinces[0].name})
+                self.assertIn("a is inside East, West, assigning it to " + provinces[0].name, logs.output[0])
+
+    def test_outside_all(self):
+        with self.assertLogs("diplomacy.map_parser.vector.utils", "WARNING") as logs:
+            self.assertEqual(self.assign([self.west, self.east], {"a": (5, 5), "b": (30, 30)}), {"a": "West"})
+        self.assertIn("1 elements aren't inside any province: b", logs.output[0])
@@ -1,4 +1,7 @@
+from diplomacy.map_parser.vector import vector
+from diplomacy.persistence import phase
 from diplomacy.persistence.board import Board
+from diplomacy.persistence.db import database
 from diplomacy.persistence.order import (
     Core,
     Hold,
@@ -15,7 +18,10 @@ from diplomacy.persistence.player import Player
 from diplomacy.persistence.phase import Phase
 from diplomacy.adjudicator.adjudicator import MovesAdjudicator, RetreatsAdjudicator, BuildsAdjudicator, ResolutionState, Resolution
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 # Allows for specifying units, uses the classic diplomacy board as that is used by DATC 
 # Only implements the subset of adjacencies necessary to run the DATC tests as of now
@@ -313,7 +319,7 @@ class BoardBuilder():
         player = Player(
             name=name,
             color="",
-            win_type =  "classic"
+            win_type =  "classic",
             vscc = 0,
             iscc = 0,
             centers = set(),
@@ -648,3 +654,57 @@ class BoardBuilder():
             test.assertTrue(notDisband not in removed_provinces, f"Expected province {notDisband} to not have unit removed")
 
         test.assertTrue(self.build_count == None or (len(self.board.units) - len(current_units)) == self.build_count, f"Expected {self.build_count} builds")
+
+
+# boards of this variant are made by BoardBuilder rather than parsed, so that tests can save them to a DB and load them
+TEST_VARIANT = "test.json"
+
+
+class BuilderParser:
+    """Stands in for the Parser of TEST_VARIANT."""
+
+    year_offset = 1642
+
+    def parse(self) -> Board:
+        board = BoardBuilder().board
+        board.phase = phase.initial()
+        board.datafile = TEST_VARIANT
+        return board
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Gives every test a DB of its own in a temporary directory, which database.get_connection() returns."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        environment = mock.patch.dict(
+            os.environ,
+            {
+                "archive_db_file": os.path.join(directory.name, "archive.sqlite"),
+                "order_write_delay": "0",
+                # small, so that tests go past a checkpoint of the province history
+                "board_checkpoint_interval": "3",
+            },
+        )
+        environment.start()
+        self.addCleanup(environment.stop)
+        parsers = mock.patch.dict(vector.parsers, {TEST_VARIANT: BuilderParser()})
+        parsers.start()
+        self.addCleanup(parsers.stop)
+
+        self.database = database._DatabaseConnection(os.path.join(directory.name, "bot_db.sqlite"))
+        connection = mock.patch.object(database, "_db_class", self.database)
+        connection.start()
+        self.addCleanup(connection.stop)
+
+    def new_board(self, board_id: int = 1) -> Board:
+        board = BuilderParser().parse()
+        board.board_id = board_id
+        return board
+
+    def get_province(self, board: Board, name: str) -> Province:
+        return next(province for province in board.provinces if province.name == name)
+
+    def get_player(self, board: Board, name: str) -> Player:
+        return next(player for player in board.players if player.name == name)